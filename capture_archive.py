@@ -0,0 +1,362 @@
+"""
+Capture Archive - Append-only, deduplicated store of confirmed button crops
+
+save_captures_to_disk overwrites capture_NNNN.png every iteration, so no
+history survives. The archive instead appends each unique crop once to a pack
+file and records sightings in a fixed-size binary index, which is small
+enough to load into a NumPy array and filter without touching the pack:
+
+    archive/captures.pack   b"ACAP" + version, then PNG-encoded crops back to back
+    archive/captures.idx    b"ACAI" + version, then one record per sighting:
+        digest     12 bytes   blake2b of the crop's shape and pixels (dedup key)
+        timestamp  f8         when the crop was seen
+        x, y, w, h i4         screen coordinates
+        offset     u8         start of the PNG in the pack
+        length     u4         length of the PNG
+        term       32 bytes   matched search term (UTF-8 cut on a character boundary, empty if unknown)
+
+A button that stays on screen is one sighting, not one per frame:
+add_captures skips crops seen with the same pixels at the same coordinates in
+the previous iteration, so the index grows with changes rather than uptime.
+
+Both files are only ever appended to. A crash mid-write leaves at most a
+partial trailing record or an unreferenced blob, which the next open()
+truncates away. With max_bytes set, the archive stops recording (with a
+single warning) once the two files would grow past it; move or export and
+delete the directory to start a fresh one.
+
+Exported crops use the training layout of text_classifier.py
+(<output>/<term>/<digest>.png), and `text_classifier.py train --archive`
+reads the archive directly.
+
+Usage:
+    python capture_archive.py stats --archive archive
+    python capture_archive.py export --archive archive --output training [--term Allow] [--since 2024-01-31]
+"""
+import argparse
+import os
+import struct
+import time
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from color_capture_core import crop_digest
+
+ARCHIVE_VERSION = 1
+PACK_FILE = "captures.pack"
+INDEX_FILE = "captures.idx"
+UNLABELED = "unlabeled"  # Export folder of crops without a matched term
+_PACK_HEADER = struct.Struct("<4sH")
+_INDEX_HEADER = struct.Struct("<4sH")
+INDEX_DTYPE = np.dtype([
+    ('digest', 'V12'),
+    ('timestamp', '<f8'),
+    ('x', '<i4'), ('y', '<i4'), ('w', '<i4'), ('h', '<i4'),
+    ('offset', '<u8'),
+    ('length', '<u4'),
+    ('term', 'S32'),
+])
+
+
+def _term_bytes(term):
+    """Encode a term for the index, cutting it to 32 bytes without splitting a character."""
+    return (term or "").encode('utf-8')[:32].decode('utf-8', 'ignore').encode('utf-8')
+
+
+class CaptureArchive:
+    """Append-only pack of unique crops plus an index of every sighting."""
+
+    def __init__(self, directory, debug_mode=True, max_bytes=None):
+        self.directory = Path(directory)
+        self.debug_mode = debug_mode
+        self.max_bytes = max_bytes  # Combined pack + index size to stop recording at (None = unbounded)
+        self.size_bytes = 0  # Current combined pack + index size
+        self._full_warned = False
+        self._index = np.zeros(64, dtype=INDEX_DTYPE)
+        self._count = 0
+        self._blobs = {}  # digest -> (offset, length) of the stored PNG
+        self._previous = set()  # (digest, coords) archived by the last add_captures call
+        self._pack = None
+        self._index_file = None
+        self.open()
+
+    def open(self):
+        """
+        Open (creating if needed) the pack and index files and load the index.
+
+        Raises:
+            ValueError: If either file is not a capture archive of this version
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._pack = self._open_file(self.directory / PACK_FILE, _PACK_HEADER, b"ACAP")
+        self._index_file = self._open_file(self.directory / INDEX_FILE, _INDEX_HEADER, b"ACAI")
+
+        index_path = self.directory / INDEX_FILE
+        records = (os.path.getsize(index_path) - _INDEX_HEADER.size) // INDEX_DTYPE.itemsize
+        entries = np.fromfile(index_path, dtype=INDEX_DTYPE, count=records, offset=_INDEX_HEADER.size)
+        pack_size = os.path.getsize(self.directory / PACK_FILE)
+        # Drop sightings whose blob never made it to disk, then any partial trailing record or blob
+        missing = np.flatnonzero(entries['offset'] + entries['length'] > pack_size)
+        if len(missing):
+            entries = entries[:missing[0]]
+        self._truncate(self._index_file, _INDEX_HEADER.size + len(entries) * INDEX_DTYPE.itemsize)
+        end = int((entries['offset'] + entries['length']).max()) if len(entries) else _PACK_HEADER.size
+        self._truncate(self._pack, end)
+        self.size_bytes = end + _INDEX_HEADER.size + len(entries) * INDEX_DTYPE.itemsize
+
+        self._count = 0
+        self._reserve(len(entries))
+        self._index[:len(entries)] = entries
+        self._count = len(entries)
+        self._blobs = {bytes(entry['digest']): (int(entry['offset']), int(entry['length'])) for entry in entries}
+        return self
+
+    @staticmethod
+    def _open_file(path, header, magic):
+        if not path.exists() or path.stat().st_size == 0:
+            with open(path, 'wb') as f:
+                f.write(header.pack(magic, ARCHIVE_VERSION))
+        f = open(path, 'r+b')
+        found_magic, version = header.unpack(f.read(header.size).ljust(header.size, b"\0"))
+        if found_magic != magic:
+            f.close()
+            raise ValueError(f"Not a capture archive file: {path}")
+        if version != ARCHIVE_VERSION:
+            f.close()
+            raise ValueError(f"Unsupported archive version {version} (expected {ARCHIVE_VERSION}): {path}")
+        return f
+
+    @staticmethod
+    def _truncate(f, size):
+        f.seek(0, os.SEEK_END)
+        if f.tell() != size:
+            f.truncate(size)
+        f.seek(size)
+
+    def _reserve(self, count):
+        if count > len(self._index):
+            grown = np.zeros(max(count, 2 * len(self._index)), dtype=INDEX_DTYPE)
+            grown[:self._count] = self._index[:self._count]
+            self._index = grown
+
+    def close(self):
+        """Flush and close the archive files."""
+        for f in (self._pack, self._index_file):
+            if f is not None:
+                f.close()
+        self._pack = self._index_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        """Number of recorded sightings."""
+        return self._count
+
+    @property
+    def unique_count(self):
+        """Number of distinct crops stored in the pack."""
+        return len(self._blobs)
+
+    @property
+    def entries(self):
+        """All sightings as a structured array (see INDEX_DTYPE)."""
+        return self._index[:self._count]
+
+    def add(self, image_bgr, coords, term=None, timestamp=None):
+        """
+        Record a sighting of a crop, storing its pixels only if they are new.
+
+        Args:
+            image_bgr: Crop to archive
+            coords: (x, y, w, h) screen coordinates of the crop
+            term: Matched search term, or None if unknown
+            timestamp: Time of the sighting (defaults to now)
+
+        Returns:
+            True if the crop was new and appended to the pack, None if the
+            archive is full and the sighting was not recorded
+        """
+        return self._append(crop_digest(image_bgr), image_bgr, coords, term, timestamp)
+
+    def _append(self, digest, image_bgr, coords, term, timestamp):
+        stored = self._blobs.get(digest)
+        is_new = stored is None
+        if is_new:
+            ok, encoded = cv2.imencode(".png", image_bgr)
+            if not ok:
+                raise ValueError(f"Could not encode crop of shape {image_bgr.shape}")
+        growth = INDEX_DTYPE.itemsize + (len(encoded) if is_new else 0)
+        if self.max_bytes is not None and self.size_bytes + growth > self.max_bytes:
+            if not self._full_warned:
+                print(f"[WARNING] Capture archive {self.directory} reached its {self.max_bytes} byte limit; "
+                      f"no longer recording captures")
+                self._full_warned = True
+            return None
+        if is_new:
+            offset = self._pack.seek(0, os.SEEK_END)
+            self._pack.write(encoded.tobytes())
+            self._pack.flush()  # The blob must be on disk before an index record points at it
+            stored = self._blobs[digest] = (offset, len(encoded))
+
+        record = np.zeros(1, dtype=INDEX_DTYPE)
+        record['digest'] = np.void(digest)
+        record['timestamp'] = time.time() if timestamp is None else timestamp
+        record['x'], record['y'], record['w'], record['h'] = (int(v) for v in coords)
+        record['offset'], record['length'] = stored
+        record['term'] = _term_bytes(term)
+        self._index_file.write(record.tobytes())
+        self._index_file.flush()
+        self.size_bytes += growth
+
+        self._reserve(self._count + 1)
+        self._index[self._count] = record[0]
+        self._count += 1
+        return is_new
+
+    def add_captures(self, valid_captures, timestamp=None):
+        """
+        Archive the captures (DetectionRecords or dicts) of one iteration.
+
+        A capture with the same pixels and coordinates as one archived by the
+        previous call is the same sighting still on screen and is not recorded
+        again; it is recorded anew once it changes, moves or reappears.
+
+        Returns:
+            Number of crops that were new to the archive (sightings are dropped once it is full)
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        current = set()
+        recorded = added = 0
+        for capture in valid_captures:
+            image, coords = capture['image'], tuple(int(v) for v in capture['coords'])
+            key = (crop_digest(image), coords)
+            current.add(key)
+            if key in self._previous:
+                continue
+            is_new = self._append(key[0], image, coords, capture.get('term'), timestamp)
+            if is_new is None:
+                continue
+            added += is_new
+            recorded += 1
+        self._previous = current
+        if self.debug_mode:
+            print(f"  → Archived {recorded} sighting(s), {added} new crop(s) "
+                  f"({self.unique_count} unique in {self.directory})")
+        return added
+
+    def query(self, term=None, since=None, until=None, region=None, unique=False):
+        """
+        Select sightings from the index.
+
+        Args:
+            term: Only sightings that matched this term ("" selects unlabeled ones)
+            since, until: Timestamp bounds (inclusive)
+            region: (x, y, w, h); only sightings whose box intersects it
+            unique: Keep only the first sighting of every distinct crop
+
+        Returns:
+            Structured array of matching index records, oldest first
+        """
+        entries = self.entries
+        selected = np.ones(len(entries), dtype=bool)
+        if term is not None:
+            selected &= entries['term'] == _term_bytes(term)
+        if since is not None:
+            selected &= entries['timestamp'] >= since
+        if until is not None:
+            selected &= entries['timestamp'] <= until
+        if region is not None:
+            rx, ry, rw, rh = region
+            selected &= ((entries['x'] < rx + rw) & (entries['x'] + entries['w'] > rx)
+                         & (entries['y'] < ry + rh) & (entries['y'] + entries['h'] > ry))
+        result = entries[selected]
+        if unique and len(result):
+            _, first = np.unique(result['offset'], return_index=True)
+            result = result[np.sort(first)]
+        return result
+
+    def read_image(self, entry):
+        """Decode the crop an index record points at."""
+        self._pack.seek(int(entry['offset']))
+        data = self._pack.read(int(entry['length']))
+        self._pack.seek(0, os.SEEK_END)
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def export(self, output_dir, entries=None):
+        """
+        Write crops as <output_dir>/<term>/<digest>.png (the text_classifier training layout).
+
+        Args:
+            output_dir: Destination directory
+            entries: Records from query() (defaults to every unique crop)
+
+        Returns:
+            Number of files written
+        """
+        output_dir = Path(output_dir)
+        entries = self.query(unique=True) if entries is None else entries
+        written = 0
+        for entry in entries:
+            label = entry['term'].decode('utf-8') or UNLABELED
+            path = output_dir / label / f"{bytes(entry['digest']).hex()}.png"
+            if path.exists():
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            cv2.imwrite(str(path), self.read_image(entry))
+            written += 1
+        return written
+
+
+def _parse_time(value):
+    """Accept a Unix timestamp or an ISO date/time."""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    """Command-line entry point for inspecting and exporting an archive."""
+    parser = argparse.ArgumentParser(description="Inspect or export the capture archive")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stats_parser = subparsers.add_parser("stats", help="Show sighting counts per term")
+    export_parser = subparsers.add_parser("export", help="Write unique crops as PNG files")
+    for sub in (stats_parser, export_parser):
+        sub.add_argument('--archive', type=str, default="archive", help='Archive directory (default: archive)')
+    export_parser.add_argument('--output', type=str, required=True, help='Destination directory')
+    export_parser.add_argument('--term', type=str, default=None, help='Only crops that matched this term')
+    export_parser.add_argument('--since', type=str, default=None, help='Unix time or ISO date')
+    export_parser.add_argument('--until', type=str, default=None, help='Unix time or ISO date')
+
+    args = parser.parse_args()
+
+    with CaptureArchive(args.archive, debug_mode=False) as archive:
+        if args.command == "stats":
+            entries = archive.entries
+            print(f"{len(entries)} sighting(s) of {archive.unique_count} unique crop(s) in {args.archive}")
+            terms, counts = np.unique(entries['term'], return_counts=True)
+            for term, count in zip(terms, counts):
+                print(f"  {term.decode('utf-8') or UNLABELED}: {count}")
+            if len(entries):
+                first, last = entries['timestamp'].min(), entries['timestamp'].max()
+                print(f"  from {datetime.fromtimestamp(first):%Y-%m-%d %H:%M:%S} "
+                      f"to {datetime.fromtimestamp(last):%Y-%m-%d %H:%M:%S}")
+        else:
+            entries = archive.query(term=args.term,
+                                    since=_parse_time(args.since) if args.since else None,
+                                    until=_parse_time(args.until) if args.until else None,
+                                    unique=True)
+            written = archive.export(args.output, entries)
+            print(f"[OK] Exported {written} crop(s) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,40 +2,265 @@
 Color Capture Script - Main entry point
 Uses ColorCapture class from color_capture_core for all core functionality
 """
-import pyautogui
 import time
+
+_MODULE_START = time.perf_counter()
+
+import argparse
+import importlib
+import json
+import os
 import shutil
 import cv2
 import numpy as np
 from pathlib import Path
 
-from color_capture_core import ColorCapture
+from color_capture_core import ColorCapture, LazyModule
+from control_api import RuntimeState
+from profiler import SlowIterationProfiler, StageTimer
+from supervision import ControlChannel, HeartbeatWriter
+from warm_state import load_snapshot, save_snapshot
+
+pyautogui = LazyModule("pyautogui")
+
+_IMPORTS_DONE = time.perf_counter()
 
 # Configuration
 SCRIPT_DIR = Path(__file__).resolve().parent
 COLOR_REF_PATH = SCRIPT_DIR / "assets" / "color_ref.png"
 CAPTURES_DIR = SCRIPT_DIR / "captures"
+CAPTURE_ARCHIVE = True  # Append unique confirmed crops to ARCHIVE_DIR instead of rewriting CAPTURES_DIR each iteration
+ARCHIVE_DIR = SCRIPT_DIR / "archive"  # Deduplicated crop history (see capture_archive.py)
+ARCHIVE_MAX_MB = 512  # Stop archiving (with a warning) once ARCHIVE_DIR reaches this size (None = unbounded)
 POLL_INTERVAL = 1  # seconds
+SCREEN_REGION = None  # (x, y, w, h) of the grabbed screen to scan, e.g. one monitor per watchdog instance (None = all of it)
+WINDOW_EVENTS = True  # On X11, scan new/moved windows immediately and poll the full screen slowly
+EVENT_FALLBACK_POLL_INTERVAL = 10  # Full-screen poll interval (seconds) while window events are active
 COLOR_TOLERANCE = 30  # tolerance for color matching (0-255)
+COLOR_MATCH_MODE = "bgr"  # "bgr" per-channel box (fastest), "hsv" hue window or "lab" delta E distance (both ~1.5-2x bgr; see benchmark_detection.py)
+DETECTION_ENGINE = "contours"  # "spans" = banded run-length pass (faster on bgr at 4K, slower on small screens)
+REFERENCE_MODEL = "mode"  # Reference color from the dominant histogram bucket ("mean" = plain average)
+TOLERANCE_MARGIN = None  # BGR box = measured reference spread + margin, at most COLOR_TOLERANCE (None = fixed +/-COLOR_TOLERANCE; assets/color_ref.png is flat, so a margin is the whole box)
+COLOR_ADAPT_RATE = 0.0  # Follow gradual theme/gamma drift using confirmed hits (0 disables; try 0.05)
 OCR_SEARCH_TEXT = ["Allow", "Try Again", "Continue"]  # Text to search for in images (case-insensitive)
 OCR_ENABLED = True  # Set to False to disable OCR filtering
 DEBUG_MODE = True  # Enable detailed logging
 AUTO_CLICK_ENABLED = True  # Set to False to disable auto-clicking
+VERIFY_CLICKS = True  # Re-grab clicked regions until the buttons disappear (retrying once) instead of rescanning
+VERIFY_TIMEOUT = 1.0  # Seconds to wait for a clicked button to disappear before clicking again
 CLICK_DELAY = 0.05  # Delay between cursor movement and click (seconds)
 USE_AUTOHOTKEY = False  # Use PyAutoGUI for clicks
+BATCH_OCR = True  # OCR all candidates of a frame in a single Tesseract call
+SHAPE_PREFILTER = True  # Skip OCR on hollow, irregular or text-less color blobs
+LOCALIZE_TEXT = True  # OCR only the text box inside each button (found from the color mask)
+OCR_BUDGET_MS = 500  # Per-frame OCR time; less likely candidates wait for the next frame (None = no limit)
+REUSE_BUFFERS = True  # Grab and mask into preallocated buffers instead of allocating per frame
+RECOGNIZER = "tesseract"  # "classifier" tries the local model first (train with text_classifier.py)
+CLASSIFIER_MODEL_PATH = SCRIPT_DIR / "assets" / "text_classifier.npz"
+LAUNCH_TIME_ENV = "COLOR_CAPTURE_LAUNCH_TIME"  # Set by the watchdog to its Popen wall-clock time
+SNAPSHOT_PATH = SCRIPT_DIR / "warm_state.bin"  # Warm state reloaded after a restart
+SNAPSHOT_INTERVAL = 30  # Iterations between warm state snapshots (0 disables snapshots)
+SERVICE_NAME = "allow_clicker"  # Shared memory / socket name used by --serve
+PROFILE_DIR = SCRIPT_DIR / "profiles"  # Collapsed stacks of slow iterations (--profile-slow-ms)
+INSTANCE_ENV = "COLOR_CAPTURE_INSTANCE"  # Set by the watchdog to the instance name when it supervises several
+
+
+def apply_config_overrides(overrides):
+    """
+    Replace configuration constants of this module (e.g. from a --config file).
+
+    Args:
+        overrides: Dict of constant name -> value, e.g. {"POLL_INTERVAL": 0.25};
+            values for path constants may be strings
+
+    Raises:
+        ValueError: If a name is not one of the configuration constants
+    """
+    module_globals = globals()
+    for name, value in overrides.items():
+        if not name.isupper() or name not in module_globals or name.startswith('_'):
+            raise ValueError(f"Unknown configuration constant '{name}'")
+        if isinstance(module_globals[name], Path) and value is not None:
+            value = Path(value)
+        module_globals[name] = value
 
 
-def get_screen_image():
-    """Capture the entire screen."""
+def apply_instance_name(name):
+    """
+    Give this instance its own state files so several instances never share them.
+    
+    Appends _<name> to SNAPSHOT_PATH, ARCHIVE_DIR, CAPTURES_DIR, PROFILE_DIR and
+    SERVICE_NAME, like the watchdog's heartbeat_<name>.json and control_<name>.json.
+    Call before apply_config_overrides so a config can still set them explicitly.
+    """
+    global SNAPSHOT_PATH, ARCHIVE_DIR, CAPTURES_DIR, PROFILE_DIR, SERVICE_NAME
+    SNAPSHOT_PATH = SNAPSHOT_PATH.with_name(f"{SNAPSHOT_PATH.stem}_{name}{SNAPSHOT_PATH.suffix}")
+    ARCHIVE_DIR = ARCHIVE_DIR.with_name(f"{ARCHIVE_DIR.name}_{name}")
+    CAPTURES_DIR = CAPTURES_DIR.with_name(f"{CAPTURES_DIR.name}_{name}")
+    PROFILE_DIR = PROFILE_DIR.with_name(f"{PROFILE_DIR.name}_{name}")
+    SERVICE_NAME = f"{SERVICE_NAME}_{name}"
+
+
+def scan_region(event_region=None):
+    """
+    Region to detect in this iteration, in frame coordinates (None = whole frame).
+    
+    A window event region is clipped to SCREEN_REGION; an event entirely
+    outside it scans SCREEN_REGION.
+    """
+    if SCREEN_REGION is None or event_region is None:
+        return event_region if SCREEN_REGION is None else tuple(SCREEN_REGION)
+    sx, sy, sw, sh = SCREEN_REGION
+    ex, ey, ew, eh = event_region
+    x0, y0 = max(sx, ex), max(sy, ey)
+    x1, y1 = min(sx + sw, ex + ew), min(sy + sh, ey + eh)
+    if x1 <= x0 or y1 <= y0:
+        return tuple(SCREEN_REGION)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+def plan_scan(trigger, forced, since_full_scan, full_scan_interval):
+    """
+    Window event region to scan this iteration, or None for a full scan.
+    
+    Pending event regions are taken either way (a full scan covers them).
+    Forced scans, timeouts and a full scan that is full_scan_interval overdue
+    cover the whole screen, so a stream of window events (focus changes,
+    moves, restacking) cannot postpone the fallback scan indefinitely.
+    
+    Args:
+        trigger: WindowEventTrigger, or None without window events
+        forced: A scan was requested through the control API
+        since_full_scan: Seconds since the last full scan
+        full_scan_interval: Seconds between full scans while window events are active
+    """
+    region = trigger.take_region() if trigger is not None else None
+    if forced or since_full_scan >= full_scan_interval:
+        return None
+    return region
+
+
+def get_screen_image(out=None):
+    """
+    Capture the entire screen.
+
+    Args:
+        out: Optional BGR array to convert into (reused when the screen size matches)
+    """
     screenshot = pyautogui.screenshot()
-    screen_np = np.array(screenshot)
-    return cv2.cvtColor(screen_np, cv2.COLOR_RGB2BGR)
+    return cv2.cvtColor(np.asarray(screenshot), cv2.COLOR_RGB2BGR, dst=out)
+
+
+def _ms_since_launch():
+    """
+    Milliseconds since this process was launched.
+
+    Uses the wall-clock launch time exported by the watchdog when present so
+    interpreter startup is included; otherwise falls back to module import time.
+    """
+    launch_time = os.environ.get(LAUNCH_TIME_ENV)
+    if launch_time:
+        try:
+            return (time.time() - float(launch_time)) * 1000
+        except ValueError:
+            pass
+    return (time.perf_counter() - _MODULE_START) * 1000
+
+
+def create_color_capture(debug_mode=None):
+    """
+    Build the ColorCapture the capture loop uses from the current configuration constants.
+
+    Args:
+        debug_mode: Override DEBUG_MODE (measure_startup runs quietly)
+    """
+    return ColorCapture(
+        COLOR_REF_PATH,
+        CAPTURES_DIR,
+        ocr_enabled=OCR_ENABLED,
+        ocr_search_text=OCR_SEARCH_TEXT,
+        color_tolerance=COLOR_TOLERANCE,
+        debug_mode=DEBUG_MODE if debug_mode is None else debug_mode,
+        click_delay=CLICK_DELAY,
+        use_ahk=USE_AUTOHOTKEY,
+        batch_ocr=BATCH_OCR,
+        color_match_mode=COLOR_MATCH_MODE,
+        detection_engine=DETECTION_ENGINE,
+        shape_prefilter=SHAPE_PREFILTER,
+        recognizer=RECOGNIZER,
+        classifier_model_path=CLASSIFIER_MODEL_PATH,
+        reuse_buffers=REUSE_BUFFERS,
+        reference_model=REFERENCE_MODEL,
+        tolerance_margin=TOLERANCE_MARGIN,
+        adapt_rate=COLOR_ADAPT_RATE,
+        localize_text=LOCALIZE_TEXT,
+        ocr_budget_ms=OCR_BUDGET_MS
+    )
+
+
+def _restore_warm_state(cc):
+    """Load the last warm state snapshot into cc, ignoring missing or corrupt files."""
+    try:
+        state = load_snapshot(SNAPSHOT_PATH)
+    except (OSError, ValueError) as e:
+        print(f"[WARNING] Discarding warm state snapshot: {e}")
+        return
+    if state is None:
+        return
+    try:
+        cc.import_state(state)
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"[WARNING] Warm state snapshot has unexpected contents: {e}")
 
 
-def run_background_capture():
-    """Main loop for continuous screen capture and processing."""
+def _save_warm_state(cc):
+    """Write cc's warm state to SNAPSHOT_PATH."""
+    try:
+        size = save_snapshot(SNAPSHOT_PATH, cc.export_state())
+        if DEBUG_MODE:
+            print(f"[INFO] Warm state saved ({size} bytes)")
+    except OSError as e:
+        print(f"[WARNING] Could not save warm state: {e}")
+
+
+def measure_startup():
+    """Report import, initialization and first-frame timings, then exit."""
+    init_start = time.perf_counter()
+    cc = create_color_capture(debug_mode=False)
+    init_done = time.perf_counter()
+    
+    importlib.import_module("pyautogui")  # The screen grab needs it; timed separately from the grab itself
+    grabber_done = time.perf_counter()
+    screen = get_screen_image()
+    grab_done = time.perf_counter()
+    rectangles, _ = cc.find_matching_rectangles(screen, region=scan_region())
+    detect_done = time.perf_counter()
+    
+    print(f"[STARTUP] Imports:            {(_IMPORTS_DONE - _MODULE_START) * 1000:8.1f} ms")
+    print(f"[STARTUP] ColorCapture init:  {(init_done - init_start) * 1000:8.1f} ms")
+    print(f"[STARTUP] pyautogui import:   {(grabber_done - init_done) * 1000:8.1f} ms")
+    print(f"[STARTUP] First screen grab:  {(grab_done - grabber_done) * 1000:8.1f} ms")
+    print(f"[STARTUP] First detection:    {(detect_done - grab_done) * 1000:8.1f} ms "
+          f"({len(rectangles)} rectangle(s))")
+    print(f"[STARTUP] Total to first frame: {(detect_done - _MODULE_START) * 1000:6.1f} ms")
+    if os.environ.get(LAUNCH_TIME_ENV):
+        print(f"[STARTUP] Since launch:         {_ms_since_launch():6.1f} ms")
+
+
+def run_background_capture(serve=False, control_port=None, profile_slow_ms=None):
+    """
+    Main loop for continuous screen capture and processing.
+
+    Args:
+        serve: Also publish every frame and its detections to local
+            DetectionClient subscribers (see detection_service.py)
+        control_port: Serve the local control API (see control_api.py) on
+            this loopback port; None disables it
+        profile_slow_ms: Sample stacks of iterations slower than this and write
+            them to PROFILE_DIR (see profiler.py); None disables profiling
+    """
     print("Initializing color capture script...")
-    print(f"Captures will be saved to: {CAPTURES_DIR}")
+    print(f"Captures will be saved to: {ARCHIVE_DIR if CAPTURE_ARCHIVE else CAPTURES_DIR}")
     print(f"OCR Filtering: {'ENABLED' if OCR_ENABLED else 'DISABLED'}")
     print(f"Debug Mode: {'ON' if DEBUG_MODE else 'OFF'}")
     if OCR_ENABLED:
@@ -44,83 +269,257 @@ def run_background_capture():
     print(f"Click method: PyAutoGUI")
     print()
     
+    cc = None
+    service = None
+    control_server = None
+    trigger = None
+    profiler = None
+    archive = None
     try:
         # Initialize ColorCapture
-        cc = ColorCapture(
-            COLOR_REF_PATH,
-            CAPTURES_DIR,
-            ocr_enabled=OCR_ENABLED,
-            ocr_search_text=OCR_SEARCH_TEXT,
-            color_tolerance=COLOR_TOLERANCE,
-            debug_mode=DEBUG_MODE,
-            click_delay=CLICK_DELAY,
-            use_ahk=USE_AUTOHOTKEY
-        )
+        cc = create_color_capture()
+        if SNAPSHOT_INTERVAL > 0:
+            _restore_warm_state(cc)
+        if CAPTURE_ARCHIVE:
+            from capture_archive import CaptureArchive
+            archive = CaptureArchive(ARCHIVE_DIR, debug_mode=DEBUG_MODE,
+                                     max_bytes=ARCHIVE_MAX_MB * 1024 * 1024 if ARCHIVE_MAX_MB is not None else None)
+            print(f"[INFO] Capture archive: {archive.unique_count} unique crop(s), {len(archive)} sighting(s)")
+        
+        # Publish progress to (and take throttling from) the watchdog when supervised
+        heartbeat = HeartbeatWriter.from_environment()
+        control = ControlChannel.from_environment()
+        
+        runtime = RuntimeState(POLL_INTERVAL)
+        if WINDOW_EVENTS:
+            from window_events import WindowEventTrigger
+            trigger = WindowEventTrigger.start_if_available(on_event=runtime.wake)
+            if trigger is not None:
+                runtime.default_poll_interval = EVENT_FALLBACK_POLL_INTERVAL
+                print(f"[INFO] Window events enabled, full-screen poll every {EVENT_FALLBACK_POLL_INTERVAL}s")
+        if control_port is not None:
+            from control_api import ControlServer
+            control_server = ControlServer(runtime, port=control_port).start()
+            print(f"[INFO] Control API listening on http://127.0.0.1:{control_server.port}")
+        
+        if profile_slow_ms is not None:
+            profiler = SlowIterationProfiler(PROFILE_DIR, threshold_ms=profile_slow_ms, debug_mode=DEBUG_MODE)
+            print(f"[INFO] Profiling iterations slower than {profile_slow_ms}ms into {PROFILE_DIR}")
         
         print("Starting background capture loop (press Ctrl+C to stop)...\n")
         
         iteration = 0
+        frame_buffer = None
+        first_frame_reported = False
+        first_detection_reported = False
+        last_full_scan = float('-inf')
         while True:
             iteration += 1
+            iteration_start = time.perf_counter()
+            if profiler is not None:
+                profiler.begin_iteration(iteration)
+            valid_captures = []
+            rectangles = []
+            stages = StageTimer(profiler)
             
-            # Clear previous captures at start of loop (with robust error handling)
-            if CAPTURES_DIR.exists():
-                try:
-                    shutil.rmtree(CAPTURES_DIR)
-                except PermissionError:
-                    # Files may be locked, try deleting individual files
-                    if DEBUG_MODE:
-                        print("[INFO] Captures folder locked, clearing files individually...")
+            # While paused only a forced scan runs; idle ticks still count as progress for the watchdog
+            # A window event scans just the affected region; timeouts, forced and overdue scans cover the full screen
+            forced = runtime.consume_scan_request()
+            region = plan_scan(trigger, forced, time.monotonic() - last_full_scan, runtime.poll_interval)
+            if forced or not runtime.paused:
+                if region is None:
+                    last_full_scan = time.monotonic()
+                # Clear previous captures at start of loop (with robust error handling)
+                if archive is None and CAPTURES_DIR.exists():
                     try:
-                        for file in CAPTURES_DIR.glob("*"):
-                            if file.is_file():
-                                file.unlink()
-                    except Exception as e:
+                        shutil.rmtree(CAPTURES_DIR)
+                    except PermissionError:
+                        # Files may be locked, try deleting individual files
                         if DEBUG_MODE:
-                            print(f"[WARNING] Could not clear all files: {e}")
-            CAPTURES_DIR.mkdir(parents=True, exist_ok=True)
-            
-            print(f"\n{'='*60}")
-            print(f"Iteration {iteration} | Time: {time.strftime('%H:%M:%S')}")
-            print(f"{'='*60}")
-            
-            # Capture screen
-            screen = get_screen_image()
-            
-            # Find matching rectangles
-            rectangles, mask = cc.find_matching_rectangles(screen)
-            print(f"Found {len(rectangles)} color-matching rectangle(s)\n")
-            
-            # Process rectangles in memory (filter by OCR)
-            if rectangles:
-                print("Processing rectangles:")
-                valid_captures = cc.process_rectangles(screen, rectangles)
+                            print("[INFO] Captures folder locked, clearing files individually...")
+                        try:
+                            for file in CAPTURES_DIR.glob("*"):
+                                if file.is_file():
+                                    file.unlink()
+                        except Exception as e:
+                            if DEBUG_MODE:
+                                print(f"[WARNING] Could not clear all files: {e}")
+                CAPTURES_DIR.mkdir(parents=True, exist_ok=True)
+                
+                print(f"\n{'='*60}")
+                print(f"Iteration {iteration} | Time: {time.strftime('%H:%M:%S')}"
+                      + (f" | Window event region: {region}" if region else ""))
+                print(f"{'='*60}")
+                
+                # Capture screen
+                stages.enter('grab')
+                screen = get_screen_image(out=frame_buffer)
+                if REUSE_BUFFERS:
+                    frame_buffer = screen
+                stages.leave()
+                
+                # Find matching rectangles
+                stages.enter('detect')
+                rectangles, mask = cc.find_matching_rectangles(screen, region=scan_region(region))
+                stages.leave()
+                print(f"Found {len(rectangles)} color-matching rectangle(s)\n")
                 
-                if valid_captures:
-                    print(f"\n[OK] {len(valid_captures)} rectangle(s) passed OCR filter, saving to disk...")
-                    saved_count = cc.save_captures_to_disk(valid_captures)
-                    print(f"[OK] Saved {saved_count} image(s) to {CAPTURES_DIR}\n")
+                if not first_frame_reported:
+                    print(f"[METRIC] time_to_first_frame_ms={_ms_since_launch():.1f}")
+                    first_frame_reported = True
+                
+                # Process rectangles in memory (filter by OCR)
+                if rectangles:
+                    print("Processing rectangles:")
+                    stages.enter('ocr')
+                    valid_captures = cc.process_rectangles(screen, rectangles, mask=mask,
+                                                           mask_origin=cc.mask_origin)
+                    stages.leave()
                     
-                    # Auto-click on the rectangles
-                    if AUTO_CLICK_ENABLED:
-                        print(f"[INFO] Auto-clicking on {len(valid_captures)} rectangle(s)...")
-                        click_count = cc.click_captures(valid_captures)
-                        print(f"[OK] Clicked {click_count} rectangle(s), cursor restored\n")
+                    if valid_captures:
+                        if not first_detection_reported:
+                            print(f"[METRIC] time_to_first_detection_ms={_ms_since_launch():.1f} "
+                                  f"iteration={iteration}")
+                            first_detection_reported = True
+                        print(f"\n[OK] {len(valid_captures)} rectangle(s) passed OCR filter, saving to disk...")
+                        stages.enter('save')
+                        if archive is not None:
+                            added = archive.add_captures(valid_captures)
+                            stages.leave()
+                            print(f"[OK] Archived {len(valid_captures)} capture(s), {added} new, to {ARCHIVE_DIR}\n")
+                        else:
+                            saved_count = cc.save_captures_to_disk(valid_captures)
+                            stages.leave()
+                            print(f"[OK] Saved {saved_count} image(s) to {CAPTURES_DIR}\n")
+                        
+                        # Auto-click on the rectangles
+                        if AUTO_CLICK_ENABLED:
+                            print(f"[INFO] Auto-clicking on {len(valid_captures)} rectangle(s)...")
+                            stages.enter('click')
+                            if VERIFY_CLICKS:
+                                dismissed = cc.click_and_verify(valid_captures, verify_timeout=VERIFY_TIMEOUT)
+                                stages.leave()
+                                print(f"[OK] {dismissed}/{len(valid_captures)} clicked button(s) confirmed "
+                                      f"dismissed, cursor restored\n")
+                            else:
+                                click_count = cc.click_captures(valid_captures)
+                                stages.leave()
+                                print(f"[OK] Clicked {click_count} rectangle(s), cursor restored\n")
+                    else:
+                        print(f"\n[INFO] No rectangles contain '{OCR_SEARCH_TEXT}' text - captures folder is empty\n")
                 else:
-                    print(f"\n[INFO] No rectangles contain '{OCR_SEARCH_TEXT}' text - captures folder is empty\n")
-            else:
-                print(f"[INFO] No color-matching rectangles found - captures folder is empty\n")
+                    print(f"[INFO] No color-matching rectangles found - captures folder is empty\n")
+                
+                if serve:
+                    if service is None:
+                        # multiprocessing.shared_memory is only imported when serving; the frame
+                        # block is sized from the first frame (at least 4K) so it always fits
+                        from detection_service import DEFAULT_MAX_FRAME_SHAPE, DetectionService
+                        service = DetectionService(SERVICE_NAME, max_frame_shape=np.maximum(
+                            screen.shape, DEFAULT_MAX_FRAME_SHAPE))
+                        print(f"[INFO] Publishing frames and detections as '{SERVICE_NAME}' ({service.address})")
+                    service.publish(screen, valid_captures)
+                
+                stages.ms['total'] = (time.perf_counter() - iteration_start) * 1000
+                runtime.record_iteration(iteration, valid_captures, stages.ms, cache=cc.cache_stats(),
+                                         clicks=cc.click_stats())
             
-            # Wait for next poll
-            time.sleep(POLL_INTERVAL)
+            if SNAPSHOT_INTERVAL > 0 and iteration % SNAPSHOT_INTERVAL == 0:
+                _save_warm_state(cc)
+            
+            busy_seconds = time.perf_counter() - iteration_start
+            if profiler is not None:
+                profiler.end_iteration()
+            
+            # Wait for next poll (stretched when the watchdog throttles us, cut short by API controls)
+            sleep_seconds = runtime.poll_interval
+            if trigger is not None and not runtime.paused:
+                # Event wakes restart the wait, so aim it at the next full scan rather than a full interval
+                sleep_seconds = min(sleep_seconds,
+                                    max(0.0, last_full_scan + runtime.poll_interval - time.monotonic()))
+            if control is not None:
+                sleep_seconds = control.sleep_interval(sleep_seconds, busy_seconds)
+            if heartbeat is not None:
+                heartbeat.beat(
+                    iteration,
+                    busy_seconds * 1000,
+                    sleep_seconds=sleep_seconds,
+                    rectangles=len(rectangles),
+                    captures=len(valid_captures)
+                )
+            runtime.wait(sleep_seconds)
     
     except KeyboardInterrupt:
         print("\n\nCapture script stopped by user.")
     except Exception as e:
         print(f"Error: {e}")
         raise
+    finally:
+        if profiler is not None:
+            profiler.close()
+        if trigger is not None:
+            trigger.stop()
+        if control_server is not None:
+            control_server.stop()
+        if service is not None:
+            service.close()
+        if archive is not None:
+            archive.close()
+        if cc is not None and SNAPSHOT_INTERVAL > 0:
+            _save_warm_state(cc)
+
+
+def main():
+    """Parse command-line options and start the capture loop."""
+    parser = argparse.ArgumentParser(
+        description="Capture color-matching rectangles, filter by OCR and auto-click them"
+    )
+    parser.add_argument(
+        '--measure-startup',
+        action='store_true',
+        help='Report import and first-frame timings, then exit'
+    )
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='Publish frames and detections to other local processes via shared memory'
+    )
+    parser.add_argument(
+        '--control-port',
+        type=int,
+        default=None,
+        help='Serve the local HTTP/JSON control API on this 127.0.0.1 port'
+    )
+    parser.add_argument(
+        '--profile-slow-ms',
+        type=float,
+        default=None,
+        help='Write flame graph stacks (profiles/*.folded) for iterations slower than this'
+    )
+    parser.add_argument(
+        '--config',
+        type=str,
+        default=None,
+        help='JSON file overriding configuration constants, e.g. {"POLL_INTERVAL": 0.25}'
+    )
+    args = parser.parse_args()
+    
+    if os.environ.get(INSTANCE_ENV):
+        apply_instance_name(os.environ[INSTANCE_ENV])
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            apply_config_overrides(json.load(f))
+    
+    if args.measure_startup:
+        measure_startup()
+    else:
+        run_background_capture(
+            serve=args.serve,
+            control_port=args.control_port,
+            profile_slow_ms=args.profile_slow_ms
+        )
 
 
 if __name__ == "__main__":
-    run_background_capture()
+    main()
 
@@ -1,13 +1,202 @@
 """
 Color Capture Module - Core logic extracted for testing
 """
+import bisect
 import cv2
+import hashlib
+import importlib
+import math
 import numpy as np
-import pytesseract
-import pyautogui
 import time
+from collections import OrderedDict, deque
 from pathlib import Path
-from PIL import Image
+
+import span_detection
+
+
+class LazyModule:
+    """
+    Module proxy that defers the real import until the first attribute access.
+
+    OCR and click dependencies (pytesseract, PIL, pyautogui) are slow to import,
+    so they are loaded on first use instead of at process start. pyautogui
+    (which pulls in PIL) is still imported before the first frame, because
+    color_capture.py grabs the screen with it; pytesseract waits for the first
+    OCR call. `color_capture.py --measure-startup` reports the pyautogui import
+    separately.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    @property
+    def loaded(self):
+        """True once the underlying module has been imported."""
+        return self._module is not None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<LazyModule '{self._name}' ({state})>"
+
+
+pytesseract = LazyModule("pytesseract")
+pyautogui = LazyModule("pyautogui")
+Image = LazyModule("PIL.Image")
+
+COLOR_MATCH_MODES = ("bgr", "hsv", "lab")
+DETECTION_ENGINES = ("contours", "spans")
+REFERENCE_MODELS = ("mean", "mode")
+LUT_BITS = 5  # Bits per channel of the Lab match table (32768 entries)
+
+
+class CandidateBuffer:
+    """
+    Array-backed list of (x, y, w, h) rectangles that is refilled every frame.
+    
+    Behaves like the list returned by find_matching_rectangles (len, truth value,
+    indexing, iteration over tuples) while keeping the rectangles in one int32
+    array that only grows, never shrinks.
+    """
+    
+    __slots__ = ('_rects', '_count')
+    
+    def __init__(self, capacity=256):
+        self._rects = np.zeros((capacity, 4), dtype=np.int32)
+        self._count = 0
+    
+    def clear(self):
+        self._count = 0
+    
+    def append(self, rect):
+        if self._count == len(self._rects):
+            grown = np.zeros((2 * len(self._rects), 4), dtype=np.int32)
+            grown[:self._count] = self._rects
+            self._rects = grown
+        self._rects[self._count] = rect
+        self._count += 1
+    
+    def keep(self, selected):
+        """Drop the rectangles whose entry in the boolean array selected is False, in place."""
+        kept = int(np.count_nonzero(selected))
+        self._rects[:kept] = self._rects[:self._count][selected]
+        self._count = kept
+    
+    def offset(self, dx, dy):
+        """Shift all rectangles by (dx, dy), in place."""
+        self._rects[:self._count, 0] += dx
+        self._rects[:self._count, 1] += dy
+    
+    @property
+    def array(self):
+        """View of the current rectangles as an (n, 4) int32 array."""
+        return self._rects[:self._count]
+    
+    def __array__(self, dtype=None, copy=None):
+        return self.array if dtype is None else self.array.astype(dtype)
+    
+    def __len__(self):
+        return self._count
+    
+    def __bool__(self):
+        return self._count > 0
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("candidate index out of range")
+        x, y, w, h = self._rects[index].tolist()
+        return (x, y, w, h)
+    
+    def __iter__(self):
+        for rect in self._rects[:self._count].tolist():
+            yield tuple(rect)
+    
+    def __eq__(self, other):
+        return list(self) == list(other)
+    
+    def __repr__(self):
+        return f"CandidateBuffer({list(self)!r})"
+
+
+class DetectionRecord:
+    """
+    A rectangle that passed the filters in process_rectangles.
+    
+    Stores only coordinates, index, score and matched term plus a reference to
+    the frame; the crop is a view sliced from the frame on access. Supports the
+    capture-dict API (record['image'], record['coords'], record['index']).
+    With reuse_buffers the frame is overwritten by the next grab, so copy the
+    crop (record.crop(copy=True)) to keep it longer than one iteration.
+    """
+    
+    __slots__ = ('frame', 'x', 'y', 'w', 'h', 'index', 'score', 'term')
+    
+    _KEYS = ('image', 'coords', 'index', 'score', 'term')
+    
+    def __init__(self, frame, coords, index, score=1.0, term=None):
+        self.frame = frame
+        self.x, self.y, self.w, self.h = (int(v) for v in coords)
+        self.index = index
+        self.score = score  # Recognizer confidence (classifier margin, 1.0 for an OCR match)
+        self.term = term  # Search term that matched, None when OCR is disabled
+    
+    @property
+    def coords(self):
+        return (self.x, self.y, self.w, self.h)
+    
+    @property
+    def image(self):
+        return self.crop()
+    
+    def crop(self, copy=False):
+        """Return the crop as a view into the frame (or an independent copy)."""
+        view = self.frame[self.y:self.y+self.h, self.x:self.x+self.w]
+        return view.copy() if copy else view
+    
+    def __getitem__(self, key):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __contains__(self, key):
+        return key in self._KEYS
+    
+    def get(self, key, default=None):
+        return self[key] if key in self._KEYS else default
+    
+    def keys(self):
+        return list(self._KEYS)
+    
+    def to_dict(self):
+        """Return the record as a plain capture dict (with a view of the crop)."""
+        return {key: self[key] for key in self._KEYS}
+    
+    def __repr__(self):
+        return f"DetectionRecord(coords={self.coords}, index={self.index}, score={self.score:.2f}, term={self.term!r})"
+
+
+def crop_digest(image_bgr):
+    """
+    12-byte content hash of a crop's shape and pixels.
+    
+    Shared by the OCR cache (as hex) and the capture archive's dedup key.
+    """
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(repr(image_bgr.shape).encode())
+    digest.update(np.ascontiguousarray(image_bgr).data)
+    return digest.digest()
 
 
 class ColorCapture:
@@ -15,7 +204,14 @@ class ColorCapture:
     
     def __init__(self, color_ref_path, captures_dir, ocr_enabled=True, 
                  ocr_search_text="Allow", color_tolerance=30, debug_mode=True, click_delay=0.1,
-                 use_ahk=True):
+                 use_ahk=True, ocr_cache_size=256, max_hotspots=64, batch_ocr=False,
+                 color_match_mode="bgr", hue_tolerance=8, delta_e=12.0, shape_prefilter=False,
+                 min_fill_ratio=0.5, min_border_fill=0.75, text_fraction_range=(0.02, 0.6), aspect_range=(1.2, 10.0),
+                 recognizer="tesseract", classifier_model_path=None, classifier_min_confidence=0.1,
+                 reuse_buffers=False, reference_model="mean", tolerance_margin=None, adapt_rate=0.0,
+                 max_drift=None, localize_text=False, text_padding=4, min_text_pixels=8,
+                 ocr_budget_ms=None, typical_button_size=(100, 30), detection_engine="contours",
+                 span_band_rows=64):
         self.color_ref_path = Path(color_ref_path)
         self.captures_dir = Path(captures_dir)
         self.ocr_enabled = ocr_enabled
@@ -24,11 +220,83 @@ class ColorCapture:
         self.debug_mode = debug_mode
         self.click_delay = click_delay  # Delay between cursor movement and click (seconds)
         self.use_ahk = use_ahk  # Use PyAutoGUI for clicks
+        self.ocr_cache_size = ocr_cache_size  # Max cached OCR results (0 disables the cache)
+        self.max_hotspots = max_hotspots  # Max remembered button locations
+        self.batch_ocr = batch_ocr  # OCR all candidates of a frame in one Tesseract call
+        self.color_match_mode = color_match_mode  # "bgr" box, "hsv" hue window or "lab" delta E
+        self.hue_tolerance = hue_tolerance  # HSV mode: max hue difference (OpenCV hue units, 0-179)
+        self.delta_e = delta_e  # Lab mode: max CIE76 distance from the reference color
+        self.shape_prefilter = shape_prefilter  # Drop implausible button shapes before OCR
+        self.min_fill_ratio = min_fill_ratio  # Min matching fraction of the whole box
+        self.min_border_fill = min_border_fill  # Min matching fraction of the box's outer band
+        self.text_fraction_range = text_fraction_range  # Allowed non-matching fraction inside the box
+        self.aspect_range = aspect_range  # Allowed width/height ratio
+        self.recognizer = recognizer  # "tesseract" or "classifier" (falls back to Tesseract)
+        self.classifier_min_confidence = classifier_min_confidence  # Min margin to trust the classifier
+        self.reuse_buffers = reuse_buffers  # Write masks/candidates into buffers reused every frame
+        self.reference_model = reference_model  # "mean" of all pixels or dominant histogram "mode"
+        self.tolerance_margin = tolerance_margin  # BGR box = measured spread + margin (capped at color_tolerance)
+        self.adapt_rate = adapt_rate  # EMA weight of each confirmed hit's color (0 disables adaptation)
+        self.max_drift = color_tolerance if max_drift is None else max_drift  # Max adaptation per channel
+        self.localize_text = localize_text  # OCR only the text box found in the match mask, not the whole button
+        self.text_padding = text_padding  # Pixels kept around the localized text (Tesseract needs a margin)
+        self.min_text_pixels = min_text_pixels  # Fewer enclosed non-matching pixels: OCR the whole crop
+        self.ocr_budget_ms = ocr_budget_ms  # Per-frame OCR time; the rest waits for the next frame (None = no limit)
+        self.typical_button_size = typical_button_size  # (w, h) ranked highest until hotspots are known
+        self.detection_engine = detection_engine  # "contours" (findContours) or "spans" (banded run-lengths)
+        self.span_band_rows = span_band_rows  # Rows matched and run-length encoded at a time by the spans engine
+        
+        if color_match_mode not in COLOR_MATCH_MODES:
+            raise ValueError(f"Unknown color_match_mode '{color_match_mode}', "
+                             f"expected one of {COLOR_MATCH_MODES}")
+        if reference_model not in REFERENCE_MODELS:
+            raise ValueError(f"Unknown reference_model '{reference_model}', "
+                             f"expected one of {REFERENCE_MODELS}")
+        if detection_engine not in DETECTION_ENGINES:
+            raise ValueError(f"Unknown detection_engine '{detection_engine}', "
+                             f"expected one of {DETECTION_ENGINES}")
         
         self.ref_color = None
+        self.ref_spread = np.zeros(3)  # Per-channel (RGB) spread of the reference pixels
+        self._ocr_cache = OrderedDict()  # crop digest -> extracted text (LRU)
+        self.hotspots = {}  # (x, y, w, h) -> number of confirmed hits
+        self._text_boxes = OrderedDict()  # (x, y, w, h) -> (crop digest, localized text box in crop coordinates) (LRU)
+        self.mask_origin = (0, 0)  # Frame coordinates of the last mask's top-left corner
+        self._deferred = set()  # Candidates the OCR budget left unread last frame
+        self._ocr_ms_per_crop = 50.0  # Running estimate of Tesseract's cost per crop
+        self._clock = time.perf_counter  # Timer for the OCR budget (seconds)
+        self._buffers = {}  # name -> preallocated array (reuse_buffers mode)
+        self._candidates = CandidateBuffer()
+        self.stats = {'ocr_cache_hits': 0, 'ocr_cache_misses': 0, 'ocr_calls': 0,
+                      'prefilter_checked': 0, 'prefilter_rejected_aspect': 0,
+                      'prefilter_rejected_shape': 0, 'prefilter_rejected_text': 0,
+                      'classifier_decisions': 0, 'classifier_fallbacks': 0,
+                      'clicks_verified': 0, 'clicks_unverified': 0, 'click_retries': 0,
+                      'text_localized': 0, 'text_box_cache_hits': 0, 'ocr_deferred': 0}
+        self.dismiss_latencies_ms = deque(maxlen=200)  # Click-to-dismiss latency of recent verified clicks
         
         # Load reference color on init
         self._load_reference_color()
+        
+        self.classifier = None
+        if recognizer == "classifier":
+            self._load_classifier(classifier_model_path)
+        elif recognizer != "tesseract":
+            raise ValueError(f"Unknown recognizer '{recognizer}', expected 'tesseract' or 'classifier'")
+    
+    def _load_classifier(self, model_path):
+        """Load the text classifier model; without one every crop falls back to Tesseract."""
+        from text_classifier import TextClassifier
+        
+        if model_path is None or not Path(model_path).exists():
+            if self.debug_mode:
+                print(f"[WARNING] Classifier model not found ({model_path}), using Tesseract only")
+            return
+        self.classifier = TextClassifier.load(model_path)
+        if self.debug_mode:
+            print(f"Text classifier loaded: {len(self.classifier.labels)} sample(s) from {model_path}")
+            if not self.classifier.has_negatives:
+                print("[WARNING] Classifier has no negative samples, every crop falls back to Tesseract")
     
     def _load_reference_color(self):
         """Load and cache the reference color."""
@@ -39,15 +307,427 @@ class ColorCapture:
         if img is None:
             raise ValueError(f"Could not load image: {self.color_ref_path}")
         
-        # Convert BGR to RGB and get the average color
+        # Convert BGR to RGB and estimate the reference color
         img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.ref_color = np.mean(img_rgb, axis=(0, 1)).astype(int)
+        pixels = img_rgb.reshape(-1, 3)
+        if self.reference_model == "mode":
+            center = self.dominant_color(pixels)
+        else:
+            center = np.mean(pixels, axis=0)
+        self.ref_color = center.astype(int)
+        self.ref_spread = self.color_spread(pixels, self.ref_color, self.color_tolerance)
+        self._ref_origin = self.ref_color.astype(float)
+        self._ref_estimate = self.ref_color.astype(float)
         
         if self.debug_mode:
-            print(f"Reference color (RGB): {self.ref_color}")
+            print(f"Reference color (RGB): {self.ref_color}, spread {self.ref_spread.round(1)}")
+        
+        self._build_color_matcher()
+    
+    @staticmethod
+    def dominant_color(pixels, bucket_bits=4):
+        """
+        Robust reference color: median of the most populated color-histogram bucket.
+        
+        Anti-aliased edges and stray pixels land in other buckets, so unlike the
+        mean they do not pull the estimate away from the button fill color.
+        """
+        pixels = np.asarray(pixels).reshape(-1, 3)
+        shift = 8 - bucket_bits
+        buckets = pixels.astype(np.int32) >> shift
+        keys = (buckets[:, 0] << (2 * bucket_bits)) | (buckets[:, 1] << bucket_bits) | buckets[:, 2]
+        dominant = np.bincount(keys).argmax()
+        return np.median(pixels[keys == dominant], axis=0)
+    
+    @staticmethod
+    def color_spread(pixels, center, tolerance, percentile=95):
+        """Per-channel percentile of |pixel - center| over pixels within tolerance of center."""
+        deviation = np.abs(np.asarray(pixels).reshape(-1, 3).astype(float) - np.asarray(center, dtype=float))
+        inliers = deviation[(deviation <= tolerance).all(axis=1)]
+        if not len(inliers):
+            return np.zeros(3)
+        return np.percentile(inliers, percentile, axis=0)
+    
+    def channel_tolerance(self):
+        """
+        Per-channel (RGB) tolerance of the BGR box.
+        
+        color_tolerance, or with tolerance_margin set, the measured spread plus
+        that margin (never wider than color_tolerance).
+        """
+        if self.tolerance_margin is None:
+            return np.full(3, self.color_tolerance, dtype=int)
+        return np.minimum(np.ceil(self.ref_spread + self.tolerance_margin), self.color_tolerance).astype(int)
+    
+    def _adapt_reference(self, crop_bgr):
+        """
+        Move the reference color toward a confirmed hit's fill color (exponential moving average).
+        
+        The fill color is the median of the crop's pixels inside the current BGR
+        box, so text is ignored. Adaptation stays within max_drift of the color
+        loaded from the reference image and rebuilds the matcher only when the
+        integer reference color changes.
+        """
+        inside = cv2.inRange(crop_bgr, self._bgr_lower, self._bgr_upper)
+        fill = crop_bgr[inside > 0]
+        if len(fill) == 0:
+            return
+        observed_rgb = np.median(fill, axis=0)[::-1]
+        spread = self.color_spread(fill[:, ::-1], observed_rgb, self.color_tolerance)
+        
+        rate = self.adapt_rate
+        self._ref_estimate = np.clip((1 - rate) * self._ref_estimate + rate * observed_rgb,
+                                     self._ref_origin - self.max_drift, self._ref_origin + self.max_drift)
+        self.ref_spread = (1 - rate) * self.ref_spread + rate * spread
+        
+        adapted = np.clip(np.rint(self._ref_estimate), 0, 255).astype(int)
+        if not np.array_equal(adapted, self.ref_color):
+            if self.debug_mode:
+                print(f"    [INFO] Reference color adapted: {self.ref_color} -> {adapted}")
+            self.ref_color = adapted
+            self._build_color_matcher()
+    
+    def _build_color_matcher(self):
+        """
+        Precompute the per-frame matching thresholds for the current color_match_mode.
+        
+        - bgr: per-channel box of +/-channel_tolerance() around the reference
+        - hsv: hue window of +/-hue_tolerance (wrapping at 180) with saturation and
+          value within +/-color_tolerance; hue is ignored for near-gray references
+        - lab: CIE76 delta E <= delta_e, decided once per quantized BGR cell
+          (LUT_BITS per channel) into a lookup table, plus the BGR box that
+          encloses every matching cell for a cheap inRange prefilter
+        """
+        ref_bgr = np.array([[[self.ref_color[2], self.ref_color[1], self.ref_color[0]]]], dtype=np.uint8)
+        tol = self.color_tolerance
+        
+        ref = ref_bgr.reshape(3).astype(int)
+        channel_tol = self.channel_tolerance()[::-1]
+        self._bgr_lower = np.clip(ref - channel_tol, 0, 255).astype(np.uint8)
+        self._bgr_upper = np.clip(ref + channel_tol, 0, 255).astype(np.uint8)
+        
+        if self.color_match_mode == "hsv":
+            h, sat, val = cv2.cvtColor(ref_bgr, cv2.COLOR_BGR2HSV).reshape(3).astype(int)
+            sv_lower = (max(0, sat - tol), max(0, val - tol))
+            sv_upper = (min(255, sat + tol), min(255, val + tol))
+            if sat < 30:
+                hue_windows = [(0, 179)]
+            elif h - self.hue_tolerance < 0:
+                hue_windows = [(0, h + self.hue_tolerance), (h - self.hue_tolerance + 180, 179)]
+            elif h + self.hue_tolerance > 179:
+                hue_windows = [(h - self.hue_tolerance, 179), (0, h + self.hue_tolerance - 180)]
+            else:
+                hue_windows = [(h - self.hue_tolerance, h + self.hue_tolerance)]
+            self._hsv_ranges = [
+                (np.array([lo, *sv_lower], dtype=np.uint8), np.array([hi, *sv_upper], dtype=np.uint8))
+                for lo, hi in hue_windows
+            ]
+        
+        elif self.color_match_mode == "lab":
+            shift = 8 - LUT_BITS
+            levels = (np.arange(1 << LUT_BITS, dtype=np.int32) << shift) + (1 << shift) // 2
+            b, g, r = np.meshgrid(levels, levels, levels, indexing='ij')
+            cells_bgr = np.stack([b, g, r], axis=-1).reshape(-1, 1, 3).astype(np.uint8)
+            cells = cv2.cvtColor(cells_bgr.astype(np.float32) / 255, cv2.COLOR_BGR2Lab).reshape(-1, 3)
+            ref_lab = cv2.cvtColor(ref_bgr.astype(np.float32) / 255, cv2.COLOR_BGR2Lab).reshape(3)
+            match = np.sqrt(((cells - ref_lab) ** 2).sum(axis=1)) <= self.delta_e
+            
+            self._lab_lut = np.where(match, 255, 0).astype(np.uint8)
+            self._lab_shift = shift
+            
+            matched = cells_bgr.reshape(-1, 3)[match].astype(np.int32) >> shift
+            if len(matched):
+                self._lab_lower = (matched.min(axis=0) << shift).astype(np.uint8)
+                self._lab_upper = ((matched.max(axis=0) << shift) + (1 << shift) - 1).astype(np.uint8)
+            else:
+                self._lab_lower = np.full(3, 255, dtype=np.uint8)
+                self._lab_upper = np.zeros(3, dtype=np.uint8)
+    
+    def buffer(self, name, shape, dtype=np.uint8):
+        """
+        Return the reusable array called name, (re)allocating it if shape or dtype changed.
+        
+        Without reuse_buffers this returns None, which OpenCV treats as
+        "allocate a new output".
+        """
+        if not self.reuse_buffers:
+            return None
+        array = self._buffers.get(name)
+        if array is None or array.shape != tuple(shape) or array.dtype != dtype:
+            array = self._buffers[name] = np.empty(shape, dtype=dtype)
+        return array
+    
+    def compute_color_mask(self, screen, buffer_prefix=""):
+        """
+        Return a uint8 mask (255 = match) of pixels matching the reference color.
+        
+        With reuse_buffers the mask is overwritten by the next call that uses
+        the same buffer_prefix (separate prefixes keep differently sized inputs,
+        e.g. clicked regions, from reallocating the full-frame buffers).
+        """
+        mask_shape = screen.shape[:2]
+        if self.color_match_mode == "hsv":
+            hsv = cv2.cvtColor(screen, cv2.COLOR_BGR2HSV, dst=self.buffer(buffer_prefix + 'hsv', screen.shape))
+            mask = cv2.inRange(hsv, *self._hsv_ranges[0], dst=self.buffer(buffer_prefix + 'mask', mask_shape))
+            for lower, upper in self._hsv_ranges[1:]:
+                scratch = cv2.inRange(hsv, lower, upper, dst=self.buffer(buffer_prefix + 'scratch', mask_shape))
+                cv2.bitwise_or(mask, scratch, dst=mask)
+            return mask
+        
+        if self.color_match_mode == "lab":
+            # Box prefilter, then the delta E table only at the pixels that passed it:
+            # one gather and one scatter, so the cost follows the prefiltered pixel count
+            mask = cv2.inRange(screen, self._lab_lower, self._lab_upper,
+                               dst=self.buffer(buffer_prefix + 'mask', mask_shape))
+            points = cv2.findNonZero(mask)
+            if points is None:
+                return mask
+            xs, ys = points.reshape(-1, 2).T
+            flat = ys.astype(np.intp) * mask_shape[1] + xs
+            if screen.flags['C_CONTIGUOUS']:
+                pixels = np.take(screen.reshape(-1, 3), flat, axis=0)
+            else:  # Region views of a larger frame
+                pixels = screen[ys, xs]
+            cells = (pixels >> self._lab_shift).astype(np.uint16)
+            index = (cells[:, 0] << (2 * LUT_BITS)) | (cells[:, 1] << LUT_BITS) | cells[:, 2]
+            mask.reshape(-1)[flat] = self._lab_lut[index]
+            return mask
+        
+        return cv2.inRange(screen, self._bgr_lower, self._bgr_upper,
+                           dst=self.buffer(buffer_prefix + 'mask', mask_shape))
+    
+    def _match_band(self, band, out):
+        """Write the color mask of a band of rows into out (bgr and hsv modes)."""
+        if self.color_match_mode == "hsv":
+            hsv = cv2.cvtColor(band, cv2.COLOR_BGR2HSV)
+            cv2.inRange(hsv, *self._hsv_ranges[0], dst=out)
+            for lower, upper in self._hsv_ranges[1:]:
+                cv2.bitwise_or(out, cv2.inRange(hsv, lower, upper), dst=out)
+        else:
+            cv2.inRange(band, self._bgr_lower, self._bgr_upper, dst=out)
+    
+    def find_span_boxes(self, screen):
+        """
+        Color mask and matching-region boxes from one banded pass (the "spans" engine).
+        
+        Each band of span_band_rows rows is matched into its slice of the mask
+        and run-length encoded while still in cache; the spans are then merged
+        into the same boxes findContours(RETR_EXTERNAL) + boundingRect give.
+        Lab mode gathers the prefiltered pixels of the whole frame at once, so
+        its spans are read from the finished mask instead.
+        
+        Returns:
+            (boxes, mask) with boxes an (n, 4) array of unfiltered (x, y, w, h)
+        """
+        height, width = screen.shape[:2]
+        fused = self.color_match_mode != "lab"
+        if fused:
+            mask = self.buffer('mask', (height, width))
+            if mask is None:
+                mask = np.empty((height, width), dtype=np.uint8)
+        else:
+            mask = self.compute_color_mask(screen)
+        
+        padded = self.buffer('span_band', (self.span_band_rows, width + 2))
+        if padded is None:
+            padded = np.zeros((self.span_band_rows, width + 2), dtype=np.uint8)
+        else:
+            padded[:, 0] = padded[:, -1] = 0
+        
+        spans = []
+        for y0 in range(0, height, self.span_band_rows):
+            band_mask = mask[y0:y0 + self.span_band_rows]
+            if fused:
+                self._match_band(screen[y0:y0 + self.span_band_rows], band_mask)
+            spans.append(span_detection.row_spans(band_mask, y0, padded))
+        rows, starts, ends = (np.concatenate(parts) for parts in zip(*spans))
+        return span_detection.external_boxes(rows, starts, ends, height, width), mask
+    
+    def _reference_signature(self):
+        """Size and mtime of the reference image, used to validate restored state."""
+        stat = self.color_ref_path.stat()
+        return [stat.st_size, stat.st_mtime_ns]
+    
+    @staticmethod
+    def _crop_digest(image_bgr):
+        """Short content hash of a crop, used as the OCR cache key."""
+        return crop_digest(image_bgr).hex()
+    
+    def _record_hotspot(self, coords):
+        """Count a confirmed hit at coords, evicting the coldest spot when full."""
+        coords = tuple(int(v) for v in coords)
+        self.hotspots[coords] = self.hotspots.get(coords, 0) + 1
+        if len(self.hotspots) > self.max_hotspots:
+            coldest = min(self.hotspots, key=self.hotspots.get)
+            del self.hotspots[coldest]
+    
+    def cache_stats(self):
+        """Return OCR cache occupancy and hit rate plus the hotspot count."""
+        lookups = self.stats['ocr_cache_hits'] + self.stats['ocr_cache_misses']
+        return {
+            'ocr_cache_entries': len(self._ocr_cache),
+            'ocr_cache_size': self.ocr_cache_size,
+            'ocr_cache_hits': self.stats['ocr_cache_hits'],
+            'ocr_cache_misses': self.stats['ocr_cache_misses'],
+            'ocr_cache_hit_rate': self.stats['ocr_cache_hits'] / lookups if lookups else 0.0,
+            'ocr_calls': self.stats['ocr_calls'],
+            'ocr_deferred': self.stats['ocr_deferred'],
+            'hotspots': len(self.hotspots),
+        }
+    
+    def export_state(self):
+        """Return the warm state (reference color, OCR cache, hotspots) as plain data."""
+        return {
+            'ref_color': [int(c) for c in self.ref_color],
+            'ref_spread': [float(c) for c in self.ref_spread],
+            'ref_signature': self._reference_signature(),
+            'ocr_cache': [[key, text] for key, text in self._ocr_cache.items()],
+            'hotspots': [list(coords) + [count] for coords, count in self.hotspots.items()],
+        }
+    
+    def import_state(self, state):
+        """
+        Restore warm state produced by export_state().
+        
+        The cached reference color is only reused if the reference image is
+        unchanged; OCR results and hotspots are restored regardless.
+        
+        Returns:
+            True if the reference color was restored from the state
+        """
+        restored_ref = False
+        if state.get('ref_signature') == self._reference_signature() and state.get('ref_color'):
+            self.ref_color = np.array(state['ref_color'], dtype=int)
+            self._ref_estimate = self.ref_color.astype(float)
+            if state.get('ref_spread'):
+                self.ref_spread = np.array(state['ref_spread'], dtype=float)
+            self._build_color_matcher()
+            restored_ref = True
+        
+        if self.ocr_cache_size > 0:
+            for key, text in state.get('ocr_cache', [])[-self.ocr_cache_size:]:
+                self._ocr_cache[key] = text
+        
+        for x, y, w, h, count in state.get('hotspots', []):
+            self.hotspots[(x, y, w, h)] = count
+        if len(self.hotspots) > self.max_hotspots:
+            hottest = sorted(self.hotspots.items(), key=lambda item: item[1], reverse=True)
+            self.hotspots = dict(hottest[:self.max_hotspots])
+        
+        if self.debug_mode:
+            print(f"[INFO] Restored warm state: {len(self._ocr_cache)} OCR result(s), "
+                  f"{len(self.hotspots)} hotspot(s), reference color "
+                  f"{'reused' if restored_ref else 'reloaded'}")
+        return restored_ref
     
     def extract_text_from_image(self, image_bgr):
-        """Extract text from an image using OCR (Tesseract)."""
+        """Extract text from an image using OCR (Tesseract), reusing cached results."""
+        key = None
+        if self.ocr_cache_size > 0:
+            key = self._crop_digest(image_bgr)
+            cached = self._ocr_cache.get(key)
+            if cached is not None:
+                self._ocr_cache.move_to_end(key)
+                self.stats['ocr_cache_hits'] += 1
+                return cached
+            self.stats['ocr_cache_misses'] += 1
+        
+        text = self._run_tesseract(image_bgr)
+        
+        if key is not None:
+            self._cache_ocr_result(key, text)
+        return text
+    
+    def _cache_ocr_result(self, key, text):
+        """Store a non-empty OCR result in the LRU cache."""
+        if text:
+            self._ocr_cache[key] = text
+            if len(self._ocr_cache) > self.ocr_cache_size:
+                self._ocr_cache.popitem(last=False)
+    
+    @staticmethod
+    def build_ocr_montage(images_bgr, padding=12):
+        """
+        Stack crops vertically on a white canvas for a single OCR pass.
+        
+        Returns:
+            (montage, offsets) where offsets[i] is the (top, height) band of crop i
+        """
+        width = max(img.shape[1] for img in images_bgr) + 2 * padding
+        height = sum(img.shape[0] for img in images_bgr) + padding * (len(images_bgr) + 1)
+        montage = np.full((height, width, 3), 255, dtype=np.uint8)
+        
+        offsets = []
+        top = padding
+        for img in images_bgr:
+            h, w = img.shape[:2]
+            montage[top:top + h, padding:padding + w] = img
+            offsets.append((top, h))
+            top += h + padding
+        return montage, offsets
+    
+    def extract_text_batch(self, images_bgr):
+        """
+        Extract text from several crops with one Tesseract call.
+        
+        Uncached crops are packed into a montage and OCRed with word-level boxes
+        (image_to_data); each word is mapped back to the crop whose band contains
+        the word's vertical center.
+        
+        Returns:
+            List of extracted texts, aligned with images_bgr
+        """
+        texts = [None] * len(images_bgr)
+        pending = []  # (position, cache key)
+        for i, img in enumerate(images_bgr):
+            key = None
+            if self.ocr_cache_size > 0:
+                key = self._crop_digest(img)
+                cached = self._ocr_cache.get(key)
+                if cached is not None:
+                    self._ocr_cache.move_to_end(key)
+                    self.stats['ocr_cache_hits'] += 1
+                    texts[i] = cached
+                    continue
+                self.stats['ocr_cache_misses'] += 1
+            pending.append((i, key))
+        
+        if not pending:
+            return texts
+        if len(pending) == 1:
+            i, key = pending[0]
+            texts[i] = self._run_tesseract(images_bgr[i])
+            if key is not None:
+                self._cache_ocr_result(key, texts[i])
+            return texts
+        
+        montage, offsets = self.build_ocr_montage([images_bgr[i] for i, _ in pending])
+        words = [[] for _ in pending]
+        try:
+            pil_image = Image.fromarray(cv2.cvtColor(montage, cv2.COLOR_BGR2RGB))
+            self.stats['ocr_calls'] += 1
+            data = pytesseract.image_to_data(pil_image, output_type=pytesseract.Output.DICT)
+            
+            band_tops = [top for top, _ in offsets]
+            for word, top, height in zip(data['text'], data['top'], data['height']):
+                if not word.strip():
+                    continue
+                center = top + height / 2
+                band = bisect.bisect_right(band_tops, center) - 1
+                if band >= 0 and center < offsets[band][0] + offsets[band][1]:
+                    words[band].append(word.strip())
+        except Exception as e:
+            if self.debug_mode:
+                print(f"Batch OCR Error: {e}")
+        
+        for (i, key), band_words in zip(pending, words):
+            texts[i] = " ".join(band_words)
+            if key is not None:
+                self._cache_ocr_result(key, texts[i])
+        return texts
+    
+    def _run_tesseract(self, image_bgr):
+        """Run Tesseract on a single BGR image."""
         try:
             # Convert BGR to RGB for Tesseract
             image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
@@ -56,6 +736,7 @@ class ColorCapture:
             pil_image = Image.fromarray(image_rgb)
             
             # Extract text using Tesseract
+            self.stats['ocr_calls'] += 1
             text = pytesseract.image_to_string(pil_image)
             
             return text
@@ -64,18 +745,62 @@ class ColorCapture:
                 print(f"OCR Error: {e}")
             return ""
     
-    def contains_target_text(self, image_bgr):
-        """Check if image contains any of the target texts using OCR."""
+    def _search_terms(self):
+        """Search terms as a list (ocr_search_text may be a single string)."""
+        return self.ocr_search_text if isinstance(self.ocr_search_text, list) else [self.ocr_search_text]
+    
+    def match_term(self, text):
+        """Return the first search term contained in text (case-insensitive), or None."""
+        text_lower = text.lower()
+        return next((term for term in self._search_terms() if term.lower() in text_lower), None)
+    
+    def classify_text(self, image_bgr):
+        """
+        Recognize the button label with the local classifier.
+        
+        Returns:
+            True/False if the classifier is confident whether a search term is
+            present, or None if there is no classifier or it is unsure
+        """
+        return self._classify(image_bgr)[0]
+    
+    def _classify(self, image_bgr):
+        """classify_text plus details: (decision, matched term or None, confidence)."""
+        if self.classifier is None:
+            return None, None, 0.0
+        
+        label, confidence = self.classifier.predict(image_bgr)
+        if confidence < self.classifier_min_confidence:
+            self.stats['classifier_fallbacks'] += 1
+            if self.debug_mode:
+                print(f"    Classifier unsure ('{label}', confidence {confidence:.2f}), falling back to OCR")
+            return None, None, confidence
+        
+        self.stats['classifier_decisions'] += 1
+        term = next((term for term in self._search_terms() if term.lower() == label.lower()), None)
+        if self.debug_mode:
+            print(f"    Classifier: '{label}' (confidence {confidence:.2f}) -> {term is not None}")
+        return term is not None, term, confidence
+    
+    def contains_target_text(self, image_bgr, extracted_text=None):
+        """
+        Check if image contains any of the target texts using OCR.
+        
+        Pass extracted_text to reuse text already recognized (e.g. by extract_text_batch).
+        Otherwise a confident local classifier decision is used before Tesseract.
+        """
         if not self.ocr_enabled:
             return True
         
         try:
-            extracted_text = self.extract_text_from_image(image_bgr)
-            extracted_lower = extracted_text.lower()
-            
+            if extracted_text is None:
+                decision = self.classify_text(image_bgr)
+                if decision is not None:
+                    return decision
+                extracted_text = self.extract_text_from_image(image_bgr)
             # Handle both string and list of search terms
-            search_terms = self.ocr_search_text if isinstance(self.ocr_search_text, list) else [self.ocr_search_text]
-            has_text = any(term.lower() in extracted_lower for term in search_terms)
+            search_terms = self._search_terms()
+            has_text = self.match_term(extracted_text) is not None
             
             if self.debug_mode:
                 print(f"    OCR extracted: '{extracted_text.strip()}'")
@@ -88,39 +813,308 @@ class ColorCapture:
                 print(f"OCR check failed: {e}")
             return False
     
-    def find_matching_rectangles(self, screen):
-        """Find all rectangles with background matching the reference color."""
+    def find_matching_rectangles(self, screen, region=None):
+        """
+        Find all rectangles with background matching the reference color.
+        
+        Args:
+            screen: BGR frame
+            region: Optional (x, y, w, h) to search instead of the whole frame
+                (e.g. a newly mapped window); clipped to the frame
+            
+        Returns:
+            (rectangles, mask) with rectangles in frame coordinates; with a
+            region the mask covers only the region (its top-left corner is
+            stored in self.mask_origin)
+        """
         if self.ref_color is None:
             raise ValueError("Reference color not loaded. Call _load_reference_color() first.")
         
-        # Convert ref_color to BGR if it's in RGB
-        ref_color_bgr = (self.ref_color[2], self.ref_color[1], self.ref_color[0])
-        
-        # Create a mask for pixels matching the reference color (within tolerance)
-        lower_bound = np.array([max(0, c - self.color_tolerance) for c in ref_color_bgr])
-        upper_bound = np.array([min(255, c + self.color_tolerance) for c in ref_color_bgr])
+        origin_x = origin_y = 0
+        if region is not None:
+            rx, ry, rw, rh = region
+            origin_x, origin_y = max(0, rx), max(0, ry)
+            end_x, end_y = min(screen.shape[1], rx + rw), min(screen.shape[0], ry + rh)
+            screen = screen[origin_y:max(origin_y, end_y), origin_x:max(origin_x, end_x)]
+        self.mask_origin = (origin_x, origin_y)
+        if screen.size == 0:
+            return [], np.zeros(screen.shape[:2], dtype=np.uint8)
         
-        mask = cv2.inRange(screen, lower_bound, upper_bound)
+        if self.detection_engine == "spans":
+            boxes, mask = self.find_span_boxes(screen)
+            boxes = map(tuple, boxes.tolist())
+        else:
+            mask = self.compute_color_mask(screen)
+            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            boxes = map(cv2.boundingRect, contours)
         
-        # Find contours
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        rectangles = []
-        for contour in contours:
-            x, y, w, h = cv2.boundingRect(contour)
+        if self.reuse_buffers:
+            rectangles = self._candidates  # Refilled in place, valid until the next frame
+            rectangles.clear()
+        else:
+            rectangles = []
+        for x, y, w, h in boxes:
             # Filter out very small rectangles (noise)
             if w > 10 and h > 10:
                 rectangles.append((x, y, w, h))
         
+        if self.shape_prefilter and rectangles:
+            rectangles = self.prefilter_rectangles(mask, rectangles)
+        
+        if origin_x or origin_y:
+            if isinstance(rectangles, CandidateBuffer):
+                rectangles.offset(origin_x, origin_y)
+            else:
+                rectangles = [(x + origin_x, y + origin_y, w, h) for x, y, w, h in rectangles]
+        
         return rectangles, mask
     
-    def process_rectangles(self, screen, rectangles):
+    @staticmethod
+    def score_candidates(mask, rectangles, integral=None):
+        """
+        Compute geometric features for all rectangles at once from the match mask.
+        
+        Box sums come from one integral image, so each feature costs O(1) per
+        rectangle. The integral is 32-bit and may wrap on huge frames; box sums
+        are taken modulo 2**32, which is exact as long as a single box sum fits.
+        
+        Returns:
+            Dict of float arrays: 'aspect' (w/h), 'fill' (matching fraction of the
+            box), 'border_fill' (matching fraction of the outer band, i.e. how
+            rectangular the shape is) and 'text_fraction' (non-matching fraction of
+            the interior, i.e. text pixels)
+        
+        Args:
+            integral: Optional int32 array of shape (rows + 1, cols + 1) to hold the integral image
+        """
+        boxes = np.asarray(rectangles, dtype=np.int64).reshape(-1, 4)
+        x, y, w, h = boxes.T
+        integral = cv2.integral(mask, sum=integral, sdepth=cv2.CV_32S).view(np.uint32)
+        
+        def box_sum(x0, y0, x1, y1):
+            total = (integral[y1, x1].astype(np.int64) - integral[y0, x1]
+                     - integral[y1, x0] + integral[y0, x0])
+            return (total & 0xFFFFFFFF) / 255.0
+        
+        inset = np.maximum(2, np.minimum(w, h) // 5)
+        area = (w * h).astype(np.float64)
+        inner_area = (np.maximum(w - 2 * inset, 1) * np.maximum(h - 2 * inset, 1)).astype(np.float64)
+        
+        outer = box_sum(x, y, x + w, y + h)
+        inner = box_sum(x + inset, y + inset,
+                        np.maximum(x + w - inset, x + inset + 1), np.maximum(y + h - inset, y + inset + 1))
+        
+        return {
+            'aspect': w / np.maximum(h, 1),
+            'fill': outer / area,
+            'border_fill': (outer - inner) / np.maximum(area - inner_area, 1),
+            'text_fraction': 1.0 - inner / inner_area,
+        }
+    
+    def prefilter_rectangles(self, mask, rectangles):
+        """
+        Keep only rectangles shaped like a solid button with text on it.
+        
+        Rejections are counted in self.stats under the first failing check:
+        aspect ratio, shape (low fill, hollow or irregular outline) or text pixels.
+        """
+        integral = self.buffer('integral', (mask.shape[0] + 1, mask.shape[1] + 1), np.int32)
+        features = self.score_candidates(mask, rectangles, integral=integral)
+        min_aspect, max_aspect = self.aspect_range
+        min_text, max_text = self.text_fraction_range
+        
+        bad_aspect = (features['aspect'] < min_aspect) | (features['aspect'] > max_aspect)
+        bad_shape = ~bad_aspect & ((features['fill'] < self.min_fill_ratio)
+                                   | (features['border_fill'] < self.min_border_fill))
+        bad_text = (~bad_aspect & ~bad_shape
+                    & ((features['text_fraction'] < min_text) | (features['text_fraction'] > max_text)))
+        keep = ~(bad_aspect | bad_shape | bad_text)
+        
+        self.stats['prefilter_checked'] += len(rectangles)
+        self.stats['prefilter_rejected_aspect'] += int(bad_aspect.sum())
+        self.stats['prefilter_rejected_shape'] += int(bad_shape.sum())
+        self.stats['prefilter_rejected_text'] += int(bad_text.sum())
+        
+        if self.debug_mode and not keep.all():
+            print(f"  Shape prefilter: kept {int(keep.sum())}/{len(rectangles)} "
+                  f"(aspect: {int(bad_aspect.sum())}, shape: {int(bad_shape.sum())}, "
+                  f"text: {int(bad_text.sum())} rejected)")
+        
+        if isinstance(rectangles, CandidateBuffer):
+            rectangles.keep(keep)
+            return rectangles
+        return [rect for rect, ok in zip(rectangles, keep) if ok]
+    
+    def locate_text(self, crop_mask):
+        """
+        Bounding box of the label inside a button, from the button's match mask.
+        
+        Text pixels are the non-matching pixels enclosed by the button: each lies
+        strictly between the first and last matching pixel of its row and of its
+        column, which excludes rounded corners and background around the button.
+        
+        Args:
+            crop_mask: Match mask (0/255) of the candidate crop
+        
+        Returns:
+            (x0, y0, x1, y1) in crop coordinates, padded by text_padding, or None
+            if fewer than min_text_pixels text pixels were found
+        """
+        matching = crop_mask > 0
+        h, w = matching.shape
+        rows, cols = np.arange(h)[:, None], np.arange(w)[None, :]
+        
+        row_any, col_any = matching.any(axis=1), matching.any(axis=0)
+        first_col = np.where(row_any, matching.argmax(axis=1), w)[:, None]
+        last_col = np.where(row_any, w - 1 - matching[:, ::-1].argmax(axis=1), -1)[:, None]
+        first_row = np.where(col_any, matching.argmax(axis=0), h)[None, :]
+        last_row = np.where(col_any, h - 1 - matching[::-1].argmax(axis=0), -1)[None, :]
+        
+        text = ((cols > first_col) & (cols < last_col) & (rows > first_row) & (rows < last_row)
+                & ~matching)
+        if np.count_nonzero(text) < self.min_text_pixels:
+            return None
+        
+        ys = np.flatnonzero(text.any(axis=1))
+        xs = np.flatnonzero(text.any(axis=0))
+        pad = self.text_padding
+        return (max(0, int(xs[0]) - pad), max(0, int(ys[0]) - pad),
+                min(w, int(xs[-1]) + 1 + pad), min(h, int(ys[-1]) + 1 + pad))
+    
+    def text_region(self, coords, cropped, mask=None, mask_origin=(0, 0)):
+        """
+        The part of a candidate crop to OCR: its localized text box, or the whole crop.
+        
+        Boxes are cached per button location (LRU, max_hotspots entries) with
+        the digest of the crop they were found in, so the same button seen
+        again is cut without looking at the mask; a different label at that
+        location is located afresh.
+        
+        Args:
+            coords: (x, y, w, h) of the crop in frame coordinates
+            cropped: The crop itself
+            mask: Match mask from find_matching_rectangles (None: cached boxes only)
+            mask_origin: Frame coordinates of the mask's top-left corner
+        """
+        digest = crop_digest(cropped)
+        cached = self._text_boxes.get(coords)
+        if cached is not None and cached[0] == digest:
+            box = cached[1]
+            self._text_boxes.move_to_end(coords)
+            self.stats['text_box_cache_hits'] += 1
+        elif mask is not None:
+            x, y, w, h = coords
+            mx, my = x - mask_origin[0], y - mask_origin[1]
+            crop_mask = mask[max(0, my):my + h, max(0, mx):mx + w]
+            if mx < 0 or my < 0 or crop_mask.shape != cropped.shape[:2]:
+                return cropped
+            box = self.locate_text(crop_mask)
+            if box is None:
+                return cropped
+            self._text_boxes[coords] = (digest, box)
+            self._text_boxes.move_to_end(coords)
+            if len(self._text_boxes) > self.max_hotspots:
+                self._text_boxes.popitem(last=False)
+        else:
+            return cropped
+        
+        self.stats['text_localized'] += 1
+        x0, y0, x1, y1 = box
+        return cropped[y0:y1, x0:x1]
+    
+    def candidate_priorities(self, coords_list, mask=None, mask_origin=(0, 0)):
+        """
+        Score candidates by how likely they are buttons; higher is OCRed first.
+        
+        Sums three cues: closeness of the size to typical buttons (the median
+        hotspot size, else typical_button_size) in log space, the log hit count
+        of a hotspot at the same location, and, given the mask, the shape
+        prefilter's border fill for boxes with a plausible amount of text.
+        Candidates deferred by the OCR budget last frame get +1 so they are
+        not starved by newer ones.
+        """
+        boxes = np.asarray(coords_list, dtype=np.int64).reshape(-1, 4)
+        if self.hotspots:
+            typical_w, typical_h = np.median([(w, h) for _, _, w, h in self.hotspots], axis=0)
+        else:
+            typical_w, typical_h = self.typical_button_size
+        size_score = np.exp(-(np.abs(np.log(boxes[:, 2] / typical_w)) + np.abs(np.log(boxes[:, 3] / typical_h))))
+        
+        keys = [tuple(int(v) for v in box) for box in boxes]
+        hotspot_score = np.log1p([self.hotspots.get(key, 0) for key in keys])
+        deferred_bonus = np.array([1.0 if key in self._deferred else 0.0 for key in keys])
+        
+        shape_score = np.zeros(len(boxes))
+        if mask is not None:
+            local = boxes - np.array([mask_origin[0], mask_origin[1], 0, 0])
+            inside = ((local[:, 0] >= 0) & (local[:, 1] >= 0)
+                      & (local[:, 0] + local[:, 2] <= mask.shape[1]) & (local[:, 1] + local[:, 3] <= mask.shape[0]))
+            if inside.any():
+                integral = self.buffer('integral', (mask.shape[0] + 1, mask.shape[1] + 1), np.int32)
+                features = self.score_candidates(mask, local[inside], integral=integral)
+                min_text, max_text = self.text_fraction_range
+                has_text = (features['text_fraction'] >= min_text) & (features['text_fraction'] <= max_text)
+                shape_score[inside] = features['border_fill'] * has_text
+        
+        return size_score + hotspot_score + shape_score + deferred_bonus
+    
+    def _ocr_within_budget(self, positions, images):
+        """
+        OCR images[i] for i in positions, in order, until ocr_budget_ms is spent.
+        
+        At least one crop is always OCRed. In batch mode each montage holds as
+        many crops as the remaining budget allows at the measured cost per crop.
+        
+        Returns:
+            (texts, deferred): dict of position -> text, and the positions left unread
+        """
+        texts = {}
+        pending = list(positions)
+        start = self._clock()
+        while pending:
+            remaining_ms = None
+            if self.ocr_budget_ms is not None:
+                remaining_ms = self.ocr_budget_ms - (self._clock() - start) * 1000
+                if remaining_ms <= 0 and texts:
+                    break
+            
+            if self.batch_ocr and len(pending) > 1:
+                count = len(pending)
+                if remaining_ms is not None:
+                    count = max(1, min(count, int(remaining_ms / self._ocr_ms_per_crop)))
+            else:
+                count = 1
+            chunk, pending = pending[:count], pending[count:]
+            
+            calls = self.stats['ocr_calls']
+            chunk_start = self._clock()
+            if len(chunk) > 1:
+                results = self.extract_text_batch([images[i] for i in chunk])
+            else:
+                results = [self.extract_text_from_image(images[chunk[0]])]
+            if self.stats['ocr_calls'] > calls:  # Cache hits say nothing about Tesseract's cost
+                measured = (self._clock() - chunk_start) * 1000 / len(chunk)
+                self._ocr_ms_per_crop = 0.7 * self._ocr_ms_per_crop + 0.3 * measured
+            texts.update(zip(chunk, results))
+        return texts, pending
+    
+    def process_rectangles(self, screen, rectangles, mask=None, mask_origin=(0, 0)):
         """
         Process rectangles: filter by size and OCR, collect valid ones in memory.
         Only runs OCR on rectangles within size constraints: 60px < w < 200px and 20px < h < 50px
-        Returns only rectangles that pass both size and OCR filters.
+        Returns only rectangles that pass both size and OCR filters, as
+        DetectionRecords whose crops are views into screen.
+        
+        With localize_text, pass the mask (and mask_origin) returned by
+        find_matching_rectangles so Tesseract only sees each button's text box.
+        
+        With OCR enabled, candidates are handled in candidate_priorities order
+        (so are the returned detections); with ocr_budget_ms, candidates left
+        over when the budget is spent are skipped this frame and ranked first
+        in the next one.
         """
         valid_captures = []
+        candidates = []  # (index, coords, crop) within the size range
         
         for idx, (x, y, w, h) in enumerate(rectangles):
             # Ensure coordinates are within bounds
@@ -133,26 +1127,71 @@ class ColorCapture:
             cropped = screen[y:y+h, x:x+w]
             
             if cropped.size > 0:
-                if self.debug_mode:
-                    print(f"  Rectangle [{idx}] at ({x}, {y}) size {w}x{h}:")
-                
                 # Check size constraints (only run OCR if within size range)
                 if 60 < w < 200 and 20 < h < 50:
-                    # Check OCR filter
-                    if self.contains_target_text(cropped):
-                        valid_captures.append({
-                            'image': cropped,
-                            'coords': (x, y, w, h),
-                            'index': idx
-                        })
-                        if self.debug_mode:
-                            print(f"    [PASS] size {w}x{h} within range, OCR passed, will be stored")
-                    else:
-                        if self.debug_mode:
-                            print(f"    [FAIL] size {w}x{h} within range, but OCR failed")
-                else:
-                    if self.debug_mode:
-                        print(f"    [SKIP] size {w}x{h} outside range (60<w<200, 20<h<50)")
+                    candidates.append((idx, (x, y, w, h), cropped))
+                elif self.debug_mode:
+                    print(f"  Rectangle [{idx}] at ({x}, {y}) size {w}x{h}:")
+                    print(f"    [SKIP] size {w}x{h} outside range (60<w<200, 20<h<50)")
+        
+        # Most likely buttons first, so a budget-limited frame still reads them
+        if self.ocr_enabled and len(candidates) > 1:
+            priorities = self.candidate_priorities([coords for _, coords, _ in candidates], mask, mask_origin)
+            candidates = [candidates[i] for i in np.argsort(-priorities, kind='stable')]
+        
+        # Confident classifier decisions first; only the rest needs Tesseract
+        decisions = [(None, None, 0.0)] * len(candidates)
+        if self.ocr_enabled and self.classifier is not None:
+            decisions = [self._classify(cropped) for _, _, cropped in candidates]
+        
+        # One Tesseract call per montage in batch mode, within the frame's OCR budget
+        texts = [None] * len(candidates)
+        deferred = set()
+        undecided = [i for i, (decision, _, _) in enumerate(decisions) if decision is None]
+        if self.ocr_enabled and undecided:
+            ocr_images = {}
+            for i in undecided:
+                _, coords, cropped = candidates[i]
+                ocr_images[i] = (self.text_region(coords, cropped, mask, mask_origin)
+                                 if self.localize_text else cropped)
+            ocr_texts, deferred = self._ocr_within_budget(undecided, ocr_images)
+            for i, text in ocr_texts.items():
+                texts[i] = text
+            deferred = set(deferred)
+            self.stats['ocr_deferred'] += len(deferred)
+        self._deferred = {candidates[i][1] for i in deferred}  # Empty unless this frame deferred some
+        
+        for position, ((idx, (x, y, w, h), cropped), (decision, term, confidence), text) in enumerate(
+                zip(candidates, decisions, texts)):
+            if self.debug_mode:
+                print(f"  Rectangle [{idx}] at ({x}, {y}) size {w}x{h}:")
+            if position in deferred:
+                if self.debug_mode:
+                    print(f"    [DEFER] OCR budget of {self.ocr_budget_ms}ms spent, retrying next frame")
+                continue
+            
+            # Check OCR filter
+            score = confidence
+            if decision is not None:
+                passed = decision
+            else:
+                passed = self.contains_target_text(cropped, extracted_text=text)
+                if passed and text is not None:
+                    term, score = self.match_term(text), 1.0
+                elif passed:
+                    score = 1.0  # OCR disabled
+            if passed:
+                self._record_hotspot((x, y, w, h))
+                if self.adapt_rate > 0:
+                    self._adapt_reference(cropped)
+                valid_captures.append(DetectionRecord(screen, (x, y, w, h), idx, score=score, term=term))
+                if self.debug_mode:
+                    print(f"    [PASS] size {w}x{h} within range, OCR passed, will be stored")
+            else:
+                if decision is None:
+                    self._text_boxes.pop((x, y, w, h), None)  # A box that cut the label would keep failing
+                if self.debug_mode:
+                    print(f"    [FAIL] size {w}x{h} within range, but OCR failed")
         
         return valid_captures
     
@@ -235,3 +1274,102 @@ class ColorCapture:
                 print(f"  Final click completed")
         
         return click_count
+    
+    def grab_region(self, coords):
+        """Screenshot just the (x, y, w, h) region, as BGR."""
+        x, y, w, h = coords
+        screenshot = pyautogui.screenshot(region=(x, y, w, h))
+        return cv2.cvtColor(np.asarray(screenshot), cv2.COLOR_RGB2BGR)
+    
+    def is_dismissed(self, region_bgr, dismiss_fill_ratio=0.3, unchanged_from=None):
+        """
+        Check whether a clicked button is gone from a freshly grabbed region.
+        
+        Gone means less than dismiss_fill_ratio of the region still matches the
+        reference color or, with OCR enabled, the search text is no longer there.
+        The color check comes first; OCR only runs while the color is still
+        present and the pixels differ from unchanged_from (the previous grab
+        of the same region), since identical pixels still show the same text.
+        """
+        if region_bgr.size == 0:
+            return True
+        mask = self.compute_color_mask(region_bgr, buffer_prefix="verify_")
+        fill = cv2.countNonZero(mask) / (region_bgr.shape[0] * region_bgr.shape[1])
+        if fill < dismiss_fill_ratio:
+            return True
+        if not self.ocr_enabled:
+            return False
+        if unchanged_from is not None and np.array_equal(unchanged_from, region_bgr):
+            return False
+        return not self.contains_target_text(region_bgr)
+    
+    def click_and_verify(self, valid_captures, verify_interval=0.1, verify_timeout=1.0, max_attempts=2):
+        """
+        Click the captures, then re-grab only their regions until the buttons disappear.
+        
+        Buttons still present after verify_timeout are clicked again, up to
+        max_attempts clicks in total. Outcomes are counted in self.stats
+        (clicks_verified, clicks_unverified, click_retries) and click-to-dismiss
+        latencies in self.dismiss_latencies_ms.
+        
+        Args:
+            valid_captures: Records/dicts with a 'coords' key
+            verify_interval: Seconds between region re-grabs
+            verify_timeout: Seconds to wait for a dismissal after each click
+            max_attempts: Max clicks per button
+            
+        Returns:
+            Number of buttons confirmed dismissed
+        """
+        pending = list(valid_captures)
+        last_seen = {id(capture): capture.get('image') for capture in pending}  # Pixels last checked
+        verified = 0
+        first_click = None
+        for attempt in range(max_attempts):
+            if not pending:
+                break
+            if attempt > 0:
+                self.stats['click_retries'] += len(pending)
+                if self.debug_mode:
+                    print(f"  [RETRY] {len(pending)} button(s) still visible, clicking again "
+                          f"(attempt {attempt + 1}/{max_attempts})")
+            self.click_captures(pending)
+            clicked_at = time.perf_counter()
+            if first_click is None:
+                first_click = clicked_at
+            
+            while pending and time.perf_counter() - clicked_at < verify_timeout:
+                time.sleep(verify_interval)
+                still_visible = []
+                for capture in pending:
+                    region = self.grab_region(capture['coords'])
+                    dismissed = self.is_dismissed(region, unchanged_from=last_seen.get(id(capture)))
+                    last_seen[id(capture)] = region
+                    if dismissed:
+                        latency_ms = (time.perf_counter() - first_click) * 1000
+                        self.dismiss_latencies_ms.append(latency_ms)
+                        verified += 1
+                        if self.debug_mode:
+                            print(f"  [OK] Button at {capture['coords']} dismissed after {latency_ms:.0f}ms")
+                    else:
+                        still_visible.append(capture)
+                pending = still_visible
+        
+        self.stats['clicks_verified'] += verified
+        self.stats['clicks_unverified'] += len(pending)
+        if pending and self.debug_mode:
+            print(f"  [WARNING] {len(pending)} button(s) still visible after {max_attempts} attempt(s)")
+        return verified
+    
+    def click_stats(self):
+        """Return click success rate and click-to-dismiss latency statistics."""
+        attempted = self.stats['clicks_verified'] + self.stats['clicks_unverified']
+        latencies = sorted(self.dismiss_latencies_ms)
+        return {
+            'clicks_verified': self.stats['clicks_verified'],
+            'clicks_unverified': self.stats['clicks_unverified'],
+            'click_retries': self.stats['click_retries'],
+            'success_rate': self.stats['clicks_verified'] / attempted if attempted else None,
+            'dismiss_latency_median_ms': latencies[len(latencies) // 2] if latencies else None,
+            'dismiss_latency_p95_ms': latencies[math.ceil(0.95 * len(latencies)) - 1] if latencies else None,
+        }
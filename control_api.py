@@ -0,0 +1,328 @@
+"""
+Control API - Local HTTP/JSON endpoint for observing and steering the capture loop
+
+The capture loop and the server never share mutable objects: after every
+iteration the loop hands a finished snapshot (detections, stage timings,
+cache stats) to RuntimeState, and the server only reads those snapshots and
+sets flags that the loop picks up at its next iteration. The server runs its
+own asyncio event loop in a daemon thread and binds to loopback only.
+asyncio is imported when the server starts, so the capture loop (which always
+uses RuntimeState) does not pay for it unless --control-port is given.
+
+Binding to loopback does not stop a web page in the user's browser from
+reaching the API, so requests are refused (403) unless their Host header
+names a loopback address and this port (defeats DNS rebinding) and any
+Origin header is a loopback origin (defeats cross-site form/fetch POSTs).
+
+Endpoints:
+    GET  /status         paused flag, poll interval, iteration
+    GET  /detections     detections of the last completed iteration
+    GET  /stats          per-stage latency (last, median, p95 in ms)
+    GET  /cache          OCR cache and hotspot statistics
+    GET  /clicks         click success rate and click-to-dismiss latency
+    POST /pause          stop scanning until /resume
+    POST /resume
+    POST /scan           run one scan immediately (also while paused)
+    POST /poll-interval  {"seconds": 0.5} ({"seconds": null} restores the default)
+
+Usage:
+    python color_capture.py --control-port 8765
+    curl -X POST http://127.0.0.1:8765/pause
+"""
+import ipaddress
+import json
+import math
+import statistics
+import threading
+import time
+from collections import deque
+
+MAX_BODY_BYTES = 64 * 1024
+_REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large"}
+_LOOPBACK_NAMES = ("127.0.0.1", "localhost", "[::1]")
+
+
+class RuntimeState:
+    """Thread-safe hand-off between the capture loop and the control server."""
+
+    def __init__(self, poll_interval, history_size=120):
+        self.default_poll_interval = poll_interval
+        self._poll_interval = None  # Override set through the API
+        self._paused = False
+        self._scan_requested = False
+        self._wake = False
+        self._iteration = 0
+        self._timestamp = None
+        self._detections = []
+        self._cache = {}
+        self._clicks = {}
+        self._stage_history = {}  # stage name -> deque of recent durations (ms)
+        self._history_size = history_size
+        self._condition = threading.Condition()
+
+    @property
+    def paused(self):
+        with self._condition:
+            return self._paused
+
+    @property
+    def poll_interval(self):
+        with self._condition:
+            return self._poll_interval if self._poll_interval is not None else self.default_poll_interval
+
+    def _set(self, **flags):
+        with self._condition:
+            for name, value in flags.items():
+                setattr(self, name, value)
+            self._wake = True
+            self._condition.notify_all()
+
+    def pause(self):
+        self._set(_paused=True)
+
+    def resume(self):
+        self._set(_paused=False)
+
+    def request_scan(self):
+        self._set(_scan_requested=True)
+
+    def wake(self):
+        """Cut the capture loop's current sleep short (e.g. on a window event)."""
+        self._set()
+
+    def set_poll_interval(self, seconds):
+        """
+        Override the poll interval (None restores the default).
+
+        Raises:
+            ValueError: If seconds is not a positive number
+        """
+        if seconds is not None:
+            if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or seconds <= 0:
+                raise ValueError("seconds must be a positive number or null")
+            seconds = float(seconds)
+        self._set(_poll_interval=seconds)
+
+    def consume_scan_request(self):
+        """Return True (once) if a scan was forced since the last call."""
+        with self._condition:
+            requested = self._scan_requested
+            self._scan_requested = False
+            return requested
+
+    def wait(self, timeout):
+        """Sleep up to timeout seconds, returning early when a control changes."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._wake, timeout)
+            self._wake = False
+
+    def record_iteration(self, iteration, detections, stage_ms, cache=None, clicks=None):
+        """
+        Publish the results of a finished iteration.
+
+        Args:
+            iteration: Iteration number
+            detections: DetectionRecords (or capture dicts) from process_rectangles
+            stage_ms: Dict of stage name -> duration in milliseconds
+            cache: Optional dict of cache statistics (ColorCapture.cache_stats())
+            clicks: Optional dict of click statistics (ColorCapture.click_stats())
+        """
+        summary = [{'coords': [int(v) for v in d['coords']], 'index': int(d['index']),
+                    'score': d.get('score'), 'term': d.get('term')} for d in detections]
+        with self._condition:
+            self._iteration = iteration
+            self._timestamp = time.time()
+            self._detections = summary
+            if cache is not None:
+                self._cache = dict(cache)
+            if clicks is not None:
+                self._clicks = dict(clicks)
+            for stage, duration in stage_ms.items():
+                history = self._stage_history.get(stage)
+                if history is None:
+                    history = self._stage_history[stage] = deque(maxlen=self._history_size)
+                history.append(duration)
+
+    def status(self):
+        with self._condition:
+            return {
+                'paused': self._paused,
+                'poll_interval': (self._poll_interval if self._poll_interval is not None
+                                  else self.default_poll_interval),
+                'iteration': self._iteration,
+                'last_iteration_at': self._timestamp,
+            }
+
+    def detections(self):
+        with self._condition:
+            return {'iteration': self._iteration, 'timestamp': self._timestamp,
+                    'detections': list(self._detections)}
+
+    def stage_stats(self):
+        with self._condition:
+            histories = {stage: sorted(history) for stage, history in self._stage_history.items()}
+            last = {stage: history[-1] for stage, history in self._stage_history.items()}
+        return {
+            stage: {
+                'last_ms': round(last[stage], 2),
+                'median_ms': round(statistics.median(values), 2),
+                'p95_ms': round(values[math.ceil(0.95 * len(values)) - 1], 2),
+                'samples': len(values),
+            }
+            for stage, values in histories.items()
+        }
+
+    def cache_stats(self):
+        with self._condition:
+            return dict(self._cache)
+
+    def click_stats(self):
+        with self._condition:
+            return dict(self._clicks)
+
+
+class ControlServer:
+    """Minimal HTTP/1.1 JSON server for a RuntimeState, running in a background thread."""
+
+    def __init__(self, state, host="127.0.0.1", port=0):
+        if not ipaddress.ip_address(host).is_loopback:
+            raise ValueError(f"Control API must bind to a loopback address, got {host}")
+        self.state = state
+        self.host = host
+        self.port = port  # 0 picks a free port; the bound port is stored on start()
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._routes = {
+            ('GET', '/status'): lambda body: state.status(),
+            ('GET', '/detections'): lambda body: state.detections(),
+            ('GET', '/stats'): lambda body: state.stage_stats(),
+            ('GET', '/cache'): lambda body: state.cache_stats(),
+            ('GET', '/clicks'): lambda body: state.click_stats(),
+            ('POST', '/pause'): lambda body: self._control(state.pause),
+            ('POST', '/resume'): lambda body: self._control(state.resume),
+            ('POST', '/scan'): lambda body: self._control(state.request_scan),
+            ('POST', '/poll-interval'): self._set_poll_interval,
+        }
+
+    def _control(self, action):
+        action()
+        return self.state.status()
+
+    def _set_poll_interval(self, body):
+        if not isinstance(body, dict) or 'seconds' not in body:
+            raise ValueError('Expected a JSON body like {"seconds": 0.5}')
+        self.state.set_poll_interval(body['seconds'])
+        return self.state.status()
+
+    def start(self):
+        """Start serving; returns once the socket is bound."""
+        import asyncio
+
+        ready = threading.Event()
+        errors = []
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._server = self._loop.run_until_complete(
+                    asyncio.start_server(self._handle, self.host, self.port))
+            except OSError as e:
+                errors.append(e)
+                ready.set()
+                self._loop.close()
+                return
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            try:
+                self._loop.run_forever()
+            finally:
+                self._server.close()
+                self._loop.run_until_complete(self._server.wait_closed())
+                self._loop.close()
+
+        self._thread = threading.Thread(target=serve, name="control-api", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        return self
+
+    def stop(self):
+        """Stop the server thread."""
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    async def _handle(self, reader, writer):
+        import asyncio  # Already loaded by start()
+
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0) or 0)
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': "request body too large"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                if self._allowed(headers):
+                    status, payload = self._dispatch(parts, body)
+                else:
+                    status, payload = 403, {'error': "requests must come from a loopback host and origin"}
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self._respond(writer, status, payload, close=not keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _allowed(self, headers):
+        """True if Host is loopback:port and Origin, when sent, is a loopback origin on this port."""
+        allowed_hosts = {f"{name}:{self.port}" for name in _LOOPBACK_NAMES}
+        if headers.get('host', '').lower() not in allowed_hosts:
+            return False
+        origin = headers.get('origin')
+        return origin is None or origin.lower() in {f"http://{host}" for host in allowed_hosts}
+
+    def _dispatch(self, parts, body):
+        if len(parts) < 2:
+            return 400, {'error': "malformed request line"}
+        method, path = parts[0].upper(), parts[1].split('?', 1)[0]
+        handler = self._routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self._routes):
+                return 405, {'error': f"{method} not allowed on {path}"}
+            return 404, {'error': f"unknown endpoint {path}"}
+        try:
+            data = json.loads(body) if body else None
+            return 200, handler(data)
+        except ValueError as e:
+            return 400, {'error': str(e)}
+
+    @staticmethod
+    async def _respond(writer, status, payload, close=False):
+        data = json.dumps(payload).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + data)
+        await writer.drain()
@@ -0,0 +1,349 @@
+"""
+Detection Service - Share one capture loop's frames and detections across processes
+
+One capture process grabs the screen and runs detection; consumers on the same
+host (clicker, auditor, recorder, ...) read the latest frame and detections
+from shared memory instead of taking their own screenshots and running their
+own OCR.
+
+Shared memory blocks (both guarded by a seqlock: the sequence number is odd
+while the writer is updating the block, and readers retry until they see the
+same even sequence before and after copying):
+    <name>_frame     header <QIIId> (seq, height, width, channels, timestamp) + BGR pixels
+    <name>_results   header <QI> (seq, length) + UTF-8 JSON list of detections
+
+Subscribers connect to a multiprocessing.connection listener and receive a
+small (seq, timestamp, detection_count) message after each publish. Each
+subscriber has its own sender thread and a short queue that drops the oldest
+message when full, so a subscriber that stops reading only misses
+notifications (the shared memory always holds the latest publication) and
+never blocks publish() on the capture thread.
+
+A frame larger than the frame block is not shared (its detections still are),
+so the frame's seq then lags the detections' seq. The capture loop sizes the
+block from its first frame. Blocks and the socket left behind by a killed
+service are removed when a service with the same name starts.
+
+Usage:
+    python color_capture.py --serve           # capture process
+    python detection_service.py watch         # example consumer: print detections
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+FRAME_HEADER = struct.Struct("<QIIId")
+RESULTS_HEADER = struct.Struct("<QI")
+DEFAULT_MAX_FRAME_SHAPE = (2160, 3840, 3)  # 4K BGR
+DEFAULT_RESULTS_SIZE = 256 * 1024
+DEFAULT_AUTHKEY = b"allow-clicker-detections"
+NOTIFY_QUEUE_SIZE = 16  # Notifications buffered per subscriber before the oldest is dropped
+
+
+def default_address(name):
+    """Local-only listener address for a service name (named pipe or Unix socket)."""
+    if sys.platform == "win32":
+        return rf"\\.\pipe\{name}"
+    return os.path.join(tempfile.gettempdir(), f"{name}.sock")
+
+
+def _attach_shared_memory(name):
+    """Attach to an existing block without letting this process's resource tracker unlink it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 has no track argument
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+def _unlink_stale_shared_memory(name):
+    """Remove a block left behind by a service that was killed before close()."""
+    try:
+        stale = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return False
+    stale.close()
+    stale.unlink()
+    return True
+
+
+class _Subscriber:
+    """A subscriber connection fed by its own sender thread from a drop-oldest queue."""
+
+    def __init__(self, conn, queue_size=NOTIFY_QUEUE_SIZE):
+        self.conn = conn
+        self.pending = deque(maxlen=queue_size)
+        self.dropped = 0  # Notifications discarded because the subscriber fell behind
+        self.alive = True
+        self._ready = threading.Condition()
+        self._thread = threading.Thread(target=self._send_loop, name="detection-notify", daemon=True)
+        self._thread.start()
+
+    def put(self, message):
+        """Queue a notification without blocking, dropping the oldest one if the queue is full."""
+        with self._ready:
+            if len(self.pending) == self.pending.maxlen:
+                self.dropped += 1
+            self.pending.append(message)
+            self._ready.notify()
+
+    def _send_loop(self):
+        # Only this thread touches the connection, so a send blocked on a full
+        # socket buffer never races with a close from the capture thread
+        while True:
+            with self._ready:
+                while self.alive and not self.pending:
+                    self._ready.wait()
+                if not self.alive:
+                    break
+                message = self.pending.popleft()
+            try:
+                self.conn.send(message)
+            except (OSError, EOFError):
+                break
+        self.alive = False
+        self.conn.close()
+
+    def close(self):
+        """Stop the sender; the connection is closed once any send in progress returns."""
+        with self._ready:
+            self.alive = False
+            self._ready.notify()
+
+
+class DetectionService:
+    """Publishes frames and detection results to shared memory for local subscribers."""
+
+    def __init__(self, name="allow_clicker", max_frame_shape=DEFAULT_MAX_FRAME_SHAPE,
+                 results_size=DEFAULT_RESULTS_SIZE, address=None, authkey=DEFAULT_AUTHKEY):
+        self.name = name
+        self.max_frame_shape = tuple(max_frame_shape)
+        self.address = address or default_address(name)
+        self.seq = 0
+        self._oversize_warned = False
+
+        for block in (f"{name}_frame", f"{name}_results"):
+            if _unlink_stale_shared_memory(block):
+                print(f"[WARNING] Removed stale shared memory block '{block}' from a previous run")
+        frame_bytes = FRAME_HEADER.size + int(np.prod(self.max_frame_shape))
+        self._frame_shm = shared_memory.SharedMemory(name=f"{name}_frame", create=True, size=frame_bytes)
+        self._results_shm = shared_memory.SharedMemory(name=f"{name}_results", create=True,
+                                                       size=RESULTS_HEADER.size + results_size)
+        FRAME_HEADER.pack_into(self._frame_shm.buf, 0, 0, 0, 0, 0, 0.0)
+        RESULTS_HEADER.pack_into(self._results_shm.buf, 0, 0, 0)
+
+        if sys.platform != "win32" and os.path.exists(self.address):
+            os.unlink(self.address)  # Stale socket from a crashed service
+        self._listener = Listener(self.address, authkey=authkey)
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._accept_thread = threading.Thread(target=self._accept_loop, name="detection-accept", daemon=True)
+        self._accept_thread.start()
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return sum(1 for subscriber in self._subscribers if subscriber.alive)
+
+    def _accept_loop(self):
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError):
+                if self._closed:
+                    return
+                continue  # Failed handshake (e.g. wrong authkey); keep serving
+            with self._lock:
+                self._subscribers.append(_Subscriber(conn))
+
+    def publish(self, screen, detections):
+        """
+        Publish a frame and its detections, then notify subscribers.
+
+        Args:
+            screen: BGR frame (uint8); frames larger than max_frame_shape are
+                skipped with a warning and only the detections are published
+            detections: DetectionRecords (or capture dicts) from process_rectangles
+
+        Returns:
+            The sequence number of this publication
+        """
+        height, width = screen.shape[:2]
+        channels = screen.shape[2] if screen.ndim == 3 else 1
+        frame_fits = height * width * channels <= int(np.prod(self.max_frame_shape))
+        if not frame_fits and not self._oversize_warned:
+            self._oversize_warned = True
+            print(f"[WARNING] Frame {screen.shape} exceeds shared memory capacity {self.max_frame_shape}; "
+                  f"publishing detections only")
+
+        payload = json.dumps([self._detection_to_json(d) for d in detections]).encode('utf-8')
+        if len(payload) > self._results_shm.size - RESULTS_HEADER.size:
+            raise ValueError(f"Detection payload of {len(payload)} bytes exceeds shared memory capacity")
+
+        self.seq += 2
+        timestamp = time.time()
+
+        if frame_fits:
+            frame_buf = self._frame_shm.buf
+            FRAME_HEADER.pack_into(frame_buf, 0, self.seq - 1, height, width, channels, timestamp)
+            pixels = np.ndarray(screen.shape, dtype=np.uint8, buffer=frame_buf, offset=FRAME_HEADER.size)
+            pixels[...] = screen
+            FRAME_HEADER.pack_into(frame_buf, 0, self.seq, height, width, channels, timestamp)
+
+        results_buf = self._results_shm.buf
+        RESULTS_HEADER.pack_into(results_buf, 0, self.seq - 1, len(payload))
+        results_buf[RESULTS_HEADER.size:RESULTS_HEADER.size + len(payload)] = payload
+        RESULTS_HEADER.pack_into(results_buf, 0, self.seq, len(payload))
+
+        self._notify((self.seq, timestamp, len(detections)))
+        return self.seq
+
+    @staticmethod
+    def _detection_to_json(detection):
+        return {
+            'coords': [int(v) for v in detection['coords']],
+            'index': int(detection['index']),
+            'score': detection.get('score'),
+            'term': detection.get('term'),
+        }
+
+    def _notify(self, message):
+        with self._lock:
+            self._subscribers = [subscriber for subscriber in self._subscribers if subscriber.alive]
+            for subscriber in self._subscribers:
+                subscriber.put(message)
+
+    def close(self):
+        """Stop accepting subscribers and release the shared memory blocks."""
+        if self._closed:
+            return
+        self._closed = True
+        self._listener.close()
+        with self._lock:
+            for subscriber in self._subscribers:
+                subscriber.close()
+            self._subscribers = []
+        for shm in (self._frame_shm, self._results_shm):
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class DetectionClient:
+    """Subscribes to a DetectionService and reads its latest frame and detections."""
+
+    def __init__(self, name="allow_clicker", address=None, authkey=DEFAULT_AUTHKEY):
+        self.name = name
+        self._conn = Client(address or default_address(name), authkey=authkey)
+        self._frame_shm = _attach_shared_memory(f"{name}_frame")
+        self._results_shm = _attach_shared_memory(f"{name}_results")
+
+    def wait(self, timeout=None):
+        """
+        Block until the next publication.
+
+        Returns:
+            (seq, timestamp, detection_count), or None on timeout
+        """
+        if not self._conn.poll(timeout):
+            return None
+        return self._conn.recv()
+
+    def read_frame(self, retries=100):
+        """
+        Copy the latest frame out of shared memory.
+
+        Returns:
+            (seq, frame) or (0, None) if nothing was published yet
+
+        Raises:
+            RuntimeError: If a consistent copy could not be taken within retries
+        """
+        buf = self._frame_shm.buf
+        for _ in range(retries):
+            seq, height, width, channels, _ = FRAME_HEADER.unpack_from(buf, 0)
+            if seq == 0:
+                return 0, None
+            if seq % 2:
+                continue
+            shape = (height, width, channels) if channels > 1 else (height, width)
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=buf, offset=FRAME_HEADER.size).copy()
+            if FRAME_HEADER.unpack_from(buf, 0)[0] == seq:
+                return seq, frame
+        raise RuntimeError("Frame kept changing while reading; publisher too fast?")
+
+    def read_detections(self, retries=100):
+        """
+        Read the latest detection results.
+
+        Returns:
+            (seq, detections) where detections is a list of dicts with 'coords', 'index', 'score' and 'term'
+        """
+        buf = self._results_shm.buf
+        for _ in range(retries):
+            seq, length = RESULTS_HEADER.unpack_from(buf, 0)
+            if seq == 0:
+                return 0, []
+            if seq % 2:
+                continue
+            payload = bytes(buf[RESULTS_HEADER.size:RESULTS_HEADER.size + length])
+            if RESULTS_HEADER.unpack_from(buf, 0)[0] == seq:
+                return seq, json.loads(payload.decode('utf-8'))
+        raise RuntimeError("Detections kept changing while reading; publisher too fast?")
+
+    def close(self):
+        self._conn.close()
+        self._frame_shm.close()
+        self._results_shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    """Example consumer: print each publication's detections."""
+    parser = argparse.ArgumentParser(description="Subscribe to a running detection service")
+    parser.add_argument('command', choices=['watch'])
+    parser.add_argument('--name', type=str, default="allow_clicker",
+                        help='Service name passed to DetectionService (default: allow_clicker)')
+    args = parser.parse_args()
+
+    with DetectionClient(args.name) as client:
+        print(f"[OK] Subscribed to '{args.name}'")
+        try:
+            while True:
+                message = client.wait()
+                seq, detections = client.read_detections()
+                lag_ms = (time.time() - message[1]) * 1000
+                coords = ", ".join(str(tuple(d['coords'])) for d in detections) or "none"
+                print(f"[INFO] seq={seq} lag={lag_ms:.1f}ms detections: {coords}")
+        except (KeyboardInterrupt, EOFError):
+            print("\nStopped.")
+
+
+if __name__ == "__main__":
+    main()
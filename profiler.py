@@ -0,0 +1,164 @@
+"""
+Profiler - Stack sampling for slow capture-loop iterations
+
+SlowIterationProfiler samples the capture thread's Python stack from a
+background thread, but only once an iteration has already been running for
+start_after_ms (half the threshold by default). Normal iterations finish
+before that and cost nothing beyond two method calls; iterations that end
+above threshold_ms are written as collapsed stacks ("frame;frame;frame count"
+lines), the input format of flamegraph.pl, speedscope and inferno:
+
+    profiles/iteration_000042_850ms.folded   one slow iteration
+    profiles/slow_iterations.folded          all slow iterations appended
+
+The root frame of every stack is the pipeline stage (stage:grab,
+stage:detect, ...) set through StageTimer, so flame graphs group by stage.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+AGGREGATE_FILE = "slow_iterations.folded"
+
+
+class SlowIterationProfiler:
+    """Samples the capture thread's stack during iterations that run long."""
+
+    def __init__(self, output_dir, threshold_ms=500, start_after_ms=None, interval_ms=5, max_files=50,
+                 debug_mode=True):
+        self.output_dir = Path(output_dir)
+        self.threshold_ms = threshold_ms  # Iterations at least this long are written out
+        self.start_after_ms = threshold_ms / 2 if start_after_ms is None else start_after_ms
+        self.interval = interval_ms / 1000  # Seconds between samples once sampling started
+        self.max_files = max_files  # Per-iteration files kept (oldest deleted first)
+        self.debug_mode = debug_mode
+        self.stage = "other"  # Current pipeline stage, root frame of the samples
+        self.slow_iterations = 0
+        self._samples = Counter()
+        self._iteration = None
+        self._start = None
+        self._target_thread = None
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._stop = False
+        self._sampler = threading.Thread(target=self._sample_loop, name="slow-iteration-sampler", daemon=True)
+        self._sampler.start()
+
+    def begin_iteration(self, iteration):
+        """Start timing an iteration of the calling thread."""
+        with self._lock:
+            self._iteration = iteration
+            self._start = time.perf_counter()
+            self._target_thread = threading.get_ident()
+            self._samples = Counter()
+            self.stage = "other"
+        self._active.set()
+
+    def end_iteration(self):
+        """
+        Stop timing the current iteration and write its samples if it was slow.
+
+        Returns:
+            Path of the written .folded file, or None
+        """
+        self._active.clear()
+        with self._lock:
+            if self._start is None:
+                return None
+            elapsed_ms = (time.perf_counter() - self._start) * 1000
+            iteration, samples = self._iteration, self._samples
+            self._start = None
+        if elapsed_ms < self.threshold_ms or not samples:
+            return None
+
+        self.slow_iterations += 1
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        lines = "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+        path = self.output_dir / f"iteration_{iteration:06d}_{elapsed_ms:.0f}ms.folded"
+        path.write_text(lines, encoding='utf-8')
+        with open(self.output_dir / AGGREGATE_FILE, 'a', encoding='utf-8') as f:
+            f.write(lines)
+        self._prune()
+
+        if self.debug_mode:
+            print(f"[PROFILE] Iteration {iteration} took {elapsed_ms:.0f}ms, "
+                  f"{sum(samples.values())} sample(s) -> {path.name}")
+        return path
+
+    def close(self):
+        """Stop the sampler thread."""
+        self._stop = True
+        self._active.set()
+        self._sampler.join(timeout=1)
+
+    def _prune(self):
+        files = sorted(self.output_dir.glob("iteration_*.folded"), key=lambda p: p.stat().st_mtime)
+        for path in files[:max(0, len(files) - self.max_files)]:
+            path.unlink(missing_ok=True)
+
+    def _sample_loop(self):
+        while not self._stop:
+            self._active.wait()
+            if self._stop:
+                return
+            with self._lock:
+                start, target = self._start, self._target_thread
+            if start is None:
+                time.sleep(self.interval)
+                continue
+            remaining = self.start_after_ms / 1000 - (time.perf_counter() - start)
+            if remaining > 0:
+                # Nothing to do until the iteration is already suspiciously long
+                time.sleep(min(remaining, 0.05))
+                continue
+
+            frame = sys._current_frames().get(target)
+            if frame is not None:
+                stack = self._collapse(frame)
+                with self._lock:
+                    if self._start == start:  # Still the same iteration
+                        self._samples[f"stage:{self.stage};{stack}"] += 1
+            del frame
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _collapse(frame):
+        """Render a frame chain root-first as 'module.function;module.function'."""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{Path(code.co_filename).stem}.{getattr(code, 'co_qualname', code.co_name)}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+
+class StageTimer:
+    """
+    Per-stage wall-clock timings for one iteration, also shown to a profiler.
+
+    enter(name) starts a stage (ending the previous one), leave() ends it;
+    ms holds the durations in milliseconds.
+    """
+
+    def __init__(self, profiler=None):
+        self.profiler = profiler
+        self.ms = {}
+        self._stage = None
+        self._start = None
+
+    def enter(self, stage):
+        self.leave()
+        self._stage = stage
+        self._start = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.stage = stage
+
+    def leave(self):
+        if self._stage is None:
+            return
+        self.ms[self._stage] = self.ms.get(self._stage, 0.0) + (time.perf_counter() - self._start) * 1000
+        self._stage = None
+        if self.profiler is not None:
+            self.profiler.stage = "other"
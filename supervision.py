@@ -0,0 +1,128 @@
+"""
+Supervision Channel - Heartbeats from color_capture.py to the watchdog
+
+The watchdog can only see whether the child PID is alive; a capture loop stuck
+in a hung Tesseract call looks perfectly healthy from the outside. The capture
+loop therefore publishes a small JSON heartbeat file after every iteration:
+
+    {"launch": "9f0c...", "pid": 1234, "iteration": 42, "latency_ms": 85.3,
+     "sleep_seconds": 1.0, "queues": {"rectangles": 3, "captures": 1},
+     "timestamp": 1700000000.0}
+
+The watchdog exports the heartbeat path in COLOR_CAPTURE_HEARTBEAT and restarts
+the child when the iteration counter stops advancing or latency stays above
+its SLO. It also exports a fresh token per launch in
+COLOR_CAPTURE_LAUNCH_TOKEN and only trusts heartbeats that echo it: the pid
+cannot be used, because on Windows a venv's python.exe is a launcher that
+starts the real interpreter under another pid. sleep_seconds is the poll sleep the loop is about to take (stretched
+when throttled), so the watchdog does not mistake a long sleep for a stall.
+
+In the other direction the watchdog steers the child through a control file
+(path in COLOR_CAPTURE_CONTROL) that the capture loop re-reads when it changes:
+
+    {"max_cpu_share": 0.25, "poll_interval_scale": 2.0}
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+HEARTBEAT_ENV = "COLOR_CAPTURE_HEARTBEAT"
+CONTROL_ENV = "COLOR_CAPTURE_CONTROL"
+LAUNCH_TOKEN_ENV = "COLOR_CAPTURE_LAUNCH_TOKEN"
+
+
+class HeartbeatWriter:
+    """Publishes capture-loop progress to a heartbeat file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.pid = os.getpid()
+        self.launch_token = os.environ.get(LAUNCH_TOKEN_ENV)  # Identifies this launch to the watchdog
+        self._tmp_path = self.path.with_name(self.path.name + f".{self.pid}.tmp")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_environment(cls):
+        """Create a writer for the path exported by the watchdog, or None if unsupervised."""
+        path = os.environ.get(HEARTBEAT_ENV)
+        return cls(path) if path else None
+
+    def beat(self, iteration, latency_ms, sleep_seconds=0.0, **queues):
+        """
+        Publish one heartbeat.
+
+        Args:
+            iteration: Number of completed capture iterations
+            latency_ms: Duration of the last iteration (excluding the poll sleep)
+            sleep_seconds: Sleep before the next iteration (the next beat is due after it)
+            **queues: Current queue depths, e.g. rectangles=3, captures=1
+        """
+        record = {
+            'launch': self.launch_token,
+            'pid': self.pid,
+            'iteration': iteration,
+            'latency_ms': round(latency_ms, 2),
+            'sleep_seconds': round(sleep_seconds, 3),
+            'queues': queues,
+            'timestamp': time.time(),
+        }
+        try:
+            with open(self._tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(record, f)
+            os.replace(self._tmp_path, self.path)
+        except OSError:
+            pass  # A missed heartbeat is preferable to crashing the capture loop
+
+
+def read_heartbeat(path):
+    """Return the last heartbeat record, or None if missing or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class ControlChannel:
+    """Reads throttling settings written by the watchdog."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.settings = {}
+        self._mtime_ns = None
+
+    @classmethod
+    def from_environment(cls):
+        """Create a channel for the path exported by the watchdog, or None if unsupervised."""
+        path = os.environ.get(CONTROL_ENV)
+        return cls(path) if path else None
+
+    def poll(self):
+        """Re-read the control file if it changed; return the current settings."""
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except OSError:
+            return self.settings
+        if mtime_ns != self._mtime_ns:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.settings = json.load(f)
+                self._mtime_ns = mtime_ns
+            except (OSError, ValueError):
+                pass  # Half-written or unreadable; keep the previous settings
+        return self.settings
+
+    def sleep_interval(self, poll_interval, busy_seconds):
+        """
+        Seconds to sleep after an iteration that was busy for busy_seconds.
+
+        Applies the watchdog's poll interval scale, then stretches the sleep so
+        busy / (busy + sleep) never exceeds max_cpu_share of one core.
+        """
+        settings = self.poll()
+        interval = poll_interval * settings.get('poll_interval_scale', 1.0)
+        share = settings.get('max_cpu_share')
+        if share:
+            interval = max(interval, busy_seconds * (1.0 / share - 1.0))
+        return interval
@@ -0,0 +1,149 @@
+"""
+Tests for the append-only, deduplicated capture archive
+"""
+import sys
+
+import numpy as np
+import pytest
+
+import capture_archive
+from capture_archive import INDEX_FILE, PACK_FILE, CaptureArchive
+from color_capture_core import DetectionRecord
+
+
+def make_crop(seed, shape=(32, 110, 3)):
+    return np.random.default_rng(seed).integers(0, 256, size=shape, dtype=np.uint8)
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = CaptureArchive(tmp_path / "archive", debug_mode=False)
+    yield archive
+    archive.close()
+
+
+class TestCaptureArchive:
+    """Test deduplication, querying, export and crash recovery."""
+
+    def test_duplicate_crops_stored_once(self, archive, tmp_path):
+        crop = make_crop(0)
+
+        assert archive.add(crop, (10, 20, 110, 32), "Allow", timestamp=100)
+        pack_size = (tmp_path / "archive" / PACK_FILE).stat().st_size
+        assert not archive.add(crop.copy(), (10, 20, 110, 32), "Allow", timestamp=200)
+
+        assert len(archive) == 2
+        assert archive.unique_count == 1
+        assert (tmp_path / "archive" / PACK_FILE).stat().st_size == pack_size
+        assert np.array_equal(archive.read_image(archive.entries[1]), crop)
+
+    def test_query_by_term_time_and_region(self, archive):
+        archive.add(make_crop(0), (0, 0, 110, 32), "Allow", timestamp=100)
+        archive.add(make_crop(0), (0, 0, 110, 32), "Allow", timestamp=200)
+        archive.add(make_crop(1), (500, 300, 110, 32), "Continue", timestamp=300)
+        archive.add(make_crop(2), (500, 300, 110, 32), None, timestamp=400)
+
+        assert len(archive.query(term="Allow")) == 2
+        assert len(archive.query(term="Allow", unique=True)) == 1
+        assert len(archive.query(term="")) == 1
+        assert list(archive.query(since=150, until=300)['timestamp']) == [200, 300]
+        assert len(archive.query(region=(550, 310, 5, 5))) == 2
+
+    def test_add_captures_accepts_detection_records(self, archive):
+        screen = np.zeros((100, 200, 3), dtype=np.uint8)
+        screen[10:42, 20:130] = make_crop(3)
+        records = [DetectionRecord(screen, (20, 10, 110, 32), 0, term="Allow")]
+
+        assert archive.add_captures(records) == 1
+
+        entry = archive.entries[0]
+        assert (entry['x'], entry['y'], entry['w'], entry['h']) == (20, 10, 110, 32)
+        assert entry['term'] == b"Allow"
+
+    def test_continuous_sighting_recorded_once(self, archive):
+        screen = np.zeros((100, 300, 3), dtype=np.uint8)
+        screen[10:42, 20:130] = make_crop(4)
+        screen[50:82, 150:260] = make_crop(5)
+        button = DetectionRecord(screen, (20, 10, 110, 32), 0, term="Allow")
+        moved = DetectionRecord(screen, (150, 50, 110, 32), 1, term="Allow")
+
+        archive.add_captures([button], timestamp=100)
+        archive.add_captures([button], timestamp=101)      # Still on screen
+        archive.add_captures([button, moved], timestamp=102)
+        archive.add_captures([], timestamp=103)            # Dismissed...
+        archive.add_captures([button], timestamp=104)      # ...and shown again
+
+        assert list(archive.entries['timestamp']) == [100, 102, 104]
+        assert archive.unique_count == 2
+
+    def test_reopen_restores_index(self, tmp_path):
+        with CaptureArchive(tmp_path, debug_mode=False) as archive:
+            archive.add(make_crop(0), (0, 0, 110, 32), "Allow")
+            archive.add(make_crop(1), (0, 0, 110, 32), "Allow")
+
+        with CaptureArchive(tmp_path, debug_mode=False) as archive:
+            assert len(archive) == 2
+            assert not archive.add(make_crop(1), (5, 5, 110, 32), "Allow")
+            assert np.array_equal(archive.read_image(archive.entries[2]), make_crop(1))
+
+    def test_partial_writes_truncated_on_open(self, tmp_path):
+        with CaptureArchive(tmp_path, debug_mode=False) as archive:
+            archive.add(make_crop(0), (0, 0, 110, 32), "Allow")
+        index_size = (tmp_path / INDEX_FILE).stat().st_size
+        pack_size = (tmp_path / PACK_FILE).stat().st_size
+        with open(tmp_path / INDEX_FILE, 'ab') as f:
+            f.write(b"\x01" * 7)
+        with open(tmp_path / PACK_FILE, 'ab') as f:
+            f.write(b"\x89PNG partial")
+
+        with CaptureArchive(tmp_path, debug_mode=False) as archive:
+            assert len(archive) == 1
+            assert (tmp_path / INDEX_FILE).stat().st_size == index_size
+            assert (tmp_path / PACK_FILE).stat().st_size == pack_size
+
+    def test_not_an_archive_raises(self, tmp_path):
+        (tmp_path / PACK_FILE).write_bytes(b"something else")
+
+        with pytest.raises(ValueError, match="Not a capture archive"):
+            CaptureArchive(tmp_path, debug_mode=False)
+
+    def test_export_uses_training_layout(self, archive, tmp_path):
+        archive.add(make_crop(0), (0, 0, 110, 32), "Allow")
+        archive.add(make_crop(0), (0, 0, 110, 32), "Allow")
+        archive.add(make_crop(1), (0, 0, 110, 32), None)
+
+        assert archive.export(tmp_path / "out") == 2
+
+        assert len(list((tmp_path / "out" / "Allow").glob("*.png"))) == 1
+        assert len(list((tmp_path / "out" / "unlabeled").glob("*.png"))) == 1
+
+    def test_long_multibyte_term_cut_on_character_boundary(self, archive, tmp_path, capsys, monkeypatch):
+        term = "Zulassen " + "\u2713" * 8   # 33 bytes; a plain 32-byte cut splits the last check mark
+        archive.add(make_crop(0), (0, 0, 110, 32), term)
+        archive.close()
+
+        with CaptureArchive(tmp_path / "archive", debug_mode=False) as reopened:
+            assert len(reopened.query(term=term)) == 1
+            assert reopened.export(tmp_path / "out") == 1
+        assert [p.name for p in (tmp_path / "out").iterdir()] == ["Zulassen " + "\u2713" * 7]
+
+        monkeypatch.setattr(sys, 'argv', ["capture_archive.py", "stats", "--archive", str(tmp_path / "archive")])
+        capture_archive.main()
+        assert "Zulassen " + "\u2713" * 7 + ": 1" in capsys.readouterr().out
+
+    def test_stops_recording_at_size_limit(self, tmp_path, capsys):
+        with CaptureArchive(tmp_path, debug_mode=False) as archive:
+            archive.add(make_crop(0), (0, 0, 110, 32), "Allow")
+            limit = archive.size_bytes + 100   # Room for more sightings but not another crop
+
+        with CaptureArchive(tmp_path, debug_mode=False, max_bytes=limit) as archive:
+            assert archive.add(make_crop(0), (5, 5, 110, 32), "Allow") is False
+            assert archive.add(make_crop(1), (0, 0, 110, 32), "Allow") is None
+            assert archive.add(make_crop(2), (0, 0, 110, 32), "Allow") is None
+            assert archive.add_captures([{'image': make_crop(3), 'coords': (0, 0, 110, 32)}]) == 0
+
+            assert len(archive) == 2 and archive.unique_count == 1
+            assert archive.size_bytes == (tmp_path / PACK_FILE).stat().st_size + (tmp_path / INDEX_FILE).stat().st_size
+            assert archive.size_bytes <= limit
+        assert capsys.readouterr().out.count("[WARNING]") == 1
+
@@ -3,13 +3,14 @@ Comprehensive test suite for OCR filtering functionality
 """
 import pytest
 import cv2
+import time
 import numpy as np
 from pathlib import Path
 import shutil
 from PIL import Image, ImageDraw, ImageFont
 from unittest.mock import patch, MagicMock, call
 
-from color_capture_core import ColorCapture
+from color_capture_core import ColorCapture, DetectionRecord
 
 
 @pytest.fixture(autouse=True)
@@ -206,6 +207,483 @@ class TestRectangleProcessing:
         assert len(valid_captures) == 2
 
 
+class TestBatchOCR:
+    """Test batched OCR (one Tesseract call per frame)."""
+    
+    def test_montage_offsets(self):
+        crops = [np.zeros((30, 100, 3), dtype=np.uint8), np.zeros((40, 80, 3), dtype=np.uint8)]
+        
+        montage, offsets = ColorCapture.build_ocr_montage(crops, padding=10)
+        
+        assert offsets == [(10, 30), (50, 40)]
+        assert montage.shape == (100, 120, 3)
+        assert (montage[10:40, 10:110] == 0).all()
+        assert (montage[0:10] == 255).all()
+    
+    def test_words_mapped_back_to_source_crops(self, color_ref_image, captures_dir):
+        cc = ColorCapture(color_ref_image, captures_dir, debug_mode=False, use_ahk=False, batch_ocr=True)
+        crops = [np.full((30, 100, 3), i, dtype=np.uint8) for i in range(3)]
+        # Bands (padding 12): crop 0 at y 12-42, crop 1 at 54-84, crop 2 at 96-126
+        data = {
+            'text': ['Try', 'Again', '', 'Cancel', 'Allow'],
+            'top': [15, 16, 60, 58, 100],
+            'height': [20, 20, 10, 20, 20],
+        }
+        
+        with patch('color_capture_core.pytesseract.image_to_data', return_value=data) as mock_ocr:
+            texts = cc.extract_text_batch(crops)
+        
+        assert mock_ocr.call_count == 1
+        assert texts == ['Try Again', 'Cancel', 'Allow']
+        assert cc.stats['ocr_calls'] == 1
+    
+    def test_process_rectangles_uses_one_ocr_call(self, color_ref_image, captures_dir):
+        cc = ColorCapture(color_ref_image, captures_dir, ocr_search_text=["Allow", "Try Again"],
+                          debug_mode=False, use_ahk=False, batch_ocr=True)
+        screen = np.full((200, 400, 3), (200, 200, 200), dtype=np.uint8)
+        screen[10:40, 10:110] = 50
+        screen[60:90, 10:110] = 100
+        rectangles = [(10, 10, 100, 30), (10, 60, 100, 30)]
+        data = {'text': ['Cancel', 'Try', 'Again'], 'top': [15, 58, 58], 'height': [20, 20, 20]}
+        
+        with patch('color_capture_core.pytesseract.image_to_data', return_value=data) as mock_ocr:
+            valid_captures = cc.process_rectangles(screen, rectangles)
+        
+        assert mock_ocr.call_count == 1
+        assert [capture['index'] for capture in valid_captures] == [1]
+
+
+class TestDetectionRecord:
+    """Test the record type returned by process_rectangles."""
+    
+    def test_dict_adapter(self):
+        frame = np.arange(60 * 80 * 3, dtype=np.uint8).reshape(60, 80, 3)
+        record = DetectionRecord(frame, (10, 5, 30, 20), 2, score=0.5, term="Allow")
+        
+        assert record['coords'] == (10, 5, 30, 20)
+        assert record['index'] == 2
+        assert record['image'].shape == (20, 30, 3)
+        assert np.shares_memory(record['image'], frame)
+        assert not np.shares_memory(record.crop(copy=True), frame)
+        assert record.to_dict()['term'] == "Allow"
+        assert 'image' in record and record.get('missing') is None
+        with pytest.raises(KeyError):
+            record['missing']
+    
+    def test_records_carry_matched_term(self, color_ref_image, captures_dir):
+        cc = ColorCapture(color_ref_image, captures_dir, ocr_search_text=["Allow", "Try Again"],
+                          debug_mode=False, use_ahk=False, batch_ocr=True)
+        screen = np.full((200, 400, 3), (200, 200, 200), dtype=np.uint8)
+        rectangles = [(10, 10, 100, 30), (10, 60, 100, 30)]
+        data = {'text': ['Allow', 'Try', 'Again'], 'top': [15, 58, 58], 'height': [20, 20, 20]}
+        
+        with patch('color_capture_core.pytesseract.image_to_data', return_value=data):
+            records = cc.process_rectangles(screen, rectangles)
+        
+        assert [(r.term, r.score) for r in records] == [("Allow", 1.0), ("Try Again", 1.0)]
+        assert np.shares_memory(records[1].image, screen)
+        assert cc.save_captures_to_disk(records) == 2
+
+
+class TestColorMatchModes:
+    """Test HSV and Lab color matching modes."""
+    
+    @pytest.fixture
+    def blue_ref_image(self, test_dir):
+        path = test_dir / "blue_ref.png"
+        Image.new('RGB', (10, 10), color=(0, 120, 212)).save(path)
+        return path
+    
+    @pytest.fixture
+    def screen(self):
+        """Reference-blue button and a near-miss patch inside the BGR tolerance box."""
+        screen = np.full((120, 300, 3), 255, dtype=np.uint8)
+        screen[10:50, 10:130] = (212, 120, 0)      # Reference color (BGR)
+        screen[60:100, 10:130] = (190, 145, 25)    # Within +/-30 per channel, duller and greener
+        return screen
+    
+    def test_bgr_mode_accepts_near_miss(self, blue_ref_image, captures_dir, screen):
+        cc = ColorCapture(blue_ref_image, captures_dir, debug_mode=False, use_ahk=False)
+        
+        rectangles, _ = cc.find_matching_rectangles(screen)
+        
+        assert sorted(rectangles) == [(10, 10, 120, 40), (10, 60, 120, 40)]
+    
+    @pytest.mark.parametrize("mode", ["hsv", "lab"])
+    def test_perceptual_modes_reject_near_miss(self, mode, blue_ref_image, captures_dir, screen):
+        cc = ColorCapture(blue_ref_image, captures_dir, debug_mode=False, use_ahk=False,
+                          color_match_mode=mode, hue_tolerance=4, delta_e=10)
+        
+        rectangles, mask = cc.find_matching_rectangles(screen)
+        
+        assert rectangles == [(10, 10, 120, 40)]
+        assert mask[30, 50] == 255 and mask[80, 50] == 0
+    
+    def test_hsv_hue_window_wraps(self, test_dir, captures_dir):
+        path = test_dir / "red_ref.png"
+        Image.new('RGB', (10, 10), color=(220, 20, 30)).save(path)
+        cc = ColorCapture(path, captures_dir, debug_mode=False, use_ahk=False,
+                          color_match_mode="hsv", hue_tolerance=6)
+        screen = np.full((60, 200, 3), 255, dtype=np.uint8)
+        screen[10:40, 10:80] = (40, 20, 220)    # Red hue just below 180
+        screen[10:40, 100:170] = (20, 40, 220)  # Red hue just above 0
+        
+        rectangles, _ = cc.find_matching_rectangles(screen)
+        
+        assert sorted(rectangles) == [(10, 10, 70, 30), (100, 10, 70, 30)]
+    
+    def test_unknown_mode_rejected(self, color_ref_image, captures_dir):
+        with pytest.raises(ValueError):
+            ColorCapture(color_ref_image, captures_dir, debug_mode=False, color_match_mode="rgb")
+    
+    @pytest.mark.parametrize("reuse_buffers", [False, True])
+    def test_region_scan_returns_frame_coordinates(self, reuse_buffers, blue_ref_image, captures_dir, screen):
+        cc = ColorCapture(blue_ref_image, captures_dir, debug_mode=False, use_ahk=False,
+                          reuse_buffers=reuse_buffers)
+        
+        rectangles, mask = cc.find_matching_rectangles(screen, region=(0, 55, 300, 100))
+        
+        assert list(rectangles) == [(10, 60, 120, 40)]
+        assert mask.shape == (65, 300)
+        assert cc.find_matching_rectangles(screen, region=(400, 0, 50, 50))[0] == []
+
+
+class TestReferenceColorModel:
+    """Test the histogram reference model, measured tolerance and drift adaptation."""
+    
+    @pytest.fixture
+    def noisy_ref_image(self, test_dir):
+        """Blue swatch with an anti-aliased white border and a few stray dark pixels."""
+        img = np.full((20, 20, 3), (212, 120, 0), dtype=np.uint8)
+        img[:2, :] = img[-2:, :] = img[:, :2] = img[:, -2:] = (240, 200, 150)
+        img[5, 5] = img[6, 9] = (20, 20, 20)
+        path = test_dir / "noisy_ref.png"
+        cv2.imwrite(str(path), img)
+        return path
+    
+    def test_mode_ignores_edges_and_strays(self, noisy_ref_image, captures_dir):
+        mean_cc = ColorCapture(noisy_ref_image, captures_dir, debug_mode=False, use_ahk=False)
+        mode_cc = ColorCapture(noisy_ref_image, captures_dir, debug_mode=False, use_ahk=False,
+                               reference_model="mode")
+        
+        assert list(mode_cc.ref_color) == [0, 120, 212]
+        assert abs(int(mean_cc.ref_color[1]) - 120) > 10
+    
+    def test_measured_tolerance_is_tighter(self, noisy_ref_image, captures_dir):
+        cc = ColorCapture(noisy_ref_image, captures_dir, debug_mode=False, use_ahk=False,
+                          reference_model="mode", tolerance_margin=10)
+        screen = np.full((60, 300, 3), 255, dtype=np.uint8)
+        screen[5:45, 10:130] = (212, 120, 0)
+        screen[5:45, 150:270] = (230, 100, 20)   # Inside the default +/-30 box
+        
+        rectangles, _ = cc.find_matching_rectangles(screen)
+        
+        assert list(cc.channel_tolerance()) == [10, 10, 10]
+        assert rectangles == [(10, 5, 120, 40)]
+    
+    def test_adapts_to_drift_within_limit(self, noisy_ref_image, captures_dir):
+        cc = ColorCapture(noisy_ref_image, captures_dir, debug_mode=False, use_ahk=False, ocr_enabled=False,
+                          reference_model="mode", adapt_rate=0.5, max_drift=6)
+        screen = np.full((60, 300, 3), 255, dtype=np.uint8)
+        screen[10:40, 10:110] = (222, 128, 8)    # Theme drifted by +10/+8/+8
+        
+        for _ in range(10):
+            cc.process_rectangles(screen, [(10, 10, 100, 30)])
+        
+        assert list(cc.ref_color) == [6, 126, 218]   # Followed the drift, capped at max_drift
+        assert cc.export_state()['ref_color'] == [6, 126, 218]
+    
+    def test_unknown_model_rejected(self, color_ref_image, captures_dir):
+        with pytest.raises(ValueError):
+            ColorCapture(color_ref_image, captures_dir, debug_mode=False, reference_model="median")
+
+
+class TestShapePrefilter:
+    """Test the geometric prefilter that runs before OCR."""
+    
+    @pytest.fixture
+    def mask(self):
+        mask = np.zeros((200, 400), dtype=np.uint8)
+        mask[10:40, 10:130] = 255           # Solid button...
+        mask[20:30, 30:100] = 0             # ...with text pixels
+        mask[60:90, 10:130] = 255           # Hollow outline
+        mask[63:87, 13:127] = 0
+        mask[110:140, 10:130] = 255         # Solid block without text
+        mask[150:190, 10:50] = 255          # Square (wrong aspect ratio)
+        cv2.circle(mask, (250, 60), 40, 255, -1)  # Round blob
+        return mask
+    
+    def test_features(self, mask):
+        features = ColorCapture.score_candidates(mask, [(10, 10, 120, 30), (10, 60, 120, 30)])
+        
+        assert features['aspect'][0] == pytest.approx(4.0)
+        assert features['border_fill'][0] == pytest.approx(1.0)
+        assert 0.1 < features['text_fraction'][0] < 0.4
+        assert features['text_fraction'][1] == pytest.approx(1.0)
+    
+    def test_only_plausible_buttons_kept(self, color_ref_image, captures_dir, mask):
+        cc = ColorCapture(color_ref_image, captures_dir, debug_mode=False, use_ahk=False,
+                          shape_prefilter=True)
+        rectangles = [(10, 10, 120, 30), (10, 60, 120, 30), (10, 110, 120, 30),
+                      (10, 150, 40, 40), (210, 20, 81, 81)]
+        
+        kept = cc.prefilter_rectangles(mask, rectangles)
+        
+        assert kept == [(10, 10, 120, 30)]
+        assert cc.stats['prefilter_checked'] == 5
+        assert cc.stats['prefilter_rejected_aspect'] == 2   # Square and blob
+        assert cc.stats['prefilter_rejected_shape'] == 1    # Hollow outline (low fill)
+        assert cc.stats['prefilter_rejected_text'] == 1     # Solid block without text
+    
+    def test_irregular_outline_rejected(self, color_ref_image, captures_dir):
+        cc = ColorCapture(color_ref_image, captures_dir, debug_mode=False, use_ahk=False,
+                          shape_prefilter=True)
+        mask = np.zeros((60, 200), dtype=np.uint8)
+        pts = np.array([[10, 10], [130, 25], [10, 40]], dtype=np.int32)  # Triangle
+        cv2.fillPoly(mask, [pts], 255)
+        
+        assert cc.prefilter_rectangles(mask, [(10, 10, 121, 31)]) == []
+        assert cc.stats['prefilter_rejected_shape'] == 1
+
+
+class TestTextLocalization:
+    """Test OCRing only the text box inside each button."""
+    
+    @pytest.fixture
+    def button_screen(self):
+        """Light gray desktop with one reference-colored rounded button labeled with text."""
+        screen = np.full((80, 300, 3), (200, 200, 200), dtype=np.uint8)
+        cv2.rectangle(screen, (20, 20), (139, 51), (212, 120, 0), -1)
+        screen[20:22, 20:22] = (200, 200, 200)   # Rounded corner
+        cv2.putText(screen, "Allow", (50, 42), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        return screen
+    
+    @pytest.fixture
+    def cc(self, captures_dir, test_dir):
+        ref_path = test_dir / "blue_ref.png"
+        cv2.imwrite(str(ref_path), np.full((4, 4, 3), (212, 120, 0), dtype=np.uint8))
+        return ColorCapture(ref_path, captures_dir, debug_mode=False, use_ahk=False,
+                            batch_ocr=False, localize_text=True, text_padding=2)
+    
+    def test_box_encloses_text_only(self, cc, button_screen):
+        _, mask = cc.find_matching_rectangles(button_screen)
+        
+        x0, y0, x1, y1 = cc.locate_text(mask[20:52, 20:140])
+        
+        text_pixels = np.argwhere((button_screen[20:52, 20:140] == 255).all(axis=2))
+        assert x0 <= text_pixels[:, 1].min() and text_pixels[:, 1].max() < x1
+        assert y0 <= text_pixels[:, 0].min() and text_pixels[:, 0].max() < y1
+        assert (x1 - x0) * (y1 - y0) < 0.5 * 120 * 32   # Corner and border padding cut away
+    
+    def test_solid_button_not_localized(self, cc):
+        assert cc.locate_text(np.full((30, 100), 255, dtype=np.uint8)) is None
+    
+    def test_tesseract_sees_localized_crop_and_box_is_cached(self, cc, button_screen):
+        rectangles, mask = cc.find_matching_rectangles(button_screen)
+        ocr_shapes = []
+        
+        def fake_tesseract(image):
+            ocr_shapes.append(image.shape)
+            return "Allow"
+        
+        with patch.object(cc, '_run_tesseract', side_effect=fake_tesseract):
+            first = cc.process_rectangles(button_screen, rectangles, mask=mask, mask_origin=cc.mask_origin)
+            cc._ocr_cache.clear()
+            second = cc.process_rectangles(button_screen, rectangles)   # No mask: cached box
+        
+        assert [capture['coords'] for capture in first] == [(20, 20, 120, 32)]
+        assert first[0]['image'].shape == (32, 120, 3)   # Detections keep the whole button
+        assert len(second) == 1
+        assert ocr_shapes[0] == ocr_shapes[1]
+        assert ocr_shapes[0][0] < 32 and ocr_shapes[0][1] < 120
+        assert cc.stats['text_localized'] == 2
+        assert cc.stats['text_box_cache_hits'] == 1
+    
+    def test_new_label_at_same_location_gets_new_box(self, cc, button_screen):
+        continue_screen = np.full((80, 300, 3), (200, 200, 200), dtype=np.uint8)
+        cv2.rectangle(continue_screen, (20, 20), (139, 51), (212, 120, 0), -1)
+        cv2.putText(continue_screen, "Continue", (35, 42), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        ocr_widths = []
+        
+        def fake_tesseract(image):
+            ocr_widths.append(image.shape[1])
+            return "Allow" if len(ocr_widths) == 1 else "Continue"
+        
+        with patch.object(cc, '_run_tesseract', side_effect=fake_tesseract):
+            for screen in (button_screen, continue_screen):
+                rectangles, mask = cc.find_matching_rectangles(screen)
+                cc.process_rectangles(screen, rectangles, mask=mask, mask_origin=cc.mask_origin)
+        
+        x0, _, x1, _ = cc.locate_text(mask[20:52, 20:140])
+        assert ocr_widths[1] == x1 - x0 > ocr_widths[0]
+        assert cc.stats['text_box_cache_hits'] == 0
+    
+    def test_box_evicted_when_ocr_fails(self, cc, button_screen):
+        rectangles, mask = cc.find_matching_rectangles(button_screen)
+        
+        with patch.object(cc, '_run_tesseract', return_value="Allo"):
+            assert cc.process_rectangles(button_screen, rectangles, mask=mask, mask_origin=cc.mask_origin) == []
+        
+        assert (20, 20, 120, 32) not in cc._text_boxes
+    
+    def test_region_scan_uses_mask_origin(self, cc, button_screen):
+        rectangles, mask = cc.find_matching_rectangles(button_screen, region=(10, 10, 200, 60))
+        
+        with patch.object(cc, '_run_tesseract', return_value="Allow") as mock_ocr:
+            cc.process_rectangles(button_screen, rectangles, mask=mask, mask_origin=cc.mask_origin)
+        
+        assert cc.mask_origin == (10, 10)
+        assert mock_ocr.call_args[0][0].shape[1] < 120
+
+
+class TestOCRPriority:
+    """Test priority-ordered OCR under a per-frame time budget."""
+    
+    @pytest.fixture
+    def screen(self):
+        screen = np.full((200, 400, 3), (200, 200, 200), dtype=np.uint8)
+        for i in range(4):
+            screen[10 + 45 * i:40 + 45 * i, 10:110] = 40 * i
+        return screen
+    
+    @pytest.fixture
+    def rectangles(self):
+        return [(10, 10 + 45 * i, 100, 30) for i in range(4)]
+    
+    def test_typical_sizes_and_hotspots_ranked_first(self, color_ref_image, captures_dir):
+        cc = ColorCapture(color_ref_image, captures_dir, debug_mode=False, use_ahk=False)
+        coords = [(0, 0, 190, 48), (0, 60, 100, 30), (0, 100, 62, 22)]
+        
+        priorities = cc.candidate_priorities(coords)
+        assert np.argmax(priorities) == 1
+        
+        cc._record_hotspot((0, 0, 190, 48))
+        cc._record_hotspot((0, 0, 190, 48))
+        assert np.argmax(cc.candidate_priorities(coords)) == 0
+    
+    def test_hotspot_ocred_first(self, color_ref_image, captures_dir, screen, rectangles):
+        cc = ColorCapture(color_ref_image, captures_dir, debug_mode=False, use_ahk=False, batch_ocr=False)
+        cc._record_hotspot(rectangles[2])
+        seen = []
+        
+        def fake_tesseract(image):
+            seen.append(int(image[0, 0, 0]))
+            return "Allow"
+        
+        with patch.object(cc, '_run_tesseract', side_effect=fake_tesseract):
+            valid_captures = cc.process_rectangles(screen, rectangles)
+        
+        assert seen[0] == 80
+        assert [capture['index'] for capture in valid_captures] == [2, 0, 1, 3]
+    
+    def test_budget_defers_remaining_candidates(self, color_ref_image, captures_dir, screen, rectangles):
+        cc = ColorCapture(color_ref_image, captures_dir, debug_mode=False, use_ahk=False, batch_ocr=False,
+                          ocr_budget_ms=75)
+        now = [0.0]
+        cc._clock = lambda: now[0]
+        
+        def slow_tesseract(image):
+            now[0] += 0.05   # Each OCR costs 50ms on the fake clock
+            return "Allow"
+        
+        with patch.object(cc, '_run_tesseract', side_effect=slow_tesseract) as mock_ocr:
+            first = cc.process_rectangles(screen, rectangles)
+            assert mock_ocr.call_count == 2
+            assert cc.stats['ocr_deferred'] == 2
+            second = cc.process_rectangles(screen, rectangles)
+        
+        assert [capture['index'] for capture in first] == [0, 1]
+        assert [capture['index'] for capture in second][:2] == [2, 3]   # Deferred ones first
+    
+    def test_deferred_bonus_cleared_without_ocr(self, color_ref_image, captures_dir, screen, rectangles):
+        cc = ColorCapture(color_ref_image, captures_dir, debug_mode=False, use_ahk=False, batch_ocr=False,
+                          ocr_budget_ms=75)
+        now = [0.0]
+        cc._clock = lambda: now[0]
+        
+        def slow_tesseract(image):
+            now[0] += 0.05
+            return "Allow"
+        
+        with patch.object(cc, '_run_tesseract', side_effect=slow_tesseract):
+            cc.process_rectangles(screen, rectangles)
+            assert len(cc._deferred) == 2
+            cc.process_rectangles(screen, [])   # Nothing left to OCR this frame
+        
+        assert cc._deferred == set()   # No stale +1 priority for the old deferrals
+    
+    def test_batch_chunks_follow_budget(self, color_ref_image, captures_dir, screen, rectangles):
+        cc = ColorCapture(color_ref_image, captures_dir, debug_mode=False, use_ahk=False, batch_ocr=True,
+                          ocr_budget_ms=100, ocr_cache_size=0)
+        cc._ocr_ms_per_crop = 40.0
+        
+        with patch.object(cc, 'extract_text_batch', return_value=["Allow", "Allow"]) as mock_batch:
+            valid_captures = cc.process_rectangles(screen, rectangles)
+        
+        assert len(mock_batch.call_args_list[0][0][0]) == 2   # 100ms budget / 40ms per crop
+        assert len(valid_captures) == 4
+
+
+class TestBufferReuse:
+    """Test reuse_buffers mode (preallocated mask, scratch and candidate buffers)."""
+    
+    @pytest.fixture
+    def blue_ref_image(self, test_dir):
+        path = test_dir / "blue_ref.png"
+        Image.new('RGB', (10, 10), color=(0, 120, 212)).save(path)
+        return path
+    
+    @pytest.fixture
+    def screen(self):
+        """720p desktop with a few reference-blue buttons carrying text."""
+        rng = np.random.default_rng(0)
+        screen = rng.integers(200, 256, size=(720, 1280, 3), dtype=np.uint8)
+        for x, y in ((100, 100), (600, 300), (900, 650)):
+            screen[y:y+32, x:x+110] = (212, 120, 0)
+            cv2.putText(screen, "Allow", (x + 8, y + 22), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        return screen
+    
+    @pytest.mark.parametrize("mode", ["bgr", "hsv", "lab"])
+    def test_same_results_as_allocating_mode(self, mode, blue_ref_image, captures_dir, screen):
+        options = dict(debug_mode=False, use_ahk=False, color_match_mode=mode, shape_prefilter=True)
+        plain = ColorCapture(blue_ref_image, captures_dir, **options)
+        reusing = ColorCapture(blue_ref_image, captures_dir, reuse_buffers=True, **options)
+        
+        expected, expected_mask = plain.find_matching_rectangles(screen)
+        rectangles, mask = reusing.find_matching_rectangles(screen)
+        
+        assert sorted(rectangles) == sorted(expected) and len(expected) == 3
+        assert np.array_equal(mask, expected_mask)
+        assert mask is reusing.find_matching_rectangles(screen)[1]
+    
+    @pytest.mark.parametrize("mode", ["bgr", "hsv", "lab"])
+    def test_steady_state_allocations_stay_flat(self, mode, blue_ref_image, captures_dir, screen):
+        import tracemalloc
+        cc = ColorCapture(blue_ref_image, captures_dir, debug_mode=False, use_ahk=False, ocr_enabled=False,
+                          color_match_mode=mode, shape_prefilter=True, reuse_buffers=True)
+        for _ in range(3):  # Warm up: allocate the buffers
+            rectangles, _ = cc.find_matching_rectangles(screen)
+            cc.process_rectangles(screen, rectangles)
+        
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            peaks = []
+            for _ in range(20):
+                tracemalloc.reset_peak()
+                rectangles, _ = cc.find_matching_rectangles(screen)
+                cc.process_rectangles(screen, rectangles)
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            growth = tracemalloc.get_traced_memory()[0] - baseline
+        finally:
+            tracemalloc.stop()
+        
+        mask_bytes = screen.shape[0] * screen.shape[1]
+        assert growth < 64 * 1024                 # Nothing retained across iterations
+        assert max(peaks) < mask_bytes            # No full-frame temporaries per iteration
+        assert max(peaks) - min(peaks) < 64 * 1024
+
+
 class TestDiskSaving:
     """Test disk saving functionality."""
     
@@ -411,5 +889,85 @@ class TestClickFunctionality:
         assert mock_moveTo.call_count == 2
 
 
+class TestClickVerification:
+    """Test post-click verification by re-grabbing the clicked regions."""
+    
+    @pytest.fixture
+    def cc(self, color_ref_image, captures_dir):
+        return ColorCapture(color_ref_image, captures_dir, debug_mode=False, use_ahk=False, ocr_enabled=False)
+    
+    @pytest.fixture
+    def button(self):
+        return np.full((30, 100, 3), 200, dtype=np.uint8)   # Still shows the reference gray
+    
+    @pytest.fixture
+    def background(self):
+        return np.full((30, 100, 3), 40, dtype=np.uint8)    # Dialog gone
+    
+    def test_dismissed_after_first_click(self, cc, button, background):
+        captures = [{'coords': (10, 10, 100, 30), 'index': 0}]
+        
+        with patch.object(cc, 'click_captures') as mock_click, \
+             patch.object(cc, 'grab_region', side_effect=[button, background]) as mock_grab:
+            dismissed = cc.click_and_verify(captures, verify_interval=0.01)
+        
+        assert dismissed == 1
+        assert mock_click.call_count == 1
+        assert mock_grab.call_count == 2
+        assert cc.click_stats()['success_rate'] == 1.0
+        assert cc.click_stats()['dismiss_latency_median_ms'] >= 10
+    
+    def test_retries_then_gives_up(self, cc, button):
+        captures = [{'coords': (10, 10, 100, 30), 'index': 0}]
+        
+        with patch.object(cc, 'click_captures') as mock_click, \
+             patch.object(cc, 'grab_region', return_value=button):
+            dismissed = cc.click_and_verify(captures, verify_interval=0.01, verify_timeout=0.05, max_attempts=3)
+        
+        assert dismissed == 0
+        assert mock_click.call_count == 3
+        assert cc.stats['click_retries'] == 2
+        assert cc.click_stats()['success_rate'] == 0.0
+    
+    def test_dismiss_latency_p95_uses_nearest_rank(self, cc):
+        cc.dismiss_latencies_ms.extend([120.0, 40.0, 80.0])
+        
+        # A floor index would report the median (80ms) as p95 for three samples
+        assert cc.click_stats()['dismiss_latency_p95_ms'] == 120.0
+        assert cc.click_stats()['dismiss_latency_median_ms'] == 80.0
+    
+    def test_only_remaining_buttons_clicked_again(self, cc, button, background):
+        captures = [{'coords': (10, 10, 100, 30), 'index': 0}, {'coords': (10, 60, 100, 30), 'index': 1}]
+        regions = {(10, 10, 100, 30): background, (10, 60, 100, 30): button}
+        
+        with patch.object(cc, 'click_captures') as mock_click, \
+             patch.object(cc, 'grab_region', side_effect=lambda coords: regions[coords]):
+            cc.click_and_verify(captures, verify_interval=0.01, verify_timeout=0.05, max_attempts=2)
+        
+        assert [c['index'] for c in mock_click.call_args_list[1][0][0]] == [1]
+        assert cc.stats['clicks_verified'] == 1 and cc.stats['clicks_unverified'] == 1
+    
+    def test_verification_keeps_frame_buffers(self, color_ref_image, captures_dir, button):
+        cc = ColorCapture(color_ref_image, captures_dir, debug_mode=False, use_ahk=False, ocr_enabled=False,
+                          reuse_buffers=True)
+        _, mask = cc.find_matching_rectangles(np.full((200, 300, 3), 40, dtype=np.uint8))
+        
+        assert not cc.is_dismissed(button)
+        
+        assert cc.find_matching_rectangles(np.full((200, 300, 3), 40, dtype=np.uint8))[1] is mask
+    
+    def test_ocr_only_when_color_present_and_pixels_changed(self, color_ref_image, captures_dir, button, background):
+        cc = ColorCapture(color_ref_image, captures_dir, debug_mode=False, use_ahk=False, ocr_enabled=True)
+        hovered = button.copy()
+        hovered[0, 0] = 180
+        
+        with patch.object(cc, 'contains_target_text', return_value=True) as mock_text:
+            assert cc.is_dismissed(background)
+            assert not cc.is_dismissed(button, unchanged_from=button.copy())
+            assert mock_text.call_count == 0
+            assert not cc.is_dismissed(hovered, unchanged_from=button)
+            assert mock_text.call_count == 1
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,109 @@
+"""
+Tests for --config overrides of color_capture.py's configuration constants
+"""
+from pathlib import Path
+
+import pytest
+
+import color_capture
+from color_capture_core import ColorCapture
+
+
+@pytest.fixture
+def restore_config():
+    saved = {name: value for name, value in vars(color_capture).items() if name.isupper()}
+    yield
+    vars(color_capture).update(saved)
+
+
+class TestConfigOverrides:
+    """Test applying a JSON-style dict of constant overrides."""
+
+    def test_values_and_paths_replaced(self, restore_config, tmp_path):
+        color_capture.apply_config_overrides({'POLL_INTERVAL': 0.25, 'CAPTURES_DIR': str(tmp_path)})
+        assert color_capture.POLL_INTERVAL == 0.25
+        assert color_capture.CAPTURES_DIR == tmp_path
+        assert isinstance(color_capture.CAPTURES_DIR, Path)
+
+    @pytest.mark.parametrize("name", ["NOT_A_SETTING", "poll_interval", "_MODULE_START", "main"])
+    def test_unknown_names_rejected(self, restore_config, name):
+        with pytest.raises(ValueError, match="Unknown configuration constant"):
+            color_capture.apply_config_overrides({name: 1})
+
+
+    def test_factory_uses_overridden_settings(self, restore_config, tmp_path):
+        color_capture.apply_config_overrides({'CAPTURES_DIR': str(tmp_path), 'LOCALIZE_TEXT': True,
+                                              'OCR_BUDGET_MS': 40, 'COLOR_MATCH_MODE': "lab"})
+
+        cc = color_capture.create_color_capture(debug_mode=False)
+
+        assert (cc.localize_text, cc.ocr_budget_ms, cc.color_match_mode) == (True, 40, "lab")
+
+
+class TestInstances:
+    """Test settings that let several supervised instances run side by side."""
+
+    def test_instance_name_suffixes_state_paths(self, restore_config):
+        color_capture.apply_instance_name("left")
+        color_capture.apply_config_overrides({'ARCHIVE_DIR': "shared_archive"})
+
+        assert color_capture.SNAPSHOT_PATH.name == "warm_state_left.bin"
+        assert color_capture.CAPTURES_DIR.name == "captures_left"
+        assert color_capture.SERVICE_NAME == "allow_clicker_left"
+        assert color_capture.ARCHIVE_DIR == Path("shared_archive")   # An explicit override still wins
+
+    @pytest.mark.parametrize("event_region, expected", [
+        (None, (1920, 0, 1920, 1080)),
+        ((1800, 100, 300, 200), (1920, 100, 180, 200)),   # Clipped to this instance's monitor
+        ((100, 100, 300, 200), (1920, 0, 1920, 1080)),    # Other monitor: scan ours
+    ])
+    def test_scan_region_stays_inside_screen_region(self, restore_config, event_region, expected):
+        color_capture.apply_config_overrides({'SCREEN_REGION': [1920, 0, 1920, 1080]})
+
+        assert color_capture.scan_region(event_region) == expected
+
+    def test_no_screen_region_scans_event_or_everything(self):
+        assert color_capture.scan_region() is None
+        assert color_capture.scan_region((1, 2, 3, 4)) == (1, 2, 3, 4)
+
+
+class TestScanPlanning:
+    """Test choosing between window-event regions and the fallback full scan."""
+
+    class FakeTrigger:
+        def __init__(self, region):
+            self.region = region
+
+        def take_region(self):
+            region, self.region = self.region, None
+            return region
+
+    def test_event_region_scanned_while_full_scan_not_due(self):
+        assert color_capture.plan_scan(self.FakeTrigger((1, 2, 3, 4)), False, 2.0, 10) == (1, 2, 3, 4)
+
+    @pytest.mark.parametrize("forced, since_full_scan", [(True, 2.0), (False, 10.0), (False, 60.0)])
+    def test_forced_or_overdue_scan_is_full_despite_pending_events(self, forced, since_full_scan):
+        trigger = self.FakeTrigger((1, 2, 3, 4))
+
+        assert color_capture.plan_scan(trigger, forced, since_full_scan, 10) is None
+        assert trigger.region is None   # Covered by the full scan
+
+    def test_no_trigger_always_full(self):
+        assert color_capture.plan_scan(None, False, 0.0, 10) is None
+
+
+class TestShippedDefaults:
+    """Test that the shipped reference asset keeps its detection box under the default settings."""
+
+    def test_real_asset_keeps_full_tolerance(self, restore_config, tmp_path):
+        color_capture.apply_config_overrides({'CAPTURES_DIR': str(tmp_path)})
+        cc = color_capture.create_color_capture(debug_mode=False)
+
+        assert list(cc.channel_tolerance()) == [color_capture.COLOR_TOLERANCE] * 3
+        assert cc.adapt_rate == 0
+
+    def test_margin_on_flat_asset_is_whole_box(self, tmp_path):
+        cc = ColorCapture(color_capture.COLOR_REF_PATH, tmp_path, debug_mode=False, use_ahk=False,
+                          reference_model="mode", tolerance_margin=15)
+
+        assert list(cc.channel_tolerance()) == [15, 15, 15]   # Measured spread is 0: opting in narrows the box
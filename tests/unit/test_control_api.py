@@ -0,0 +1,129 @@
+"""
+Tests for the local HTTP/JSON control API
+"""
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+from control_api import ControlServer, RuntimeState
+
+
+@pytest.fixture
+def state():
+    return RuntimeState(poll_interval=1.0)
+
+
+@pytest.fixture
+def server(state):
+    server = ControlServer(state).start()
+    yield server
+    server.stop()
+
+
+def request(server, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    try:
+        payload = json.dumps(body) if body is not None else None
+        conn.request(method, path, body=payload, headers={'Content-Type': 'application/json', **(headers or {})})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+class TestControlServer:
+    """Test the HTTP endpoints against a RuntimeState."""
+
+    def test_rejects_non_loopback_host(self, state):
+        with pytest.raises(ValueError):
+            ControlServer(state, host="0.0.0.0")
+
+    @pytest.mark.parametrize("headers", [
+        {'Host': "evil.example:8765"},                                  # DNS rebinding
+        {'Origin': "http://evil.example"},                              # Cross-site POST from a web page
+    ])
+    def test_rejects_foreign_host_or_origin(self, state, server, headers):
+        status, payload = request(server, "POST", "/pause", headers=headers)
+
+        assert status == 403
+        assert state.paused is False
+
+    def test_accepts_loopback_origin(self, state, server):
+        status, _ = request(server, "POST", "/pause", headers={'Origin': f"http://localhost:{server.port}"})
+
+        assert status == 200
+        assert state.paused is True
+
+    def test_detections_and_stats(self, state, server):
+        state.record_iteration(3, [{'image': None, 'coords': (10, 20, 90, 30), 'index': 0}],
+                               {'grab': 12.0, 'detect': 5.0}, cache={'ocr_cache_entries': 4})
+        state.record_iteration(4, [], {'grab': 14.0, 'detect': 7.0}, clicks={'success_rate': 0.5})
+
+        status, detections = request(server, "GET", "/detections")
+        assert status == 200
+        assert detections['iteration'] == 4
+        assert detections['detections'] == []
+
+        status, stats = request(server, "GET", "/stats")
+        assert stats['grab']['last_ms'] == 14.0
+        assert stats['grab']['median_ms'] == 13.0
+        assert stats['detect']['samples'] == 2
+
+        assert request(server, "GET", "/cache") == (200, {'ocr_cache_entries': 4})
+        assert request(server, "GET", "/clicks") == (200, {'success_rate': 0.5})
+
+    def test_pause_resume_and_scan(self, state, server):
+        assert request(server, "POST", "/pause")[1]['paused'] is True
+        assert state.paused
+
+        request(server, "POST", "/scan")
+        assert state.consume_scan_request() is True
+        assert state.consume_scan_request() is False
+
+        assert request(server, "POST", "/resume")[1]['paused'] is False
+
+    def test_poll_interval(self, state, server):
+        status, body = request(server, "POST", "/poll-interval", {'seconds': 0.25})
+        assert status == 200
+        assert body['poll_interval'] == 0.25
+        assert state.poll_interval == 0.25
+
+        request(server, "POST", "/poll-interval", {'seconds': None})
+        assert state.poll_interval == 1.0
+
+    @pytest.mark.parametrize("body", [{'seconds': -1}, {'seconds': "fast"}, {}])
+    def test_invalid_poll_interval(self, server, body):
+        status, response = request(server, "POST", "/poll-interval", body)
+
+        assert status == 400
+        assert 'error' in response
+
+    def test_unknown_endpoint_and_method(self, server):
+        assert request(server, "GET", "/nope")[0] == 404
+        assert request(server, "GET", "/pause")[0] == 405
+
+    def test_control_wakes_sleeping_loop(self, state, server):
+        sleeper = threading.Thread(target=state.wait, args=(10,))
+        start = time.perf_counter()
+        sleeper.start()
+
+        request(server, "POST", "/scan")
+        sleeper.join(timeout=5)
+
+        assert not sleeper.is_alive()
+        assert time.perf_counter() - start < 5
+
+
+class TestStageStats:
+    """Test the per-stage timing summary."""
+
+    @pytest.mark.parametrize("samples, p95", [([5.0], 5.0), ([1.0, 2.0, 3.0], 3.0), (list(range(1, 21)), 19.0)])
+    def test_p95_uses_nearest_rank(self, state, samples, p95):
+        for i, ms in enumerate(samples):
+            state.record_iteration(i, [], {'detect': float(ms)})
+
+        # With few samples a floor index under-reports the tail, e.g. 2.0 for three samples
+        assert state.stage_stats()['detect']['p95_ms'] == p95
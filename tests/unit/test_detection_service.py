@@ -0,0 +1,132 @@
+"""
+Tests for the shared-memory detection service and its client
+"""
+import threading
+import time
+import uuid
+from multiprocessing.connection import Client
+
+import numpy as np
+import pytest
+from multiprocessing import shared_memory
+
+from color_capture_core import DetectionRecord
+from detection_service import DEFAULT_AUTHKEY, NOTIFY_QUEUE_SIZE, DetectionClient, DetectionService
+
+
+@pytest.fixture
+def service(tmp_path):
+    name = f"acdet_{uuid.uuid4().hex[:8]}"
+    service = DetectionService(name, max_frame_shape=(120, 160, 3), results_size=4096,
+                               address=str(tmp_path / "det.sock"))
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def client(service):
+    client = DetectionClient(service.name, address=service.address)
+    deadline = time.time() + 5
+    while service.subscriber_count == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    yield client
+    client.close()
+
+
+def make_frame(value):
+    frame = np.zeros((100, 150, 3), dtype=np.uint8)
+    frame[10:30, 20:80] = value
+    return frame
+
+
+class TestDetectionService:
+    """Test publishing and subscribing through shared memory."""
+
+    def test_nothing_published_yet(self, client):
+        assert client.read_frame() == (0, None)
+        assert client.read_detections() == (0, [])
+
+    def test_publish_reaches_subscriber(self, service, client):
+        frame = make_frame((212, 120, 0))
+        detections = [DetectionRecord(frame, (20, 10, 60, 20), 0, term="Allow")]
+
+        seq = service.publish(frame, detections)
+        message = client.wait(timeout=5)
+
+        assert message[0] == seq
+        assert message[2] == 1
+        frame_seq, shared_frame = client.read_frame()
+        assert frame_seq == seq
+        assert np.array_equal(shared_frame, frame)
+        assert client.read_detections() == (seq, [{'coords': [20, 10, 60, 20], 'index': 0,
+                                                    'score': 1.0, 'term': "Allow"}])
+
+    def test_client_sees_latest_frame(self, service, client):
+        service.publish(make_frame(1), [])
+        seq = service.publish(make_frame(2), [])
+
+        frame_seq, frame = client.read_frame()
+
+        assert frame_seq == seq
+        assert frame[15, 30, 0] == 2
+
+    def test_oversized_frame_skipped_but_detections_published(self, service, client, capsys):
+        frame_seq = service.publish(make_frame(1), [])
+
+        seq = service.publish(np.zeros((200, 200, 3), dtype=np.uint8),
+                              [{'coords': (1, 2, 3, 4), 'index': 0}])
+
+        assert "exceeds shared memory capacity" in capsys.readouterr().out
+        assert client.read_frame()[0] == frame_seq
+        assert client.read_detections()[0] == seq
+
+    def test_stale_blocks_from_killed_service_replaced(self, tmp_path):
+        name = f"acdet_{uuid.uuid4().hex[:8]}"
+        stale = [shared_memory.SharedMemory(name=f"{name}_{block}", create=True, size=64)
+                 for block in ("frame", "results")]
+        for shm in stale:
+            shm.close()  # Killed before close(): the blocks outlive the process
+
+        with DetectionService(name, max_frame_shape=(120, 160, 3), address=str(tmp_path / "det.sock")) as service:
+            assert service.publish(make_frame(1), []) == 2
+
+    def test_closed_subscriber_is_dropped(self, service, client):
+        client.close()
+
+        deadline = time.time() + 5
+        while service.subscriber_count and time.time() < deadline:   # Sends fail on the sender thread
+            service.publish(make_frame(1), [])
+            time.sleep(0.01)
+
+        assert service.subscriber_count == 0
+
+    def test_subscriber_that_never_reads_does_not_block_publish(self, service, client):
+        stuck = Client(service.address, authkey=DEFAULT_AUTHKEY)   # Connects, never drains
+        deadline = time.time() + 5
+        while service.subscriber_count < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        finished = threading.Event()
+
+        def publish_many():
+            for i in range(5000):
+                service.publish(make_frame(i % 256), [])
+            finished.set()
+
+        threading.Thread(target=publish_many, daemon=True).start()
+        try:
+            assert finished.wait(timeout=20), "publish() blocked on a subscriber that never reads"
+        finally:
+            stuck.close()
+
+        assert service.seq == 10000
+        latest = None
+        while (message := client.wait(timeout=1)) is not None:
+            latest = message
+        assert latest[0] == service.seq   # The reading subscriber still got the newest notification
+        assert max(subscriber.dropped for subscriber in service._subscribers) >= 5000 - NOTIFY_QUEUE_SIZE - 1000
+
+    def test_close_releases_shared_memory(self, service):
+        service.close()
+
+        with pytest.raises(FileNotFoundError):
+            DetectionClient(service.name, address=service.address)
@@ -0,0 +1,61 @@
+"""
+Randomized stress tests for the detection pipeline
+
+Each test runs DETECTION_STRESS_ITERATIONS random screens (default 1000, so a
+plain run covers 9000 screens across the modes); raise it (e.g. 5000) before
+merging a detection optimization.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "utilities"))
+
+from detection_stress import check_invariants, compare_outputs, make_capture, random_screen
+
+ITERATIONS = int(os.environ.get("DETECTION_STRESS_ITERATIONS", "1000"))
+MAX_MEDIAN_MS = float(os.environ.get("DETECTION_STRESS_MAX_MEDIAN_MS", "60"))
+
+
+@pytest.mark.parametrize("mode", ["bgr", "hsv", "lab"])
+@pytest.mark.parametrize("shape_prefilter", [False, True])
+def test_invariants_hold_on_random_screens(mode, shape_prefilter, tmp_path):
+    cc = make_capture(tmp_path, color_match_mode=mode, shape_prefilter=shape_prefilter)
+    rng = np.random.default_rng(1000 + ["bgr", "hsv", "lab"].index(mode))
+
+    for iteration in range(ITERATIONS):
+        screen, planted = random_screen(rng)
+        violations = check_invariants(cc, screen, planted)
+        assert not violations, f"iteration {iteration} ({screen.shape[1]}x{screen.shape[0]}): {violations}"
+
+
+@pytest.mark.parametrize("mode", ["bgr", "hsv", "lab"])
+def test_reused_buffers_are_output_equivalent(mode, tmp_path):
+    plain = make_capture(tmp_path, color_match_mode=mode, shape_prefilter=True)
+    reusing = make_capture(tmp_path, color_match_mode=mode, shape_prefilter=True, reuse_buffers=True)
+    rng = np.random.default_rng(7)
+
+    for iteration in range(ITERATIONS):
+        screen, _ = random_screen(rng)
+        differences = compare_outputs(plain, reusing, screen)
+        assert not differences, f"iteration {iteration}: {differences}"
+
+
+@pytest.mark.parametrize("mode", ["bgr", "hsv", "lab"])
+def test_detection_time_ceiling(mode, tmp_path):
+    cc = make_capture(tmp_path, color_match_mode=mode, shape_prefilter=True)
+    rng = np.random.default_rng(3)
+    screens = [random_screen(rng, width=1280, height=720)[0] for _ in range(10)]
+    cc.find_matching_rectangles(screens[0])
+
+    timings = []
+    for screen in screens:
+        start = time.perf_counter()
+        cc.find_matching_rectangles(screen)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    assert sorted(timings)[len(timings) // 2] < MAX_MEDIAN_MS
@@ -0,0 +1,72 @@
+"""
+Tests for the slow-iteration sampling profiler
+"""
+import time
+
+import pytest
+
+from profiler import AGGREGATE_FILE, SlowIterationProfiler, StageTimer
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    profiler = SlowIterationProfiler(tmp_path / "profiles", threshold_ms=100, interval_ms=2,
+                                     max_files=2, debug_mode=False)
+    yield profiler
+    profiler.close()
+
+
+class TestSlowIterationProfiler:
+    """Test sampling, thresholds and output files."""
+
+    def test_slow_iteration_written_per_stage(self, profiler):
+        profiler.begin_iteration(7)
+        stages = StageTimer(profiler)
+        stages.enter('detect')
+        busy_wait(0.25)
+        stages.leave()
+        path = profiler.end_iteration()
+
+        assert path is not None and path.name.startswith("iteration_000007_")
+        lines = path.read_text().splitlines()
+        assert lines
+        stack, count = lines[0].rsplit(" ", 1)
+        assert stack.startswith("stage:detect;")
+        assert "test_profiler.busy_wait" in stack
+        assert int(count) > 0
+        assert (profiler.output_dir / AGGREGATE_FILE).read_text() == path.read_text()
+
+    def test_fast_iteration_not_sampled(self, profiler):
+        profiler.begin_iteration(1)
+        busy_wait(0.01)
+
+        assert profiler.end_iteration() is None
+        assert profiler._samples == {}
+        assert not profiler.output_dir.exists()
+
+    def test_old_files_pruned(self, profiler):
+        for iteration in range(4):
+            profiler.begin_iteration(iteration)
+            busy_wait(0.12)
+            profiler.end_iteration()
+
+        assert profiler.slow_iterations == 4
+        assert len(list(profiler.output_dir.glob("iteration_*.folded"))) == 2
+
+
+def test_stage_timer_accumulates():
+    stages = StageTimer()
+    stages.enter('grab')
+    time.sleep(0.01)
+    stages.enter('detect')
+    stages.leave()
+    stages.leave()
+
+    assert set(stages.ms) == {'grab', 'detect'}
+    assert stages.ms['grab'] >= 10
@@ -0,0 +1,96 @@
+"""
+Tests for span-based bounding boxes and the "spans" detection engine
+"""
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from span_detection import external_boxes, row_spans
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "utilities"))
+
+from detection_stress import compare_outputs, make_capture, random_screen
+
+
+def contour_boxes(mask):
+    contours, _ = cv2.findContours(mask.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return sorted(cv2.boundingRect(contour) for contour in contours)
+
+
+def span_boxes(mask):
+    rows, starts, ends = row_spans(mask)
+    return sorted(tuple(int(v) for v in box) for box in external_boxes(rows, starts, ends, *mask.shape))
+
+
+class TestSpanBoxes:
+    """Test that span components reproduce findContours(RETR_EXTERNAL) bounding boxes."""
+
+    def test_row_spans_are_exclusive_runs(self):
+        mask = np.array([[0, 255, 255, 0, 255],
+                         [255, 0, 0, 0, 0]], dtype=np.uint8)
+
+        rows, starts, ends = row_spans(mask, first_row=10)
+
+        assert rows.tolist() == [10, 10, 11]
+        assert starts.tolist() == [1, 4, 0]
+        assert ends.tolist() == [3, 5, 1]
+
+    def test_diagonal_pixels_join_one_component(self):
+        mask = np.zeros((6, 6), dtype=np.uint8)
+        mask[1, 1] = mask[2, 2] = mask[3, 3] = 255
+
+        assert span_boxes(mask) == [(1, 1, 3, 3)]
+
+    def test_component_inside_hole_is_not_external(self):
+        mask = np.zeros((20, 20), dtype=np.uint8)
+        mask[2:18, 2:18] = 255
+        mask[4:16, 4:16] = 0
+        mask[9:11, 9:11] = 255
+
+        assert span_boxes(mask) == [(2, 2, 16, 16)]
+        assert span_boxes(mask) == contour_boxes(mask)
+
+    def test_frame_fully_matching(self):
+        assert span_boxes(np.full((5, 7), 255, dtype=np.uint8)) == [(0, 0, 7, 5)]
+        assert span_boxes(np.zeros((5, 7), dtype=np.uint8)) == []
+
+    def test_random_masks_match_contours(self):
+        rng = np.random.default_rng(0)
+        for _ in range(300):
+            height, width = (int(v) for v in rng.integers(1, 50, size=2))
+            mask = (rng.random((height, width)) < rng.uniform(0.05, 0.8)).astype(np.uint8) * 255
+            assert span_boxes(mask) == contour_boxes(mask)
+
+
+class TestSpanEngine:
+    """Test the detection_engine="spans" option of ColorCapture."""
+
+    @pytest.mark.parametrize("mode", ["bgr", "hsv", "lab"])
+    @pytest.mark.parametrize("reuse_buffers", [False, True])
+    def test_output_equivalent_to_contours(self, mode, reuse_buffers, tmp_path):
+        contours = make_capture(tmp_path, color_match_mode=mode, shape_prefilter=True)
+        spans = make_capture(tmp_path, color_match_mode=mode, shape_prefilter=True,
+                             detection_engine="spans", span_band_rows=16, reuse_buffers=reuse_buffers)
+        rng = np.random.default_rng(11)
+
+        for iteration in range(100):
+            screen, _ = random_screen(rng)
+            differences = compare_outputs(contours, spans, screen)
+            assert not differences, f"iteration {iteration}: {differences}"
+
+    def test_region_offsets_rectangles(self, tmp_path):
+        spans = make_capture(tmp_path, detection_engine="spans")
+        screen = np.zeros((100, 200, 3), dtype=np.uint8)
+        screen[40:70, 120:180] = (212, 120, 0)
+
+        rectangles, mask = spans.find_matching_rectangles(screen, region=(100, 30, 100, 50))
+
+        assert rectangles == [(120, 40, 60, 30)]
+        assert mask.shape == (50, 100)
+
+    def test_unknown_engine_rejected(self, tmp_path):
+        with pytest.raises(ValueError, match="Unknown detection_engine"):
+            make_capture(tmp_path, detection_engine="gpu")
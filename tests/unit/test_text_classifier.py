@@ -0,0 +1,157 @@
+"""
+Tests for the local text classifier and its use as a ColorCapture recognizer
+"""
+import time
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+from unittest.mock import patch
+
+from color_capture_core import ColorCapture
+from capture_archive import CaptureArchive
+from text_classifier import NEGATIVE_LABEL, TextClassifier, load_archive_samples, load_training_samples
+
+LABELS = ["Allow", "Continue", "Dismiss"]
+NEGATIVES = ["Block", "No", "Later"]  # Trained as NEGATIVE_LABEL
+
+
+def render_button(text, scale=0.6, dx=0, dy=0, color=(212, 120, 0)):
+    """Render a button crop with white text, as captured from the screen."""
+    crop = np.full((32, 110, 3), color, dtype=np.uint8)
+    cv2.putText(crop, text, (8 + dx, 22 + dy), cv2.FONT_HERSHEY_SIMPLEX, scale, (255, 255, 255), 1, cv2.LINE_AA)
+    return crop
+
+
+def training_samples(labels=LABELS, negatives=NEGATIVES):
+    texts = [(label, label) for label in labels] + [(text, NEGATIVE_LABEL) for text in negatives]
+    return [(render_button(text, scale, dx, dy), label)
+            for text, label in texts
+            for scale in (0.55, 0.6, 0.65)
+            for dx, dy in ((0, 0), (2, 1), (-2, -1))]
+
+
+def unseen_variation(text):
+    return render_button(text, 0.62, 1, 0, color=(205, 115, 5))
+
+
+@pytest.fixture
+def classifier():
+    return TextClassifier.train(training_samples())
+
+
+@pytest.fixture
+def model_path(classifier, tmp_path):
+    path = tmp_path / "model.npz"
+    classifier.save(path)
+    return path
+
+
+class TestTextClassifier:
+    """Test training, prediction and persistence."""
+
+    @pytest.mark.parametrize("label", LABELS)
+    def test_predicts_unseen_variations(self, classifier, label):
+        predicted, confidence = classifier.predict(unseen_variation(label))
+
+        assert predicted == label
+        assert confidence > 0.1
+
+    def test_unrelated_crop_has_no_confidence(self, classifier):
+        noise = np.random.default_rng(0).integers(0, 256, size=(32, 110, 3), dtype=np.uint8)
+
+        _, confidence = classifier.predict(noise)
+
+        assert confidence == 0.0
+
+    def test_model_without_negatives_is_never_confident(self):
+        allow_only = TextClassifier.train(training_samples(["Allow"], negatives=[]))
+
+        for text in ("Allow", "Deny", "Cancel", "Block"):
+            assert allow_only.predict(unseen_variation(text))[1] == 0.0
+
+    def test_save_and_load(self, classifier, model_path):
+        loaded = TextClassifier.load(model_path)
+
+        assert loaded.labels == classifier.labels
+        assert loaded.predict(render_button("Allow"))[0] == "Allow"
+
+    def test_prediction_is_fast(self, classifier):
+        crops = [render_button(label) for label in LABELS] * 100
+        classifier.predict(crops[0])
+
+        start = time.perf_counter()
+        for crop in crops:
+            classifier.predict(crop)
+        per_crop_ms = (time.perf_counter() - start) * 1000 / len(crops)
+
+        assert per_crop_ms < 1.0
+
+    def test_training_samples_from_label_folders(self, tmp_path):
+        for label in ("Allow", "none"):
+            (tmp_path / label).mkdir()
+            cv2.imwrite(str(tmp_path / label / "a.png"), render_button(label))
+
+        samples = load_training_samples(tmp_path)
+
+        assert sorted(label for _, label in samples) == ["Allow", "none"]
+
+    def test_training_samples_from_archive(self, tmp_path):
+        with CaptureArchive(tmp_path / "archive", debug_mode=False) as archive:
+            archive.add(render_button("Allow"), (0, 0, 110, 32), "Allow")
+            archive.add(render_button("Allow"), (0, 0, 110, 32), "Allow")
+            archive.add(render_button("Continue"), (0, 40, 110, 32), "Continue")
+
+        samples = load_archive_samples(tmp_path / "archive")
+
+        assert sorted(label for _, label in samples) == ["Allow", "Continue"]
+        assert np.array_equal(samples[0][0], render_button("Allow"))
+
+
+class TestClassifierRecognizer:
+    """Test ColorCapture with recognizer='classifier'."""
+
+    @pytest.fixture
+    def color_ref_image(self, tmp_path):
+        path = tmp_path / "color_ref.png"
+        Image.new('RGB', (10, 10), color=(0, 120, 212)).save(path)
+        return path
+
+    def test_confident_decisions_skip_tesseract(self, color_ref_image, model_path, tmp_path):
+        cc = ColorCapture(color_ref_image, tmp_path / "captures", ocr_search_text=["Allow", "Continue"],
+                          debug_mode=False, use_ahk=False, recognizer="classifier",
+                          classifier_model_path=model_path)
+
+        with patch('color_capture_core.pytesseract.image_to_string') as mock_ocr:
+            assert cc.contains_target_text(render_button("Allow", 0.6, 1, 1)) is True
+            assert cc.contains_target_text(render_button("Dismiss", 0.6, 1, 1)) is False
+
+        mock_ocr.assert_not_called()
+        assert cc.stats['classifier_decisions'] == 2
+
+    def test_low_confidence_falls_back_to_tesseract(self, color_ref_image, model_path, tmp_path):
+        cc = ColorCapture(color_ref_image, tmp_path / "captures", ocr_search_text="Allow",
+                          debug_mode=False, use_ahk=False, recognizer="classifier",
+                          classifier_model_path=model_path)
+        noise = np.random.default_rng(1).integers(0, 256, size=(32, 110, 3), dtype=np.uint8)
+
+        with patch('color_capture_core.pytesseract.image_to_string', return_value="Allow") as mock_ocr:
+            assert cc.contains_target_text(noise) is True
+
+        assert mock_ocr.call_count == 1
+        assert cc.stats['classifier_fallbacks'] == 1
+
+    @pytest.mark.parametrize("text", ["Deny", "Cancel", "Don't Allow"])
+    def test_out_of_vocabulary_labels_fall_back_to_tesseract(self, color_ref_image, text, tmp_path):
+        model_path = tmp_path / "vocabulary.npz"
+        TextClassifier.train(training_samples(["Allow", "Try Again", "Continue"])).save(model_path)
+        cc = ColorCapture(color_ref_image, tmp_path / "captures", ocr_search_text=["Allow", "Try Again", "Continue"],
+                          debug_mode=False, use_ahk=False, recognizer="classifier",
+                          classifier_model_path=model_path)
+
+        with patch('color_capture_core.pytesseract.image_to_string', return_value=text) as mock_ocr:
+            assert cc.contains_target_text(unseen_variation(text)) is ("Allow" in text)
+
+        assert mock_ocr.call_count == 1
+        assert cc.stats['classifier_decisions'] == 0
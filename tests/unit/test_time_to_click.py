@@ -0,0 +1,57 @@
+"""
+Tests for the time-to-click benchmark's event log summary (no X server needed)
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "utilities"))
+
+from benchmark_time_to_click import DOUBLE_CLICK_WINDOW, summarize
+
+
+def write_events(path, events):
+    with open(path, 'w', encoding='utf-8') as f:
+        for event, fields in events:
+            f.write(json.dumps({'event': event, **fields}) + "\n")
+    return path
+
+
+class TestSummarize:
+    """Test latency, miss and duplicate accounting from a target event log."""
+
+    @pytest.fixture
+    def summary(self, tmp_path):
+        return summarize(write_events(tmp_path / "events.jsonl", [
+            ('ready', {'t': 0.0, 'width': 1280, 'height': 720}),
+            ('shown', {'id': 1, 't': 10.0, 'x': 5, 'y': 5}),
+            ('press', {'id': 1, 't': 10.2}),
+            ('press', {'id': 1, 't': 10.2 + DOUBLE_CLICK_WINDOW / 2}),   # Second half of the double-click
+            ('press', {'id': 1, 't': 11.0}),                             # Clicked again: duplicate
+            ('hidden', {'id': 1, 't': 10.7, 'reason': "clicked"}),
+            ('shown', {'id': 2, 't': 20.0, 'x': 5, 'y': 5}),
+            ('hidden', {'id': 2, 't': 28.0, 'reason': "timeout"}),       # Never clicked: missed
+            ('shown', {'id': 3, 't': 30.0, 'x': 5, 'y': 5}),
+            ('press', {'id': 3, 't': 30.5}),
+            ('shown', {'id': 4, 't': 40.0, 'x': 5, 'y': 5}),
+            ('press', {'id': 4, 't': 40.1}),
+        ]))
+
+    def test_counts(self, summary):
+        assert (summary['shown'], summary['clicked'], summary['missed']) == (4, 3, 1)
+
+    def test_double_click_is_not_a_duplicate(self, summary):
+        assert summary['duplicates'] == 1
+
+    def test_latencies_use_first_press_and_nearest_rank_p95(self, summary):
+        assert summary['median_ms'] == pytest.approx(200)
+        assert summary['p95_ms'] == pytest.approx(500)   # Nearest rank of [100, 200, 500]; a floor index gives 200
+        assert summary['max_ms'] == pytest.approx(500)
+
+    def test_nothing_clicked(self, tmp_path):
+        summary = summarize(write_events(tmp_path / "events.jsonl", [('shown', {'id': 1, 't': 1.0})]))
+
+        assert summary['missed'] == 1
+        assert summary['median_ms'] is None and summary['p95_ms'] is None
@@ -0,0 +1,118 @@
+"""
+Tests for warm state snapshots (save/load and ColorCapture state round-trip)
+"""
+import json
+import struct
+import zlib
+
+import pytest
+import numpy as np
+from PIL import Image
+
+from color_capture_core import ColorCapture
+from warm_state import load_snapshot, save_snapshot, SNAPSHOT_MAGIC, SNAPSHOT_VERSION
+
+
+@pytest.fixture
+def color_ref_image(tmp_path):
+    """Create a reference color image (light gray)."""
+    path = tmp_path / "color_ref.png"
+    Image.new('RGB', (100, 100), color=(200, 200, 200)).save(path)
+    return path
+
+
+@pytest.fixture
+def warm_capture(color_ref_image, tmp_path):
+    """ColorCapture with some learned state."""
+    cc = ColorCapture(color_ref_image, tmp_path / "captures", debug_mode=False, use_ahk=False)
+    cc._ocr_cache["abc123"] = "Allow\n"
+    cc._record_hotspot((10, 20, 100, 30))
+    cc._record_hotspot((10, 20, 100, 30))
+    return cc
+
+
+class TestSnapshotFile:
+    """Test the on-disk snapshot format."""
+
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / "state.bin"
+        state = {'ref_color': [1, 2, 3], 'ocr_cache': [["k", "Allow"]], 'hotspots': []}
+
+        save_snapshot(path, state)
+
+        assert load_snapshot(path) == state
+        assert not path.with_name("state.bin.tmp").exists()
+
+    def test_missing_file_returns_none(self, tmp_path):
+        assert load_snapshot(tmp_path / "missing.bin") is None
+
+    def test_corrupt_payload_rejected(self, tmp_path):
+        path = tmp_path / "state.bin"
+        save_snapshot(path, {'ref_color': [1, 2, 3]})
+        data = bytearray(path.read_bytes())
+        data[-1] ^= 0xFF
+        path.write_bytes(bytes(data))
+
+        with pytest.raises(ValueError, match="checksum"):
+            load_snapshot(path)
+
+    def test_truncated_file_rejected(self, tmp_path):
+        path = tmp_path / "state.bin"
+        path.write_bytes(b"ACW")
+
+        with pytest.raises(ValueError, match="truncated"):
+            load_snapshot(path)
+
+    @pytest.mark.parametrize("document", [{'saved_at': 1.0}, {'state': [1, 2]}, ["state"]])
+    def test_intact_file_without_state_dict_rejected(self, tmp_path, document):
+        path = tmp_path / "state.bin"
+        payload = zlib.compress(json.dumps(document).encode('utf-8'))
+        path.write_bytes(struct.pack("<4sHII", SNAPSHOT_MAGIC, SNAPSHOT_VERSION, zlib.crc32(payload), len(payload))
+                         + payload)
+
+        with pytest.raises(ValueError, match="no state"):
+            load_snapshot(path)
+
+    def test_version_mismatch_rejected(self, tmp_path):
+        path = tmp_path / "state.bin"
+        save_snapshot(path, {})
+        data = bytearray(path.read_bytes())
+        data[4:6] = (SNAPSHOT_VERSION + 1).to_bytes(2, 'little')
+        path.write_bytes(bytes(data))
+
+        with pytest.raises(ValueError, match="version"):
+            load_snapshot(path)
+
+
+class TestColorCaptureState:
+    """Test ColorCapture export_state/import_state."""
+
+    def test_state_restored_into_new_instance(self, warm_capture, color_ref_image, tmp_path):
+        path = tmp_path / "state.bin"
+        save_snapshot(path, warm_capture.export_state())
+
+        cc = ColorCapture(color_ref_image, tmp_path / "captures", debug_mode=False, use_ahk=False)
+        restored_ref = cc.import_state(load_snapshot(path))
+
+        assert restored_ref is True
+        assert cc._ocr_cache["abc123"] == "Allow\n"
+        assert cc.hotspots == {(10, 20, 100, 30): 2}
+        np.testing.assert_array_equal(cc.ref_color, warm_capture.ref_color)
+
+    def test_reference_color_ignored_when_image_changed(self, warm_capture, color_ref_image, tmp_path):
+        state = warm_capture.export_state()
+        state['ref_color'] = [0, 0, 0]
+        Image.new('RGB', (50, 50), color=(200, 200, 200)).save(color_ref_image)
+
+        cc = ColorCapture(color_ref_image, tmp_path / "captures", debug_mode=False, use_ahk=False)
+
+        assert cc.import_state(state) is False
+        assert list(cc.ref_color) == [200, 200, 200]
+        assert cc._ocr_cache["abc123"] == "Allow\n"
+
+    def test_ocr_cache_hit_skips_tesseract(self, warm_capture):
+        crop = np.full((30, 100, 3), 200, dtype=np.uint8)
+        warm_capture._ocr_cache[warm_capture._crop_digest(crop)] = "Allow"
+
+        assert warm_capture.extract_text_from_image(crop) == "Allow"
+        assert warm_capture.stats['ocr_cache_hits'] == 1
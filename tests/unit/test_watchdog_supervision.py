@@ -0,0 +1,240 @@
+"""
+Tests for the watchdog's supervision helpers (run without starting color_capture.py)
+"""
+import io
+import logging
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "utilities"))
+
+from supervision import ControlChannel, HeartbeatWriter, read_heartbeat
+from watchdog import ColorCaptureWatchdog, OutputPump, RestartPolicy, WatchdogGroup
+
+
+@pytest.fixture
+def watchdog(tmp_path):
+    """Watchdog pointed at a dummy script, with a fake child process attached."""
+    (tmp_path / "color_capture.py").write_text("")
+    wd = ColorCaptureWatchdog(script_dir=tmp_path, stall_timeout=5, latency_slo_ms=100,
+                              slo_breach_limit=2, echo_output=False)
+    wd.process = SimpleNamespace(pid=4321)
+    wd._reset_health()
+    return wd
+
+
+def write_heartbeat(wd, iteration, latency_ms, sleep_seconds=0.0):
+    writer = HeartbeatWriter(wd.heartbeat_file)
+    writer.launch_token = wd._launch_token
+    writer.beat(iteration, latency_ms, sleep_seconds=sleep_seconds, rectangles=0, captures=0)
+
+
+class TestOutputPump:
+    """Test background draining of child output."""
+
+    def test_lines_go_to_ring_buffer_and_metrics(self):
+        stream = io.StringIO("line 1\n[METRIC] time_to_first_detection_ms=5\nline 3\n")
+        ring_buffer = deque(maxlen=2)
+        metrics = []
+        logger = logging.getLogger("test_output_pump")
+        logger.addHandler(logging.NullHandler())
+        logger.propagate = False
+
+        pump = OutputPump(stream, "stdout", ring_buffer, logger, echo=False, on_metric=metrics.append)
+        pump.start().join(timeout=5)
+
+        assert pump.line_count == 3
+        assert [line for _, _, line in ring_buffer] == ["[METRIC] time_to_first_detection_ms=5", "line 3"]
+        assert metrics == ["[METRIC] time_to_first_detection_ms=5"]
+
+
+class TestHeartbeat:
+    """Test the heartbeat channel and the watchdog's health checks."""
+
+    def test_heartbeat_round_trip(self, tmp_path):
+        writer = HeartbeatWriter(tmp_path / "heartbeat.json")
+        writer.beat(7, 12.345, rectangles=3, captures=1)
+
+        record = read_heartbeat(tmp_path / "heartbeat.json")
+
+        assert record['iteration'] == 7
+        assert record['latency_ms'] == 12.35
+        assert record['queues'] == {'rectangles': 3, 'captures': 1}
+
+    def test_progressing_child_is_healthy(self, watchdog):
+        write_heartbeat(watchdog, 1, 20)
+        assert watchdog._check_health() is None
+        write_heartbeat(watchdog, 2, 20)
+        assert watchdog._check_health() is None
+        assert watchdog.last_heartbeat['iteration'] == 2
+
+    def test_stalled_child_is_unhealthy(self, watchdog):
+        write_heartbeat(watchdog, 1, 20)
+        assert watchdog._check_health() is None
+
+        watchdog._last_progress_time = time.time() - 10
+
+        assert "no progress" in watchdog._check_health()
+
+    def test_throttled_sleep_is_not_a_stall(self, watchdog, tmp_path):
+        channel = ControlChannel(tmp_path / "control.json")
+        (tmp_path / "control.json").write_text('{"max_cpu_share": 0.1, "poll_interval_scale": 16}')
+        sleep_seconds = channel.sleep_interval(1.0, 2.0)
+        assert sleep_seconds > watchdog.stall_timeout
+
+        write_heartbeat(watchdog, 1, 2000, sleep_seconds=sleep_seconds)
+        assert watchdog._check_health() is None
+        watchdog._last_progress_time = time.time() - sleep_seconds - 1
+        assert watchdog._check_health() is None
+
+        watchdog._last_progress_time = time.time() - sleep_seconds - watchdog.stall_timeout - 1
+        assert "no progress" in watchdog._check_health()
+
+    def test_consecutive_slo_breaches_are_unhealthy(self, watchdog):
+        write_heartbeat(watchdog, 1, 500)
+        assert watchdog._check_health() is None
+        write_heartbeat(watchdog, 2, 500)
+
+        assert "SLO" in watchdog._check_health()
+
+    def test_heartbeat_from_other_launch_ignored(self, watchdog):
+        HeartbeatWriter(watchdog.heartbeat_file).beat(1, 500)   # No or another launch's token
+        assert watchdog._check_health() is None
+        assert watchdog.last_heartbeat is None
+
+    def test_heartbeat_matched_by_launch_token_not_pid(self, watchdog, monkeypatch):
+        monkeypatch.setenv("COLOR_CAPTURE_LAUNCH_TOKEN", watchdog._launch_token)
+        writer = HeartbeatWriter(watchdog.heartbeat_file)
+        writer.pid = watchdog.process.pid + 1   # Real interpreter behind a Windows venv launcher
+        writer.beat(1, 20)
+
+        assert watchdog._check_health() is None
+        assert watchdog.last_heartbeat['iteration'] == 1
+
+
+class TestResourceBudgets:
+    """Test CPU/memory budget enforcement and the control channel."""
+
+    def test_sustained_cpu_overuse_throttles_child(self, watchdog):
+        watchdog.cpu_budget_percent = 25
+        channel = ControlChannel(watchdog.control_file)
+
+        for _ in range(3):
+            assert watchdog._enforce_budgets({'cpu_percent': 80, 'memory_mb': 50}) is None
+
+        assert watchdog.poll_interval_scale == 2
+        assert channel.poll() == {'max_cpu_share': 0.25, 'poll_interval_scale': 2}
+
+    def test_memory_overuse_requests_restart(self, watchdog):
+        watchdog.memory_budget_mb = 100
+
+        reason = watchdog._enforce_budgets({'cpu_percent': 1, 'memory_mb': 150})
+
+        assert "exceeds 100MB budget" in reason
+
+    def test_memory_trend_from_history(self, watchdog):
+        for minute in range(5):
+            watchdog.resource_history.append(
+                {'timestamp': 1000 + minute * 60, 'pid': 1, 'cpu_percent': 0, 'memory_mb': 100 + 3 * minute}
+            )
+
+        assert watchdog.memory_trend_mb_per_min() == pytest.approx(3.0)
+
+    def test_sleep_interval_caps_cpu_share(self, tmp_path):
+        channel = ControlChannel(tmp_path / "control.json")
+        assert channel.sleep_interval(1.0, 0.5) == 1.0
+
+        (tmp_path / "control.json").write_text('{"max_cpu_share": 0.25, "poll_interval_scale": 1}')
+
+        # 2s busy at a 25% share needs at least 6s of sleep
+        assert channel.sleep_interval(1.0, 2.0) == pytest.approx(6.0)
+
+
+class TestRestartPolicy:
+    """Test exponential restart backoff and crash-loop detection."""
+
+    def test_quick_exits_back_off_exponentially(self):
+        policy = RestartPolicy(base_delay=1, max_delay=5, reset_after=60, crash_loop_count=0)
+
+        delays = [policy.next_delay(uptime=1, now=1000 + i * 100) for i in range(5)]
+
+        assert delays == [1, 2, 4, 5, 5]
+
+    def test_healthy_uptime_resets_backoff(self):
+        policy = RestartPolicy(base_delay=1, reset_after=60, crash_loop_count=0)
+        policy.next_delay(uptime=1, now=1000)
+        policy.next_delay(uptime=1, now=1100)
+
+        assert policy.next_delay(uptime=600, now=1800) == 0
+        assert policy.next_delay(uptime=1, now=1900) == 1
+
+    def test_crash_loop_holds_restarts_off(self):
+        policy = RestartPolicy(base_delay=1, crash_loop_count=3, crash_loop_window=60, crash_loop_cooldown=300)
+
+        assert policy.next_delay(uptime=1, now=1000) == 1
+        assert policy.next_delay(uptime=1, now=1010) == 2
+        assert policy.next_delay(uptime=1, now=1020) == 300
+        assert policy.in_crash_loop
+
+        # Exits spread further apart than the window are no loop
+        assert policy.next_delay(uptime=1, now=1200) == 8
+        assert not policy.in_crash_loop
+
+
+class TestExitSupervision:
+    """Test event-driven exit detection with real child processes."""
+
+    def make_watchdog(self, tmp_path, exit_code, **options):
+        (tmp_path / "color_capture.py").write_text(f"import sys\nsys.exit({exit_code})\n")
+        return ColorCaptureWatchdog(script_dir=tmp_path, echo_output=False, check_interval=30,
+                                    restart_delay=0.01, backoff_reset_after=60, **options)
+
+    def test_exit_detected_without_waiting_for_check_interval(self, tmp_path):
+        wd = self.make_watchdog(tmp_path, 3)
+        assert wd._start_process()
+
+        start = time.time()
+        assert wd.exited.wait(timeout=10)
+        wd.step()
+
+        assert time.time() - start < 5  # Far below the 30s check interval
+        assert wd.process is None
+        assert wd.next_start_time is not None
+        assert wd.restart_policy.failures == 1
+
+    def test_child_receives_current_launch_token(self, tmp_path):
+        (tmp_path / "color_capture.py").write_text(
+            "import os\nopen('token.txt', 'w').write(os.environ['COLOR_CAPTURE_LAUNCH_TOKEN'])\n")
+        wd = ColorCaptureWatchdog(script_dir=tmp_path, echo_output=False, check_interval=30)
+        assert wd._start_process()
+        assert wd.exited.wait(timeout=10)
+
+        assert (tmp_path / "token.txt").read_text() == wd._launch_token
+
+    def test_group_supervises_instances_until_restarts_exhausted(self, tmp_path):
+        (tmp_path / "color_capture.py").write_text(
+            "import os, sys\nopen(os.environ['COLOR_CAPTURE_INSTANCE'] + '.started', 'w').close()\nsys.exit(0)\n")
+        watchdogs = [
+            ColorCaptureWatchdog(script_dir=tmp_path, echo_output=False, check_interval=30, restart_delay=0.01,
+                                 max_restart_attempts=2, name=name, capture_args=["--config", f"{name}.json"])
+            for name in ("left", "right")
+        ]
+
+        WatchdogGroup(watchdogs).run()
+
+        assert [wd.restart_count for wd in watchdogs] == [2, 2]
+        assert watchdogs[0].heartbeat_file.name == "heartbeat_left.json"
+        assert watchdogs[1].control_file.name == "control_right.json"
+        assert (tmp_path / "left.started").exists() and (tmp_path / "right.started").exists()
+
+    def test_group_requires_unique_names(self, tmp_path):
+        (tmp_path / "color_capture.py").write_text("")
+        watchdogs = [ColorCaptureWatchdog(script_dir=tmp_path, echo_output=False, name="same") for _ in range(2)]
+
+        with pytest.raises(ValueError, match="unique names"):
+            WatchdogGroup(watchdogs)
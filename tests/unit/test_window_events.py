@@ -0,0 +1,89 @@
+"""
+Tests for the X11 window event trigger
+"""
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+import pytest
+
+from window_events import WindowEventTrigger
+
+
+class TestRegionCollection:
+    """Test region bookkeeping (no X server needed)."""
+
+    def test_regions_are_merged_until_taken(self):
+        trigger = WindowEventTrigger()
+        trigger.add_region(100, 100, 200, 50)
+        trigger.add_region(50, 300, 100, 100)
+
+        assert trigger.take_region() == (50, 100, 250, 300)
+        assert trigger.take_region() is None
+        assert trigger.events_seen == 2
+
+    def test_empty_windows_ignored(self):
+        trigger = WindowEventTrigger()
+        trigger.add_region(10, 10, 0, 40)
+
+        assert trigger.take_region() is None
+
+    def test_region_reported_again_for_late_painting(self):
+        trigger = WindowEventTrigger(rescan_delays=(0.25, 1.0))
+        trigger.add_region(100, 100, 200, 50)
+        trigger.settle(now=10.0)
+        assert trigger.take_region() == (100, 100, 200, 50)
+
+        assert not trigger.release_rescans(now=10.2)
+        assert trigger.next_rescan_in(now=10.2) == pytest.approx(0.05)
+        assert trigger.release_rescans(now=10.3)
+        assert trigger.take_region() == (100, 100, 200, 50)
+
+        assert trigger.release_rescans(now=11.0)
+        assert trigger.take_region() == (100, 100, 200, 50)
+        assert trigger.next_rescan_in(now=11.0) is None
+        assert trigger.events_seen == 1
+
+    def test_unavailable_without_display(self, monkeypatch):
+        monkeypatch.delenv("DISPLAY", raising=False)
+
+        assert WindowEventTrigger.start_if_available() is None
+
+
+@pytest.fixture
+def xvfb():
+    if shutil.which("Xvfb") is None:
+        pytest.skip("Xvfb not installed")
+    display_name = ":97"
+    process = subprocess.Popen(["Xvfb", display_name, "-screen", "0", "800x600x24"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)
+    yield display_name
+    process.terminate()
+    process.wait(timeout=5)
+
+
+class TestXvfb:
+    """Test the trigger against a real X server."""
+
+    def test_mapped_window_reported(self, xvfb):
+        from Xlib import X, display
+
+        fired = threading.Event()
+        trigger = WindowEventTrigger(on_event=fired.set, display_name=xvfb).start()
+        try:
+            client = display.Display(xvfb)
+            root = client.screen().root
+            window = root.create_window(120, 80, 300, 120, 0, client.screen().root_depth,
+                                        X.InputOutput, X.CopyFromParent)
+            window.map()
+            client.sync()
+
+            assert fired.wait(timeout=5)
+            x, y, w, h = trigger.take_region()
+            assert (x, y) == (120, 80) and (w, h) == (300, 120)
+            client.close()
+        finally:
+            trigger.stop()
@@ -0,0 +1,120 @@
+"""
+Detection benchmark - times the masking/contour stage on synthetic screens
+
+Builds a synthetic desktop with reference-colored buttons plus "near miss"
+distractor patches (inside the BGR tolerance box but perceptually different),
+then reports timing and candidate counts per color mode and detection engine.
+Run it at 3840x2160 as well: the spans engine's banded pass matters most when
+the frame no longer fits in cache.
+
+Measured here (median ms, 1920x1080 / 3840x2160; OCR candidates at 1080p):
+    bgr              5.5 / 17     37 candidates
+    hsv              6.5-9.6 / 28 33   (full-frame cvtColor before inRange)
+    lab              9.5 / 27     19   (BGR box, then the delta E table per prefiltered pixel)
+    bgr+prefilter    4.1-5.0 / 18  6
+    hsv+prefilter    11 / 42       6
+    lab+prefilter    8-12 / 32     8
+HSV and Lab cost more than bgr and are for references that bgr matches
+poorly, not a speedup. To cut OCR candidates cheaply, use bgr with
+shape_prefilter.
+
+Usage:
+    python tests/utilities/benchmark_detection.py [--width 1920] [--height 1080] [--runs 20]
+    python tests/utilities/benchmark_detection.py --width 3840 --height 2160
+"""
+import argparse
+import math
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from color_capture_core import ColorCapture, COLOR_MATCH_MODES
+
+REF_COLOR_BGR = (212, 120, 0)  # Same as assets/color_ref.png
+
+
+def make_screen(width, height, buttons=8, distractors=40, seed=0):
+    """Synthetic desktop: noisy background, reference buttons with text, near-miss patches."""
+    rng = np.random.default_rng(seed)
+    screen = rng.integers(200, 256, size=(height, width, 3), dtype=np.uint8)
+
+    for _ in range(buttons):
+        w, h = int(rng.integers(80, 180)), int(rng.integers(24, 44))
+        x, y = int(rng.integers(0, width - w)), int(rng.integers(0, height - h))
+        cv2.rectangle(screen, (x, y), (x + w, y + h), REF_COLOR_BGR, thickness=-1)
+        cv2.putText(screen, "Allow", (x + 8, y + h - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+
+    for _ in range(distractors):
+        w, h = int(rng.integers(70, 190)), int(rng.integers(22, 48))
+        x, y = int(rng.integers(0, width - w)), int(rng.integers(0, height - h))
+        # Within +/-30 per channel of the reference, but a visibly different color
+        offset = rng.integers(-28, 29, size=3)
+        color = tuple(int(np.clip(c + o, 0, 255)) for c, o in zip(REF_COLOR_BGR, offset))
+        cv2.rectangle(screen, (x, y), (x + w, y + h), color, thickness=-1)
+
+    return screen
+
+
+def make_capture(tmp_dir, **options):
+    ref_path = Path(tmp_dir) / "color_ref.png"
+    if not ref_path.exists():
+        cv2.imwrite(str(ref_path), np.full((4, 4, 3), REF_COLOR_BGR, dtype=np.uint8))
+    return ColorCapture(ref_path, Path(tmp_dir) / "captures", debug_mode=False,
+                        ocr_enabled=False, use_ahk=False, **options)
+
+
+def time_detection(cc, screen, runs):
+    """Median and p95 milliseconds of find_matching_rectangles over runs."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        rectangles, _ = cc.find_matching_rectangles(screen)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return rectangles, statistics.median(timings), timings[math.ceil(0.95 * len(timings)) - 1]
+
+
+def count_ocr_candidates(rectangles):
+    """Rectangles that would be sent to OCR by process_rectangles' size window."""
+    return sum(1 for _, _, w, h in rectangles if 60 < w < 200 and 20 < h < 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark color detection modes")
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    screen = make_screen(args.width, args.height, seed=args.seed)
+    print(f"Screen: {args.width}x{args.height}, {args.runs} runs per configuration\n")
+    print(f"{'configuration':<28} {'median ms':>10} {'p95 ms':>8} {'rects':>6} {'ocr cands':>10}")
+    print("-" * 66)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configurations = [(f"mode={mode}", {'color_match_mode': mode}) for mode in COLOR_MATCH_MODES]
+        configurations += [(f"mode={mode}+prefilter", {'color_match_mode': mode, 'shape_prefilter': True})
+                           for mode in COLOR_MATCH_MODES]
+        configurations += [(f"mode={mode}+spans", {'color_match_mode': mode, 'detection_engine': "spans"})
+                           for mode in COLOR_MATCH_MODES]
+        configurations += [(f"mode={mode}+spans+reuse", {'color_match_mode': mode, 'detection_engine': "spans",
+                                                        'reuse_buffers': True})
+                           for mode in COLOR_MATCH_MODES]
+
+        for label, options in configurations:
+            cc = make_capture(tmp_dir, **options)
+            rectangles, median_ms, p95_ms = time_detection(cc, screen, args.runs)
+            print(f"{label:<28} {median_ms:>10.2f} {p95_ms:>8.2f} "
+                  f"{len(rectangles):>6} {count_ocr_candidates(rectangles):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Time-to-click benchmark - end-to-end latency of the real capture loop under Xvfb
+
+Starts a headless X server, launches a Tk target application that pops up a
+reference-colored "Allow" window at random times and positions, and runs the
+unmodified color_capture.py loop (with --config overrides) against it. The
+target logs when each button became visible and every mouse press it
+received, from which the benchmark reports per configuration:
+
+    appearance-to-click latency (median / p95 / max)
+    missed buttons (never clicked before they timed out)
+    duplicate clicks (presses on a button after its first click, excluding
+    the second half of the clicker's double-click)
+
+Requires Xvfb (apt install xvfb) and Tk (python3-tk). Buttons are separate
+top-level windows, so window-event triggering sees them map like real dialogs.
+
+Status: not yet validated end to end, and no comparison results exist yet.
+No Xvfb build could be installed where it was written, so only summarize()
+(tests/unit/test_time_to_click.py) and the argument parsing have been
+exercised; the target, the clicker run and the reported numbers have not.
+Check the first results against clicker.log, then drop this paragraph and
+the warning in main().
+
+Usage:
+    python tests/utilities/benchmark_time_to_click.py [--buttons 20] [--ocr] [--configs my_configs.json]
+
+    my_configs.json: {"name": {"POLL_INTERVAL": 0.5, "WINDOW_EVENTS": false}, ...}
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+REF_COLOR_HEX = "#0078d4"  # RGB of assets/color_ref.png
+BUTTON_SIZE = (110, 32)
+DOUBLE_CLICK_WINDOW = 0.3  # Presses this soon after the first belong to the same double-click
+
+DEFAULT_CONFIGS = {
+    "poll-1s": {"POLL_INTERVAL": 1, "WINDOW_EVENTS": False},
+    "poll-250ms": {"POLL_INTERVAL": 0.25, "WINDOW_EVENTS": False},
+    "window-events": {"WINDOW_EVENTS": True},
+    "poll-1s-no-verify": {"POLL_INTERVAL": 1, "WINDOW_EVENTS": False, "VERIFY_CLICKS": False},
+}
+
+
+def run_target(args):
+    """Tk application: show the button window at random times, log appearances and presses."""
+    import tkinter as tk
+
+    rng = random.Random(args.seed)
+    events = open(args.events, 'a', encoding='utf-8')
+
+    def log(event, **fields):
+        events.write(json.dumps({'event': event, 't': time.time(), **fields}) + "\n")
+        events.flush()
+
+    root = tk.Tk()
+    width, height = root.winfo_screenwidth(), root.winfo_screenheight()
+    root.overrideredirect(True)
+    root.geometry(f"{width}x{height}+0+0")
+    root.configure(bg="#e8e8e8")
+
+    popup = tk.Toplevel(root)
+    popup.overrideredirect(True)
+    popup.withdraw()
+    label = tk.Label(popup, text="Allow", bg=REF_COLOR_HEX, fg="white", font=("DejaVu Sans", 11))
+    label.pack(fill="both", expand=True)
+
+    state = {'id': 0, 'visible': False, 'clicked': False}
+
+    def show():
+        if state['id'] >= args.buttons:
+            root.after(int(args.show_timeout * 1000), root.destroy)
+            return
+        state['id'] += 1
+        state['clicked'] = False
+        x = rng.randint(0, width - BUTTON_SIZE[0])
+        y = rng.randint(0, height - BUTTON_SIZE[1])
+        popup.geometry(f"{BUTTON_SIZE[0]}x{BUTTON_SIZE[1]}+{x}+{y}")
+        popup.deiconify()
+        popup.lift()
+        root.update()  # Flush to the X server so the button is really on screen
+        state['visible'] = True
+        log('shown', id=state['id'], x=x, y=y)
+        shown_id = state['id']
+        root.after(int(args.show_timeout * 1000), lambda: hide(shown_id, 'timeout'))
+
+    def hide(button_id, reason):
+        if button_id != state['id'] or not state['visible']:
+            return
+        popup.withdraw()
+        state['visible'] = False
+        log('hidden', id=button_id, reason=reason)
+        root.after(int(rng.uniform(args.min_gap, args.max_gap) * 1000), show)
+
+    def on_press(_event):
+        log('press', id=state['id'])
+        if not state['clicked']:
+            state['clicked'] = True
+            button_id = state['id']
+            root.after(int(args.dismiss_delay * 1000), lambda: hide(button_id, 'clicked'))
+
+    label.bind("<ButtonPress-1>", on_press)
+    log('ready', width=width, height=height)
+    root.after(int(rng.uniform(args.min_gap, args.max_gap) * 1000), show)
+    root.mainloop()
+    events.close()
+
+
+def summarize(events_path):
+    """Latency distribution and miss/duplicate counts from a target event log."""
+    shown = {}
+    presses = defaultdict(list)
+    with open(events_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if record['event'] == 'shown':
+                shown[record['id']] = record['t']
+            elif record['event'] == 'press':
+                presses[record['id']].append(record['t'])
+
+    latencies = []
+    missed = duplicates = 0
+    for button_id, shown_at in shown.items():
+        times = sorted(presses.get(button_id, []))
+        if not times:
+            missed += 1
+            continue
+        latencies.append((times[0] - shown_at) * 1000)
+        duplicates += sum(1 for t in times[1:] if t - times[0] > DOUBLE_CLICK_WINDOW)
+
+    latencies.sort()
+    return {
+        'shown': len(shown),
+        'clicked': len(latencies),
+        'missed': missed,
+        'duplicates': duplicates,
+        'median_ms': statistics.median(latencies) if latencies else None,
+        'p95_ms': latencies[math.ceil(0.95 * len(latencies)) - 1] if latencies else None,  # Nearest rank
+        'max_ms': latencies[-1] if latencies else None,
+    }
+
+
+def start_xvfb(display_name, width, height):
+    """Start Xvfb and wait until it accepts connections."""
+    if shutil.which("Xvfb") is None:
+        raise RuntimeError("Xvfb not found - install it (e.g. apt install xvfb) to run this benchmark")
+    process = subprocess.Popen(["Xvfb", display_name, "-screen", "0", f"{width}x{height}x24", "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    socket_path = Path("/tmp/.X11-unix") / f"X{display_name.lstrip(':')}"
+    deadline = time.time() + 10
+    while not socket_path.exists():
+        if process.poll() is not None or time.time() > deadline:
+            process.kill()
+            raise RuntimeError(f"Xvfb did not start on {display_name}")
+        time.sleep(0.05)
+    return process
+
+
+def wait_for_event(events_path, event, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if events_path.exists() and f'"event": "{event}"' in events_path.read_text(encoding='utf-8'):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def run_configuration(name, overrides, args, env, tmp_dir):
+    """Run the clicker with one configuration against a fresh target; return its summary."""
+    run_dir = Path(tmp_dir) / name
+    run_dir.mkdir()
+    events_path = run_dir / "events.jsonl"
+    config = {
+        'OCR_ENABLED': args.ocr,
+        'DEBUG_MODE': False,
+        'SNAPSHOT_INTERVAL': 0,
+        'CAPTURES_DIR': str(run_dir / "captures"),
+        'ARCHIVE_DIR': str(run_dir / "archive"),
+        **overrides,
+    }
+    config_path = run_dir / "config.json"
+    config_path.write_text(json.dumps(config), encoding='utf-8')
+
+    target = subprocess.Popen(
+        [sys.executable, __file__, "--target", "--events", str(events_path), "--seed", str(args.seed),
+         "--buttons", str(args.buttons), "--min-gap", str(args.min_gap), "--max-gap", str(args.max_gap),
+         "--show-timeout", str(args.show_timeout), "--dismiss-delay", str(args.dismiss_delay)],
+        env=env
+    )
+    if not wait_for_event(events_path, 'ready', timeout=10):
+        target.kill()
+        raise RuntimeError("Target window did not start (is Tk installed?)")
+
+    with open(run_dir / "clicker.log", 'w', encoding='utf-8') as clicker_log:
+        clicker = subprocess.Popen([sys.executable, str(PROJECT_DIR / "color_capture.py"), "--config", str(config_path)],
+                                   cwd=str(PROJECT_DIR), env=env, stdout=clicker_log, stderr=subprocess.STDOUT)
+        try:
+            target.wait(timeout=args.buttons * (args.max_gap + args.show_timeout) + 30)
+        finally:
+            clicker.terminate()
+            try:
+                clicker.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                clicker.kill()
+            if target.poll() is None:
+                target.kill()
+
+    return summarize(events_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark appearance-to-click latency under Xvfb")
+    parser.add_argument('--target', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--events', type=str, help=argparse.SUPPRESS)
+    parser.add_argument('--buttons', type=int, default=20, help='Buttons shown per configuration')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--min-gap', type=float, default=1.0, help='Min seconds between buttons')
+    parser.add_argument('--max-gap', type=float, default=3.0, help='Max seconds between buttons')
+    parser.add_argument('--show-timeout', type=float, default=8.0, help='Seconds before an unclicked button counts as missed')
+    parser.add_argument('--dismiss-delay', type=float, default=0.5, help='Seconds a clicked button stays visible (slow dialog)')
+    parser.add_argument('--ocr', action='store_true', help='Enable OCR in the clicker (needs Tesseract)')
+    parser.add_argument('--configs', type=str, default=None, help='JSON file of {name: {CONSTANT: value}}')
+    parser.add_argument('--display', type=str, default=":93")
+    parser.add_argument('--screen', type=str, default="1280x720")
+    args = parser.parse_args()
+
+    if args.target:
+        run_target(args)
+        return 0
+
+    configs = DEFAULT_CONFIGS
+    if args.configs:
+        with open(args.configs, 'r', encoding='utf-8') as f:
+            configs = json.load(f)
+
+    print("[WARNING] This benchmark has not been validated end to end yet (see module docstring)")
+    width, height = (int(v) for v in args.screen.split("x"))
+    xvfb = start_xvfb(args.display, width, height)
+    env = dict(os.environ, DISPLAY=args.display)
+    env.pop("COLOR_CAPTURE_HEARTBEAT", None)
+    env.pop("COLOR_CAPTURE_CONTROL", None)
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name, overrides in configs.items():
+                print(f"Running '{name}' ({args.buttons} buttons)...")
+                results.append((name, run_configuration(name, overrides, args, env, tmp_dir)))
+    finally:
+        xvfb.terminate()
+        xvfb.wait(timeout=5)
+
+    def fmt(value):
+        return f"{value:.0f}" if value is not None else "-"
+
+    print(f"\n{'configuration':<22} {'shown':>6} {'clicked':>8} {'missed':>7} {'dupes':>6} "
+          f"{'median ms':>10} {'p95 ms':>8} {'max ms':>8}")
+    print("-" * 82)
+    for name, summary in results:
+        print(f"{name:<22} {summary['shown']:>6} {summary['clicked']:>8} {summary['missed']:>7} "
+              f"{summary['duplicates']:>6} {fmt(summary['median_ms']):>10} {fmt(summary['p95_ms']):>8} "
+              f"{fmt(summary['max_ms']):>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+Detection stress harness - randomized screens, invariants and equivalence checks
+
+Generates randomized desktops (noise, overlapping and edge-touching buttons,
+patches with colors just inside and just outside the tolerance box) and checks
+that find_matching_rectangles/process_rectangles keep their invariants and
+agree with the reference implementation (plain inRange + external contours,
+i.e. the original detection code). Used by tests/unit/test_detection_stress.py
+and runnable standalone for long soak runs when proving an optimization
+(tiling, downscaling, a new engine) output-equivalent.
+
+Usage:
+    python tests/utilities/detection_stress.py [--iterations 5000] [--seed 0] [--mode bgr] [--engine spans]
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from color_capture_core import ColorCapture, COLOR_MATCH_MODES, DETECTION_ENGINES
+
+REF_COLOR_BGR = (212, 120, 0)  # Same as assets/color_ref.png
+TOLERANCE = 30
+
+
+def random_screen(rng, width=None, height=None, ref_bgr=REF_COLOR_BGR, tolerance=TOLERANCE):
+    """
+    Random desktop and the buttons planted on it.
+
+    Returns:
+        (screen, planted) where planted lists the (x, y, w, h) of solid
+        reference-colored buttons drawn last (so fully visible)
+    """
+    width = width or int(rng.integers(40, 640))
+    height = height or int(rng.integers(40, 480))
+    ref = np.array(ref_bgr, dtype=int)
+
+    background = rng.choice(["noise", "flat", "gradient"])
+    if background == "noise":
+        screen = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    elif background == "flat":
+        screen = np.full((height, width, 3), rng.integers(0, 256, size=3), dtype=np.uint8)
+    else:
+        ramp = np.linspace(0, 255, width, dtype=np.float32)
+        screen = np.repeat(np.repeat(ramp[None, :, None], height, axis=0), 3, axis=2).astype(np.uint8)
+
+    def random_rect(max_w=220, max_h=60):
+        w = int(rng.integers(1, min(max_w, width) + 1))
+        h = int(rng.integers(1, min(max_h, height) + 1))
+        edge = rng.random()
+        x = 0 if edge < 0.1 else width - w if edge < 0.2 else int(rng.integers(0, width - w + 1))
+        y = 0 if rng.random() < 0.1 else int(rng.integers(0, height - h + 1))
+        return x, y, w, h
+
+    # Patches at the tolerance boundary: per-channel offsets of exactly +/-tolerance or +/-(tolerance + 1)
+    for _ in range(int(rng.integers(0, 12))):
+        x, y, w, h = random_rect()
+        offset = rng.choice([-tolerance - 1, -tolerance, 0, tolerance, tolerance + 1], size=3)
+        color = np.clip(ref + offset, 0, 255)
+        screen[y:y+h, x:x+w] = color
+
+    planted = []
+    for _ in range(int(rng.integers(0, 6))):
+        x, y, w, h = random_rect()
+        screen[y:y+h, x:x+w] = ref_bgr
+        if w > 30 and h > 16 and rng.random() < 0.7:
+            cv2.putText(screen, "Allow", (x + 4, y + h - 5), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.5, (255, 255, 255), 1)
+            # Restore the outline so text never touches the border
+            cv2.rectangle(screen, (x, y), (x + w - 1, y + h - 1), ref_bgr, thickness=2)
+        planted.append((x, y, w, h))
+
+    return screen, planted
+
+
+def reference_mask(screen, ref_bgr=REF_COLOR_BGR, tolerance=TOLERANCE):
+    """Per-pixel BGR box match computed with plain NumPy."""
+    diff = np.abs(screen.astype(np.int16) - np.array(ref_bgr, dtype=np.int16))
+    return np.where((diff <= tolerance).all(axis=2), 255, 0).astype(np.uint8)
+
+
+def reference_rectangles(mask):
+    """Bounding boxes (w, h > 10) of the mask's external contours - the original detection code."""
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = (cv2.boundingRect(contour) for contour in contours)
+    return sorted((x, y, w, h) for x, y, w, h in boxes if w > 10 and h > 10)
+
+
+def check_invariants(cc, screen, planted):
+    """
+    Run detection on screen and return a list of violated invariants (empty if all hold).
+
+    Checked: rectangles lie inside the frame and pass the noise filter; each
+    rectangle's box is tight around matching pixels; every planted button lies
+    inside a rectangle (without the shape prefilter); in BGR mode mask and
+    rectangles equal the reference implementation; process_rectangles (OCR
+    disabled) returns exactly the in-window rectangles with matching crops.
+    """
+    violations = []
+    rectangles, mask = cc.find_matching_rectangles(screen)
+    rectangles = sorted(rectangles)
+    height, width = screen.shape[:2]
+
+    if mask.shape != (height, width) or mask.dtype != np.uint8:
+        violations.append(f"mask shape/dtype {mask.shape}/{mask.dtype}")
+    if not np.isin(mask, (0, 255)).all():
+        violations.append("mask contains values other than 0/255")
+
+    for x, y, w, h in rectangles:
+        if not (0 <= x and 0 <= y and x + w <= width and y + h <= height):
+            violations.append(f"rectangle {(x, y, w, h)} outside {width}x{height} frame")
+            continue
+        if w <= 10 or h <= 10:
+            violations.append(f"rectangle {(x, y, w, h)} should have been filtered as noise")
+        box = mask[y:y+h, x:x+w]
+        if not (box[0].any() and box[-1].any() and box[:, 0].any() and box[:, -1].any()):
+            violations.append(f"rectangle {(x, y, w, h)} is not tight around matching pixels")
+
+    if not cc.shape_prefilter and cc.color_match_mode in ("bgr", "hsv"):
+        for px, py, pw, ph in planted:
+            if pw <= 10 or ph <= 10:
+                continue
+            if not any(x <= px and y <= py and px + pw <= x + w and py + ph <= y + h
+                       for x, y, w, h in rectangles):
+                violations.append(f"planted button {(px, py, pw, ph)} not covered")
+
+    if cc.color_match_mode == "bgr":
+        ref_bgr = tuple(int(c) for c in cc.ref_color[::-1])
+        expected_mask = reference_mask(screen, ref_bgr, cc.color_tolerance)
+        if not np.array_equal(mask, expected_mask):
+            violations.append(f"mask differs from reference in {int((mask != expected_mask).sum())} pixel(s)")
+        if not cc.shape_prefilter and rectangles != reference_rectangles(expected_mask):
+            violations.append("rectangles differ from reference implementation")
+
+    if not cc.ocr_enabled:
+        records = cc.process_rectangles(screen, rectangles)
+        expected = [rect for rect in rectangles if 60 < rect[2] < 200 and 20 < rect[3] < 50]
+        if [record['coords'] for record in records] != expected:
+            violations.append("process_rectangles did not keep exactly the in-window rectangles")
+        for record in records:
+            x, y, w, h = record['coords']
+            if record['image'].shape != (h, w, 3) or not np.array_equal(record['image'], screen[y:y+h, x:x+w]):
+                violations.append(f"crop of {record['coords']} does not match the frame")
+
+    return violations
+
+
+def compare_outputs(cc_a, cc_b, screen):
+    """Return a list of differences between two ColorCaptures' detection output on screen."""
+    rectangles_a, mask_a = cc_a.find_matching_rectangles(screen)
+    rectangles_b, mask_b = cc_b.find_matching_rectangles(screen)
+    differences = []
+    if sorted(rectangles_a) != sorted(rectangles_b):
+        differences.append(f"rectangles {sorted(rectangles_a)} != {sorted(rectangles_b)}")
+    if not np.array_equal(mask_a, mask_b):
+        differences.append(f"masks differ in {int((mask_a != mask_b).sum())} pixel(s)")
+    return differences
+
+
+def make_capture(tmp_dir, **options):
+    ref_path = Path(tmp_dir) / "color_ref.png"
+    if not ref_path.exists():
+        cv2.imwrite(str(ref_path), np.full((4, 4, 3), REF_COLOR_BGR, dtype=np.uint8))
+    options.setdefault('ocr_enabled', False)
+    return ColorCapture(ref_path, Path(tmp_dir) / "captures", debug_mode=False, use_ahk=False,
+                        color_tolerance=TOLERANCE, **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress the detection pipeline with random screens")
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mode', choices=COLOR_MATCH_MODES, default="bgr")
+    parser.add_argument('--engine', choices=DETECTION_ENGINES, default="contours",
+                        help='Engine under test; its reused-buffer twin and the contours engine must agree with it')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    failures = 0
+    timings = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cc = make_capture(tmp_dir, color_match_mode=args.mode, detection_engine=args.engine)
+        reusing = make_capture(tmp_dir, color_match_mode=args.mode, detection_engine=args.engine,
+                               reuse_buffers=True)
+        baseline = make_capture(tmp_dir, color_match_mode=args.mode) if args.engine != "contours" else None
+        for iteration in range(args.iterations):
+            screen, planted = random_screen(rng)
+            start = time.perf_counter()
+            cc.find_matching_rectangles(screen)
+            timings.append((time.perf_counter() - start) * 1000)
+            problems = check_invariants(cc, screen, planted) + compare_outputs(cc, reusing, screen)
+            if baseline is not None:
+                problems += compare_outputs(baseline, cc, screen)
+            if problems:
+                failures += 1
+                print(f"[FAIL] iteration {iteration} ({screen.shape[1]}x{screen.shape[0]}): {problems}")
+
+    timings.sort()
+    print(f"\n{args.iterations} screen(s), mode={args.mode}, engine={args.engine}: {failures} failure(s), "
+          f"median {statistics.median(timings):.2f} ms, p99 {timings[int(0.99 * (len(timings) - 1))]:.2f} ms")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
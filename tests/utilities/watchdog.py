@@ -6,81 +6,331 @@ If the process is killed or crashes, it automatically restarts it.
 
 Features:
 - Monitors the color_capture.py process
-- Restarts if process dies unexpectedly
+- Restarts if process dies unexpectedly: a waiter thread blocks on each child's
+  exit so crashes are noticed immediately, and restarts follow an exponential
+  backoff that holds off for a cooldown when a crash loop is detected
+- Supervises several instances (e.g. one per monitor, --instance-config) from one loop
 - Logs all activity with timestamps
+- Drains the child's stdout/stderr on background threads into a bounded
+  ring buffer and a rotating output log, so the child never blocks on a full pipe
+- Reads the child's heartbeat file and restarts it when the capture loop stops
+  making progress (e.g. a hung Tesseract call) or blows its latency SLO
+- Enforces CPU and memory budgets: throttles the child's poll rate through a
+  control file, optionally lowers its priority/affinity, and restarts it on
+  runaway RSS; keeps a sample history to expose memory leak trends
 - Graceful shutdown on Ctrl+C
 - Can be set up as a Windows Task Scheduler task for true background operation
 """
 import subprocess
+import threading
 import time
 import sys
 import os
+import json
+import logging
+import uuid
+from collections import deque
+from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from datetime import datetime
 import psutil
 
 
+class OutputPump:
+    """
+    Drains one child output stream on a daemon thread.
+
+    Every line is appended to a shared bounded ring buffer and written to the
+    rotating output logger; [METRIC] lines are also forwarded to on_metric.
+    """
+    
+    def __init__(self, stream, name, ring_buffer, output_logger, echo=True, on_metric=None):
+        self.stream = stream
+        self.name = name
+        self.ring_buffer = ring_buffer
+        self.output_logger = output_logger
+        self.echo = echo
+        self.on_metric = on_metric
+        self.line_count = 0
+        self.thread = threading.Thread(target=self._pump, name=f"watchdog-{name}", daemon=True)
+    
+    def start(self):
+        self.thread.start()
+        return self
+    
+    def join(self, timeout=None):
+        self.thread.join(timeout)
+    
+    def _pump(self):
+        try:
+            for line in iter(self.stream.readline, ''):
+                line = line.rstrip()
+                self.line_count += 1
+                self.ring_buffer.append((time.time(), self.name, line))
+                self.output_logger.info(f"[{self.name}] {line}")
+                if self.on_metric and line.startswith("[METRIC]"):
+                    self.on_metric(line)
+                if self.echo:
+                    print(f"[CAPTURE:{self.name}] {line}")
+        except (ValueError, OSError):
+            pass  # Stream closed underneath us during shutdown
+        finally:
+            try:
+                self.stream.close()
+            except Exception:
+                pass
+
+
+class RestartPolicy:
+    """
+    Exponential restart backoff with crash-loop detection.
+    
+    A child that ran for at least reset_after seconds is restarted immediately;
+    every further quick exit doubles the delay (base_delay, 2x, 4x, ... capped at
+    max_delay). crash_loop_count exits within crash_loop_window seconds are a
+    crash loop, which holds restarts off for crash_loop_cooldown seconds.
+    """
+    
+    def __init__(self, base_delay=2, max_delay=60, reset_after=60, crash_loop_count=5,
+                 crash_loop_window=120, crash_loop_cooldown=300):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.reset_after = reset_after  # Uptime (s) after which an exit is not a quick failure
+        self.crash_loop_count = crash_loop_count  # Exits within the window that form a crash loop (0=disabled)
+        self.crash_loop_window = crash_loop_window
+        self.crash_loop_cooldown = crash_loop_cooldown
+        self.failures = 0  # Consecutive quick exits
+        self.in_crash_loop = False
+        self._exit_times = deque()
+    
+    def next_delay(self, uptime, now=None):
+        """
+        Record an exit after uptime seconds and return the delay before restarting.
+        
+        Args:
+            uptime: Seconds the child ran before exiting
+            now: Exit timestamp (defaults to time.time())
+        
+        Returns:
+            Seconds to wait before the next start
+        """
+        now = time.time() if now is None else now
+        self._exit_times.append(now)
+        while now - self._exit_times[0] > self.crash_loop_window:
+            self._exit_times.popleft()
+        
+        self.in_crash_loop = self.crash_loop_count > 0 and len(self._exit_times) >= self.crash_loop_count
+        if uptime >= self.reset_after:
+            self.failures = 0
+        else:
+            self.failures += 1
+        
+        if self.in_crash_loop:
+            return self.crash_loop_cooldown
+        if self.failures == 0:
+            return 0.0
+        return min(self.max_delay, self.base_delay * 2 ** (self.failures - 1))
+
+
 class ColorCaptureWatchdog:
     """Watchdog that monitors and restarts the color_capture.py process."""
     
     def __init__(self, script_dir=None, restart_delay=2, max_restart_attempts=10, 
-                 log_file=None, check_interval=2):
+                 log_file=None, check_interval=2, output_log_file=None,
+                 output_log_max_bytes=5 * 1024 * 1024, output_log_backups=3,
+                 output_buffer_lines=1000, echo_output=True, heartbeat_file=None,
+                 stall_timeout=30, latency_slo_ms=0, slo_breach_limit=3,
+                 control_file=None, cpu_budget_percent=0, memory_budget_mb=0,
+                 low_priority=False, cpu_affinity=None, resource_history_size=720,
+                 name=None, capture_args=None, max_restart_delay=60, backoff_reset_after=60,
+                 crash_loop_count=5, crash_loop_window=120, crash_loop_cooldown=300, exit_event=None):
         """
         Initialize the watchdog.
         
         Args:
             script_dir: Directory containing color_capture.py (defaults to script's parent)
-            restart_delay: Seconds to wait before restarting after crash (default: 2)
+            restart_delay: Base delay before restarting a child that exited quickly; doubles
+                with every consecutive quick exit (default: 2)
             max_restart_attempts: Max retries before giving up (0=unlimited, default: 10)
             log_file: Path to log file (defaults to watchdog.log in script dir)
-            check_interval: Seconds between process checks (default: 2)
+            check_interval: Seconds between health checks; exits are detected as soon as
+                they happen (default: 2)
+            output_log_file: Rotating log of child stdout/stderr (defaults to
+                color_capture_output.log in script dir)
+            output_log_max_bytes: Size at which the output log rotates (default: 5MB)
+            output_log_backups: Number of rotated output logs kept (default: 3)
+            output_buffer_lines: Lines of recent child output kept in memory (default: 1000)
+            echo_output: Echo child output to the console (default: True)
+            heartbeat_file: Heartbeat file published by the child (defaults to
+                heartbeat.json in script dir)
+            stall_timeout: Restart if the iteration counter doesn't advance for this
+                many seconds beyond the poll sleep the child announced in its
+                last heartbeat (0=disabled, default: 30)
+            latency_slo_ms: Per-iteration latency SLO in ms (0=disabled, default: 0)
+            slo_breach_limit: Consecutive SLO breaches before restarting (default: 3)
+            control_file: Throttling settings read by the child (defaults to
+                control.json in script dir)
+            cpu_budget_percent: Max CPU as a percent of one core, including OCR
+                subprocesses (0=unlimited, default: 0)
+            memory_budget_mb: Restart the child when its RSS exceeds this (0=unlimited, default: 0)
+            low_priority: Run the child at below-normal scheduling priority (default: False)
+            cpu_affinity: List of CPU indices to pin the child to (default: None)
+            resource_history_size: Number of CPU/RSS samples kept (default: 720)
+            name: Instance name when supervising several children; prefixes log lines and
+                the default heartbeat/control/output file names, and is passed to the
+                child so it suffixes its own state files (default: None)
+            capture_args: Extra command line arguments for color_capture.py, e.g.
+                ["--config", "monitor2.json"] (default: None)
+            max_restart_delay: Cap of the exponential restart backoff (default: 60)
+            backoff_reset_after: Uptime in seconds after which the backoff resets (default: 60)
+            crash_loop_count: Exits within crash_loop_window that count as a crash loop
+                (0=disabled, default: 5)
+            crash_loop_window: Seconds over which exits are counted (default: 120)
+            crash_loop_cooldown: Seconds to hold restarts off in a crash loop (default: 300)
+            exit_event: threading.Event set whenever the child exits; shared by a
+                WatchdogGroup to wake one supervision loop (default: a private event)
         """
         self.script_dir = Path(script_dir) if script_dir else Path(__file__).parent
         self.color_capture_script = self.script_dir / "color_capture.py"
+        self.name = name
+        self.capture_args = list(capture_args or [])
+        suffix = f"_{name}" if name else ""
         self.restart_delay = restart_delay
         self.max_restart_attempts = max_restart_attempts
         self.check_interval = check_interval
         self.log_file = Path(log_file) if log_file else self.script_dir / "watchdog.log"
+        self.output_log_file = (Path(output_log_file) if output_log_file
+                                else self.script_dir / f"color_capture_output{suffix}.log")
+        self.echo_output = echo_output
+        self.heartbeat_file = (Path(heartbeat_file) if heartbeat_file
+                               else self.script_dir / f"heartbeat{suffix}.json")
+        self.stall_timeout = stall_timeout
+        self.latency_slo_ms = latency_slo_ms
+        self.slo_breach_limit = slo_breach_limit
+        self.control_file = (Path(control_file) if control_file
+                             else self.script_dir / f"control{suffix}.json")
+        self.cpu_budget_percent = cpu_budget_percent
+        self.memory_budget_mb = memory_budget_mb
+        self.low_priority = low_priority
+        self.cpu_affinity = cpu_affinity
+        
+        self.output_buffer = deque(maxlen=output_buffer_lines)
+        self.output_logger = self._create_output_logger(output_log_max_bytes, output_log_backups)
+        self.output_pumps = []
+        self._log_lock = threading.Lock()
         
         self.process = None
         self.restart_count = 0
         self.running = True
+        self.last_crash_time = None
+        self.restart_policy = RestartPolicy(restart_delay, max_restart_delay, backoff_reset_after,
+                                            crash_loop_count, crash_loop_window, crash_loop_cooldown)
+        self.exited = exit_event if exit_event is not None else threading.Event()
+        self.next_start_time = None  # When a dead child is due to be restarted
+        self._started_at = None
+        self._next_check_time = None
+        self.startup_metrics = []  # One dict per reported time-to-first-detection
+        self.last_heartbeat = None
+        self._last_progress_time = None
+        self._slo_breaches = 0
+        self.resource_history = deque(maxlen=resource_history_size)
+        self.poll_interval_scale = 1.0
+        self._psutil_process = None
+        self._last_cpu_total = None
+        self._last_cpu_time = None
+        self._cpu_over_budget = 0
+        self._cpu_under_budget = 0
         
         # Verify color_capture.py exists
         if not self.color_capture_script.exists():
             raise FileNotFoundError(f"color_capture.py not found at: {self.color_capture_script}")
         
         self._log(f"Watchdog initialized for: {self.color_capture_script}")
-        self._log(f"Restart delay: {restart_delay}s, Check interval: {check_interval}s")
+        self._log(f"Restart backoff: {restart_delay}s doubling up to {max_restart_delay}s, "
+                  f"Check interval: {check_interval}s")
     
     def _log(self, message):
         """Log a message with timestamp."""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] {message}"
+        log_message = f"[{timestamp}] [{self.name}] {message}" if self.name else f"[{timestamp}] {message}"
         print(log_message)
         
-        # Also write to log file
+        # Also write to log file (output pump threads may log concurrently)
         try:
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                f.write(log_message + '\n')
+            with self._log_lock:
+                with open(self.log_file, 'a', encoding='utf-8') as f:
+                    f.write(log_message + '\n')
         except Exception as e:
             print(f"Warning: Could not write to log file: {e}")
     
+    def _create_output_logger(self, max_bytes, backups):
+        """Create a dedicated logger writing child output to a rotating file."""
+        logger = logging.getLogger(f"color_capture_output.{id(self)}")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        handler = RotatingFileHandler(self.output_log_file, maxBytes=max_bytes,
+                                      backupCount=backups, encoding='utf-8', delay=True)
+        handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%Y-%m-%d %H:%M:%S"))
+        logger.addHandler(handler)
+        return logger
+    
+    def _start_output_pumps(self):
+        """Start background readers for the current process's stdout and stderr."""
+        self.output_pumps = [
+            OutputPump(stream, name, self.output_buffer, self.output_logger,
+                       echo=self.echo_output, on_metric=self._handle_metric_line).start()
+            for stream, name in ((self.process.stdout, "stdout"), (self.process.stderr, "stderr"))
+            if stream is not None
+        ]
+    
+    def _stop_output_pumps(self, timeout=2):
+        """Wait for the output pumps of an exited process to drain."""
+        for pump in self.output_pumps:
+            pump.join(timeout)
+        self.output_pumps = []
+    
+    def recent_output(self, lines=50, stream=None):
+        """Return the most recent child output lines, optionally for one stream only."""
+        entries = [entry for entry in list(self.output_buffer)
+                   if stream is None or entry[1] == stream]
+        return [line for _, _, line in entries[-lines:]]
+    
     def _start_process(self):
         """Start the color_capture.py process."""
         try:
             self._log(f"Starting color_capture.py (attempt {self.restart_count + 1})")
             
+            # Export the launch time so the child can report time-to-first-detection
+            env = os.environ.copy()
+            env["COLOR_CAPTURE_LAUNCH_TIME"] = repr(time.time())
+            env["COLOR_CAPTURE_HEARTBEAT"] = str(self.heartbeat_file)
+            env["COLOR_CAPTURE_CONTROL"] = str(self.control_file)
+            if self.name:
+                # The child suffixes its snapshot, archive, captures and service names with it
+                env["COLOR_CAPTURE_INSTANCE"] = self.name
+            if self.cpu_budget_percent > 0:
+                # Keep Tesseract single-threaded so the budget holds during OCR
+                env.setdefault("OMP_THREAD_LIMIT", "1")
+            self._reset_health()
+            env["COLOR_CAPTURE_LAUNCH_TOKEN"] = self._launch_token
+            self._write_control()
+            
             # Start the process
             self.process = subprocess.Popen(
-                [sys.executable, str(self.color_capture_script)],
+                [sys.executable, str(self.color_capture_script)] + self.capture_args,
                 cwd=str(self.script_dir),
+                env=env,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True,
                 bufsize=1  # Line buffered
             )
             
+            self._started_at = time.time()
+            self._next_check_time = self._started_at + self.check_interval
+            self._start_exit_waiter()
+            self._start_output_pumps()
+            self._apply_scheduling()
             self._log(f"Process started successfully (PID: {self.process.pid})")
             self.restart_count += 1
             return True
@@ -89,6 +339,16 @@ class ColorCaptureWatchdog:
             self._log(f"Error starting process: {e}")
             return False
     
+    def _start_exit_waiter(self):
+        """Block on the child's exit in a daemon thread and signal self.exited immediately."""
+        process = self.process
+        
+        def wait_for_exit():
+            process.wait()
+            self.exited.set()
+        
+        threading.Thread(target=wait_for_exit, name=f"watchdog-wait-{process.pid}", daemon=True).start()
+    
     def _is_process_alive(self):
         """Check if the process is still running."""
         if self.process is None:
@@ -118,10 +378,214 @@ class ColorCaptureWatchdog:
         except (psutil.NoSuchProcess, psutil.AccessDenied):
             return None
     
+    def _reset_health(self):
+        """Forget the previous child's heartbeat and issue a new launch token before (re)starting."""
+        try:
+            self.heartbeat_file.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self._log(f"Warning: Could not remove stale heartbeat file: {e}")
+        self.last_heartbeat = None
+        self._last_progress_time = time.time()
+        self._slo_breaches = 0
+        # Heartbeats echo this token; the pid may be a launcher's (Windows venv python.exe)
+        self._launch_token = uuid.uuid4().hex
+    
+    def _read_heartbeat(self):
+        """Return the child's last heartbeat record, or None if missing or unreadable."""
+        try:
+            with open(self.heartbeat_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _check_health(self):
+        """
+        Check capture-loop progress from the heartbeat file.
+        
+        Returns:
+            A reason string if the child should be restarted, otherwise None
+        """
+        now = time.time()
+        heartbeat = self._read_heartbeat()
+        if heartbeat and heartbeat.get('launch') == self._launch_token:
+            previous = self.last_heartbeat
+            if previous is None or heartbeat.get('iteration') != previous.get('iteration'):
+                self.last_heartbeat = heartbeat
+                self._last_progress_time = now
+                if self.latency_slo_ms > 0 and heartbeat.get('latency_ms', 0) > self.latency_slo_ms:
+                    self._slo_breaches += 1
+                else:
+                    self._slo_breaches = 0
+        
+        # The child announces the sleep it takes after each beat (longer when we throttle it)
+        expected_sleep = self.last_heartbeat.get('sleep_seconds', 0) if self.last_heartbeat else 0
+        if self.stall_timeout > 0 and now - self._last_progress_time - expected_sleep > self.stall_timeout:
+            last_iteration = self.last_heartbeat['iteration'] if self.last_heartbeat else None
+            return (f"capture loop made no progress for {now - self._last_progress_time:.0f}s "
+                    f"(last iteration: {last_iteration})")
+        
+        if self.slo_breach_limit > 0 and self._slo_breaches >= self.slo_breach_limit:
+            return (f"iteration latency above {self.latency_slo_ms}ms SLO for "
+                    f"{self._slo_breaches} consecutive iterations "
+                    f"(last: {self.last_heartbeat['latency_ms']:.0f}ms)")
+        
+        return None
+    
+    def _write_control(self):
+        """Atomically publish the current throttling settings to the child."""
+        settings = {
+            'max_cpu_share': self.cpu_budget_percent / 100 if self.cpu_budget_percent > 0 else None,
+            'poll_interval_scale': self.poll_interval_scale,
+        }
+        tmp_path = self.control_file.with_name(self.control_file.name + ".tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(settings, f)
+            os.replace(tmp_path, self.control_file)
+        except OSError as e:
+            self._log(f"Warning: Could not write control file: {e}")
+    
+    def _apply_scheduling(self):
+        """Lower priority and pin CPU affinity of a freshly started child, if configured."""
+        self.resource_history.clear()
+        self._last_cpu_total = None
+        self._cpu_over_budget = 0
+        self._cpu_under_budget = 0
+        try:
+            self._psutil_process = psutil.Process(self.process.pid)
+            if self.low_priority:
+                if sys.platform == "win32":
+                    self._psutil_process.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+                else:
+                    self._psutil_process.nice(10)
+            if self.cpu_affinity and hasattr(self._psutil_process, "cpu_affinity"):
+                self._psutil_process.cpu_affinity(self.cpu_affinity)
+        except (psutil.Error, ValueError, OSError) as e:
+            self._log(f"Warning: Could not apply scheduling limits: {e}")
+    
+    def _sample_resources(self):
+        """
+        Record a CPU/RSS sample for the current child.
+        
+        CPU is derived from cpu_times() deltas, including reaped children such as
+        Tesseract, so sampling never blocks the supervision loop.
+        """
+        if self._psutil_process is None:
+            return None
+        try:
+            with self._psutil_process.oneshot():
+                times = self._psutil_process.cpu_times()
+                memory_mb = self._psutil_process.memory_info().rss / 1024 / 1024
+        except psutil.Error:
+            return None
+        
+        now = time.time()
+        cpu_total = (times.user + times.system
+                     + getattr(times, 'children_user', 0) + getattr(times, 'children_system', 0))
+        cpu_percent = 0.0
+        if self._last_cpu_total is not None and now > self._last_cpu_time:
+            cpu_percent = (cpu_total - self._last_cpu_total) / (now - self._last_cpu_time) * 100
+        self._last_cpu_total = cpu_total
+        self._last_cpu_time = now
+        
+        sample = {
+            'timestamp': now,
+            'pid': self._psutil_process.pid,
+            'cpu_percent': cpu_percent,
+            'memory_mb': memory_mb,
+        }
+        self.resource_history.append(sample)
+        return sample
+    
+    def memory_trend_mb_per_min(self):
+        """Least-squares slope of RSS over the sample history (MB per minute)."""
+        samples = list(self.resource_history)
+        if len(samples) < 2:
+            return 0.0
+        t0 = samples[0]['timestamp']
+        xs = [(sample['timestamp'] - t0) / 60 for sample in samples]
+        ys = [sample['memory_mb'] for sample in samples]
+        mean_x = sum(xs) / len(xs)
+        mean_y = sum(ys) / len(ys)
+        var_x = sum((x - mean_x) ** 2 for x in xs)
+        if var_x == 0:
+            return 0.0
+        return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+    
+    def _enforce_budgets(self, sample):
+        """
+        Apply CPU and memory budgets to the latest sample.
+        
+        Sustained CPU overuse doubles the child's poll interval (up to 16x); sustained
+        headroom halves it again. Memory overuse is not recoverable by throttling.
+        
+        Returns:
+            A reason string if the child should be restarted, otherwise None
+        """
+        if self.memory_budget_mb > 0 and sample['memory_mb'] > self.memory_budget_mb:
+            return (f"RSS {sample['memory_mb']:.1f}MB exceeds {self.memory_budget_mb}MB budget "
+                    f"(trend: {self.memory_trend_mb_per_min():+.2f}MB/min)")
+        
+        if self.cpu_budget_percent > 0:
+            if sample['cpu_percent'] > self.cpu_budget_percent:
+                self._cpu_over_budget += 1
+                self._cpu_under_budget = 0
+            elif sample['cpu_percent'] < self.cpu_budget_percent / 2:
+                self._cpu_under_budget += 1
+                self._cpu_over_budget = 0
+            
+            if self._cpu_over_budget >= 3 and self.poll_interval_scale < 16:
+                self.poll_interval_scale *= 2
+                self._cpu_over_budget = 0
+                self._log(f"CPU {sample['cpu_percent']:.0f}% over {self.cpu_budget_percent}% budget, "
+                          f"throttling poll interval to {self.poll_interval_scale:g}x")
+                self._write_control()
+            elif self._cpu_under_budget >= 10 and self.poll_interval_scale > 1:
+                self.poll_interval_scale /= 2
+                self._cpu_under_budget = 0
+                self._log(f"CPU back under budget, poll interval now {self.poll_interval_scale:g}x")
+                self._write_control()
+        
+        return None
+    
+    def _terminate_process(self):
+        """Terminate the current process, killing it if it doesn't exit within 5 seconds."""
+        self._log(f"Terminating color_capture.py process (PID: {self.process.pid})")
+        try:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+                self._log("Process terminated gracefully")
+            except subprocess.TimeoutExpired:
+                self._log("Process did not terminate within 5 seconds, forcing kill...")
+                self.process.kill()
+                self.process.wait()
+                self._log("Process killed")
+        except Exception as e:
+            self._log(f"Error terminating process: {e}")
+    
+    def _restart_unhealthy_process(self, reason):
+        """Restart a child that is alive but not making progress."""
+        self._log(f"Process unhealthy: {reason}")
+        self._terminate_process()
+        self._handle_process_crash(self.process.poll())
+    
     def _handle_process_crash(self, exit_code):
-        """Handle process crash and restart."""
-        self._log(f"Process died (exit code: {exit_code})")
+        """Handle process crash and schedule the restart."""
+        self.last_crash_time = time.time()
+        uptime = self.last_crash_time - self._started_at if self._started_at else 0.0
+        self._log(f"Process died (exit code: {exit_code}, uptime: {uptime:.1f}s)")
         self.process = None
+        self._psutil_process = None
+        
+        self._stop_output_pumps()
+        last_errors = self.recent_output(lines=5, stream="stderr")
+        if last_errors:
+            self._log("Last stderr output before exit:")
+            for line in last_errors:
+                self._log(f"    {line}")
         
         # Check if we should continue restarting
         if self.max_restart_attempts > 0 and self.restart_count >= self.max_restart_attempts:
@@ -129,12 +593,82 @@ class ColorCaptureWatchdog:
             self.running = False
             return
         
-        # Wait before restarting
-        self._log(f"Waiting {self.restart_delay}s before restart...")
-        time.sleep(self.restart_delay)
+        # Schedule the restart instead of sleeping so other instances stay supervised
+        delay = self.restart_policy.next_delay(uptime, self.last_crash_time)
+        if self.restart_policy.in_crash_loop:
+            self._log(f"Crash loop detected ({self.restart_policy.crash_loop_count} exits within "
+                      f"{self.restart_policy.crash_loop_window}s), holding restarts off for {delay:g}s")
+        else:
+            self._log(f"Restarting in {delay:g}s (consecutive quick exits: {self.restart_policy.failures})")
+        self.next_start_time = self.last_crash_time + delay
+    
+    def _handle_metric_line(self, line):
+        """Record [METRIC] lines reported by color_capture.py."""
+        fields = {}
+        for token in line[len("[METRIC]"):].split():
+            key, _, value = token.partition("=")
+            try:
+                fields[key] = float(value)
+            except ValueError:
+                continue
+        
+        if "time_to_first_detection_ms" not in fields:
+            return
         
-        # Start the process again
-        self._start_process()
+        metric = {
+            'restart_count': self.restart_count,
+            'time_to_first_detection_ms': fields["time_to_first_detection_ms"],
+            'since_crash_ms': None,
+        }
+        message = f"Time to first detection: {metric['time_to_first_detection_ms']:.0f}ms after launch"
+        if self.last_crash_time is not None:
+            metric['since_crash_ms'] = (time.time() - self.last_crash_time) * 1000
+            message += f", {metric['since_crash_ms']:.0f}ms after crash"
+        self.startup_metrics.append(metric)
+        self._log(message)
+    
+    def seconds_until_due(self):
+        """Seconds until this instance needs its next step() (restart or health check)."""
+        due = self.next_start_time if self.process is None else self._next_check_time
+        if due is None:
+            return self.check_interval
+        return max(0.0, due - time.time())
+    
+    def step(self):
+        """
+        One supervision pass: reap an exited child, restart it when its backoff
+        has elapsed, and run the periodic health and budget checks.
+        """
+        now = time.time()
+        if self.process is None:
+            if self.running and self.next_start_time is not None and now >= self.next_start_time:
+                self.next_start_time = None
+                if not self._start_process():
+                    self._handle_process_crash(None)
+            return
+        
+        # Check if process is alive (the exit waiter wakes the loop as soon as it dies)
+        if not self._is_process_alive():
+            self._handle_process_crash(self.process.poll())
+            return
+        
+        if now < self._next_check_time:
+            return
+        self._next_check_time = now + self.check_interval
+        
+        # Check that the capture loop is still making progress and within budget
+        sample = self._sample_resources()
+        reason = self._check_health()
+        if reason is None and sample is not None:
+            reason = self._enforce_budgets(sample)
+        if reason is not None:
+            self._restart_unhealthy_process(reason)
+        elif sample is not None:
+            # Only log status every 30 seconds to reduce log spam
+            if len(self.resource_history) % max(1, int(30 / self.check_interval)) == 0:
+                self._log(f"Process alive - PID: {sample['pid']}, Memory: {sample['memory_mb']:.1f}MB "
+                          f"(trend: {self.memory_trend_mb_per_min():+.2f}MB/min), "
+                          f"CPU: {sample['cpu_percent']:.1f}%")
     
     def run(self):
         """Main watchdog loop."""
@@ -149,30 +683,10 @@ class ColorCaptureWatchdog:
         
         try:
             while self.running:
-                time.sleep(self.check_interval)
-                
-                # Check if process is alive
-                if not self._is_process_alive():
-                    exit_code = self.process.poll() if self.process else None
-                    self._handle_process_crash(exit_code)
-                else:
-                    # Log periodic status if debug is enabled
-                    info = self._get_process_info()
-                    if info:
-                        # Only log status every 30 seconds to reduce log spam
-                        if self.restart_count % 15 == 0:  # 15 * 2s check interval = 30s
-                            self._log(f"Process alive - PID: {info['pid']}, Memory: {info['memory_mb']:.1f}MB, CPU: {info['cpu_percent']:.1f}%")
-                
-                # Read and log any output from the process
-                if self.process and self.process.stdout:
-                    try:
-                        # Non-blocking read of stdout
-                        line = self.process.stdout.readline()
-                        if line:
-                            # Print to console but don't log to file (too verbose)
-                            print(f"[CAPTURE] {line.rstrip()}")
-                    except Exception:
-                        pass
+                # Sleep until the next health check, restart, or child exit, whichever comes first
+                self.exited.wait(self.seconds_until_due())
+                self.exited.clear()
+                self.step()
         
         except KeyboardInterrupt:
             self._log("Watchdog interrupted by user (Ctrl+C)")
@@ -186,24 +700,59 @@ class ColorCaptureWatchdog:
         self._log("="*70)
         
         if self.process and self._is_process_alive():
-            self._log(f"Terminating color_capture.py process (PID: {self.process.pid})")
-            try:
-                self.process.terminate()
-                try:
-                    self.process.wait(timeout=5)
-                    self._log("Process terminated gracefully")
-                except subprocess.TimeoutExpired:
-                    self._log("Process did not terminate within 5 seconds, forcing kill...")
-                    self.process.kill()
-                    self.process.wait()
-                    self._log("Process killed")
-            except Exception as e:
-                self._log(f"Error terminating process: {e}")
+            self._terminate_process()
+        self._stop_output_pumps()
         
         self._log(f"Watchdog stopped. Total restart attempts: {self.restart_count}")
         self._log("="*70)
 
 
+class WatchdogGroup:
+    """
+    Supervises several color_capture.py instances (e.g. one per monitor) from one loop.
+    
+    All instances share one exit event, so the loop sleeps until the earliest
+    health check or restart is due and wakes immediately when any child exits.
+    """
+    
+    def __init__(self, watchdogs):
+        names = [watchdog.name for watchdog in watchdogs]
+        if not watchdogs:
+            raise ValueError("WatchdogGroup needs at least one watchdog")
+        if None in names or len(set(names)) != len(names):
+            raise ValueError(f"Supervised instances need unique names, got {names}")
+        self.watchdogs = list(watchdogs)
+        self.exited = threading.Event()
+        for watchdog in self.watchdogs:
+            watchdog.exited = self.exited
+    
+    @property
+    def running(self):
+        return any(watchdog.running for watchdog in self.watchdogs)
+    
+    def run(self):
+        """Start every instance and supervise them until all have given up or Ctrl+C."""
+        for watchdog in self.watchdogs:
+            watchdog._log("COLOR CAPTURE WATCHDOG STARTED")
+            if not watchdog._start_process():
+                watchdog._log("Failed to start process on initialization. Not supervising this instance.")
+                watchdog.running = False
+        
+        try:
+            while self.running:
+                self.exited.wait(min(watchdog.seconds_until_due() for watchdog in self.watchdogs
+                                     if watchdog.running))
+                self.exited.clear()
+                for watchdog in self.watchdogs:
+                    watchdog.step()
+        
+        except KeyboardInterrupt:
+            self.watchdogs[0]._log("Watchdog interrupted by user (Ctrl+C)")
+        finally:
+            for watchdog in self.watchdogs:
+                watchdog._shutdown()
+
+
 def main():
     """Main entry point."""
     import argparse
@@ -219,15 +768,39 @@ def main():
     )
     parser.add_argument(
         '--restart-delay',
-        type=int,
+        type=float,
         default=2,
-        help='Seconds to wait before restarting (default: 2)'
+        help='Base restart delay after a quick exit, doubled per consecutive quick exit (default: 2)'
+    )
+    parser.add_argument(
+        '--max-restart-delay',
+        type=float,
+        default=60,
+        help='Cap of the restart backoff in seconds (default: 60)'
+    )
+    parser.add_argument(
+        '--crash-loop-count',
+        type=int,
+        default=5,
+        help='Exits within --crash-loop-window that count as a crash loop (0=disabled, default: 5)'
+    )
+    parser.add_argument(
+        '--crash-loop-window',
+        type=float,
+        default=120,
+        help='Seconds over which exits are counted for crash-loop detection (default: 120)'
+    )
+    parser.add_argument(
+        '--crash-loop-cooldown',
+        type=float,
+        default=300,
+        help='Seconds to hold restarts off once a crash loop is detected (default: 300)'
     )
     parser.add_argument(
         '--check-interval',
         type=int,
         default=2,
-        help='Seconds between process checks (default: 2)'
+        help='Seconds between health checks; exits are detected immediately (default: 2)'
     )
     parser.add_argument(
         '--max-restarts',
@@ -241,18 +814,99 @@ def main():
         default=None,
         help='Path to log file (default: watchdog.log in script directory)'
     )
+    parser.add_argument(
+        '--output-log-file',
+        type=str,
+        default=None,
+        help='Rotating log of color_capture.py output (default: color_capture_output.log in script directory)'
+    )
+    parser.add_argument(
+        '--stall-timeout',
+        type=float,
+        default=30,
+        help='Restart if the capture loop makes no progress for this many seconds (0=disabled, default: 30)'
+    )
+    parser.add_argument(
+        '--latency-slo-ms',
+        type=float,
+        default=0,
+        help='Restart after --slo-breach-limit consecutive iterations slower than this (0=disabled, default: 0)'
+    )
+    parser.add_argument(
+        '--slo-breach-limit',
+        type=int,
+        default=3,
+        help='Consecutive latency SLO breaches before restarting (default: 3)'
+    )
+    parser.add_argument(
+        '--cpu-budget',
+        type=float,
+        default=0,
+        help='Max CPU for color_capture.py as a percent of one core (0=unlimited, default: 0)'
+    )
+    parser.add_argument(
+        '--memory-budget-mb',
+        type=float,
+        default=0,
+        help='Restart color_capture.py when its RSS exceeds this many MB (0=unlimited, default: 0)'
+    )
+    parser.add_argument(
+        '--low-priority',
+        action='store_true',
+        help='Run color_capture.py at below-normal priority'
+    )
+    parser.add_argument(
+        '--cpu-affinity',
+        type=int,
+        nargs='+',
+        default=None,
+        help='CPU indices to pin color_capture.py to (e.g. --cpu-affinity 0)'
+    )
+    parser.add_argument(
+        '--instance-config',
+        type=str,
+        action='append',
+        default=None,
+        help='Supervise one color_capture.py per JSON config (repeatable); set SCREEN_REGION in each, '
+             'e.g. one per monitor. Each instance is named after its file and keeps its own state files'
+    )
+    parser.add_argument(
+        '--quiet-output',
+        action='store_true',
+        help="Don't echo color_capture.py output to the console (it is still logged)"
+    )
     
     args = parser.parse_args()
     
     try:
-        watchdog = ColorCaptureWatchdog(
+        options = dict(
             script_dir=args.script_dir,
             restart_delay=args.restart_delay,
             max_restart_attempts=args.max_restarts,
             log_file=args.log_file,
-            check_interval=args.check_interval
+            check_interval=args.check_interval,
+            output_log_file=args.output_log_file,
+            echo_output=not args.quiet_output,
+            stall_timeout=args.stall_timeout,
+            latency_slo_ms=args.latency_slo_ms,
+            slo_breach_limit=args.slo_breach_limit,
+            cpu_budget_percent=args.cpu_budget,
+            memory_budget_mb=args.memory_budget_mb,
+            low_priority=args.low_priority,
+            cpu_affinity=args.cpu_affinity,
+            max_restart_delay=args.max_restart_delay,
+            crash_loop_count=args.crash_loop_count,
+            crash_loop_window=args.crash_loop_window,
+            crash_loop_cooldown=args.crash_loop_cooldown
         )
-        watchdog.run()
+        if args.instance_config:
+            WatchdogGroup([
+                ColorCaptureWatchdog(name=Path(config).stem,
+                                     capture_args=["--config", str(Path(config).resolve())], **options)
+                for config in args.instance_config
+            ]).run()
+        else:
+            ColorCaptureWatchdog(**options).run()
     except FileNotFoundError as e:
         print(f"Error: {e}")
         sys.exit(1)
@@ -0,0 +1,243 @@
+"""
+Text Classifier - Lightweight CPU recognizer for the fixed button vocabulary
+
+Tesseract is a general-purpose OCR engine; the clicker only needs to tell a
+handful of known button labels (OCR_SEARCH_TEXT) apart from everything else.
+This module classifies button crops with HOG-style features (per-cell histograms
+of gradient orientation, computed with NumPy) and a cosine nearest neighbor
+over crops captured earlier, which takes well under a millisecond per
+crop. ColorCapture falls back to Tesseract when the match is not confident.
+
+Nearest neighbor always finds *some* label, so a crop the model has never seen
+("Deny", "Don't Allow") can look like a known one. Predictions are therefore
+only trusted when the model also holds negative examples (captures/none/) and
+the nearest sample is close in absolute terms, not just closer than the
+runner-up. Models trained from the archive alone (OCR-confirmed positives)
+have no negatives and never skip Tesseract.
+
+Training data layout (inside the captures directory):
+    captures/<label>/*.png   crops of a known label, e.g. captures/Allow/
+    captures/none/*.png      negative examples (buttons that must not be clicked)
+    captures/*.png           unlabeled crops, labeled once with Tesseract at training time
+
+The capture archive (capture_archive.py) can be used as well: every unique
+archived crop is a sample labeled with the term it matched when it was seen.
+
+Usage:
+    python text_classifier.py train --captures captures --output assets/text_classifier.npz
+    python text_classifier.py train --archive archive --output assets/text_classifier.npz
+"""
+import argparse
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+MODEL_VERSION = 1
+NEGATIVE_LABEL = "none"  # Label of crops that contain none of the search terms
+
+_WIN_SIZE = (96, 32)  # Crops are resized to this (width, height) before feature extraction
+_CELL = 8  # Cell size in pixels
+_BINS = 9  # Unsigned orientation bins over 0-180 degrees
+_CELL_IDS = ((np.arange(_WIN_SIZE[1]) // _CELL)[:, None] * (_WIN_SIZE[0] // _CELL)
+             + (np.arange(_WIN_SIZE[0]) // _CELL)[None, :]).ravel()
+_N_CELLS = (_WIN_SIZE[0] // _CELL) * (_WIN_SIZE[1] // _CELL)
+
+
+class TextClassifier:
+    """Cosine nearest-neighbor classifier over gradient-orientation features of button crops."""
+
+    def __init__(self, features, labels, min_similarity=0.78):
+        self.features = np.asarray(features, dtype=np.float32)
+        self.labels = list(labels)
+        self.min_similarity = min_similarity  # Below this the nearest sample is too far to trust
+        self.has_negatives = NEGATIVE_LABEL in self.labels  # Without negatives no prediction is trusted
+        label_index = {}
+        self._label_ids = np.array([label_index.setdefault(label, len(label_index)) for label in self.labels])
+
+    @staticmethod
+    def extract_features(image_bgr):
+        """
+        L2-normalized HOG-style descriptor of a crop resized to the classifier window.
+
+        Unsigned gradients make the features independent of text/background
+        polarity; per-cell normalization makes them independent of contrast.
+        """
+        gray = image_bgr if image_bgr.ndim == 2 else cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
+        gray = cv2.resize(gray, _WIN_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+        gx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=1)
+        gy = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=1)
+        magnitude, angle = cv2.cartToPolar(gx, gy, angleInDegrees=True)
+
+        bins = (np.mod(angle.ravel(), 180.0) * (_BINS / 180.0)).astype(np.int64) % _BINS
+        histogram = np.bincount(_CELL_IDS * _BINS + bins, weights=magnitude.ravel(),
+                                minlength=_N_CELLS * _BINS).reshape(_N_CELLS, _BINS)
+        histogram /= np.linalg.norm(histogram, axis=1, keepdims=True) + 1e-3
+
+        descriptor = histogram.ravel().astype(np.float32)
+        norm = np.linalg.norm(descriptor)
+        return descriptor / norm if norm > 0 else descriptor
+
+    @classmethod
+    def train(cls, samples, **kwargs):
+        """
+        Build a classifier from (image_bgr, label) pairs.
+
+        Raises:
+            ValueError: If no samples are given
+        """
+        if not samples:
+            raise ValueError("No training samples")
+        features = np.stack([cls.extract_features(image) for image, _ in samples])
+        return cls(features, [label for _, label in samples], **kwargs)
+
+    def predict(self, image_bgr):
+        """
+        Classify a crop.
+
+        Returns:
+            (label, confidence) where confidence is the cosine-similarity margin
+            between the best label and the best different label (0 if the
+            nearest sample is below min_similarity or the model has no
+            NEGATIVE_LABEL samples)
+        """
+        similarities = self.features @ self.extract_features(image_bgr)
+        best = int(np.argmax(similarities))
+        label = self.labels[best]
+        if not self.has_negatives or similarities[best] < self.min_similarity:
+            return label, 0.0
+
+        others = similarities[self._label_ids != self._label_ids[best]]
+        runner_up = float(others.max()) if len(others) else 0.0
+        return label, float(similarities[best]) - runner_up
+
+    def save(self, path):
+        """Write the model to a compressed .npz file."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(path, version=MODEL_VERSION, features=self.features,
+                            labels=np.array(self.labels), min_similarity=self.min_similarity)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a model written by save().
+
+        Raises:
+            ValueError: If the model was written by an incompatible version
+        """
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != MODEL_VERSION:
+                raise ValueError(f"Unsupported classifier model version {int(data['version'])}")
+            return cls(data['features'], [str(label) for label in data['labels']],
+                       min_similarity=float(data['min_similarity']))
+
+
+def load_training_samples(captures_dir, search_terms=None, debug_mode=True):
+    """
+    Collect (image, label) pairs from a captures directory (see module docstring).
+
+    Unlabeled crops are labeled with Tesseract using search_terms; crops that
+    match none of the terms become NEGATIVE_LABEL examples.
+    """
+    captures_dir = Path(captures_dir)
+    samples = []
+
+    for label_dir in sorted(p for p in captures_dir.iterdir() if p.is_dir()):
+        for image_path in sorted(label_dir.glob("*.png")):
+            image = cv2.imread(str(image_path))
+            if image is not None:
+                samples.append((image, label_dir.name))
+
+    unlabeled = sorted(captures_dir.glob("*.png"))
+    if unlabeled:
+        if not search_terms:
+            raise ValueError("search_terms are required to label crops outside label folders")
+
+        for image_path in unlabeled:
+            image = cv2.imread(str(image_path))
+            if image is None:
+                continue
+            label = _label_with_ocr(image, search_terms)
+            samples.append((image, label))
+            if debug_mode:
+                print(f"  {image_path.name}: labeled '{label}' by OCR")
+
+    return samples
+
+
+def load_archive_samples(archive_dir, search_terms=None, debug_mode=True):
+    """
+    Collect (image, label) pairs from the unique crops of a capture archive.
+
+    Crops archived with a matched term are labeled with it; crops archived
+    without one (OCR disabled) are labeled with Tesseract using search_terms.
+    """
+    from capture_archive import CaptureArchive
+
+    samples = []
+    with CaptureArchive(archive_dir, debug_mode=False) as archive:
+        for entry in archive.query(unique=True):
+            image = archive.read_image(entry)
+            if image is None:
+                continue
+            label = entry['term'].decode('utf-8')
+            if not label:
+                if not search_terms:
+                    raise ValueError("search_terms are required to label archived crops without a term")
+                label = _label_with_ocr(image, search_terms)
+                if debug_mode:
+                    print(f"  {bytes(entry['digest']).hex()}: labeled '{label}' by OCR")
+            samples.append((image, label))
+
+    return samples
+
+
+def _label_with_ocr(image_bgr, search_terms):
+    """First search term Tesseract finds in the crop, or NEGATIVE_LABEL."""
+    import pytesseract
+    from PIL import Image
+
+    text = pytesseract.image_to_string(Image.fromarray(cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB))).lower()
+    return next((term for term in search_terms if term.lower() in text), NEGATIVE_LABEL)
+
+
+def main():
+    """Command-line entry point for training and exporting a model."""
+    parser = argparse.ArgumentParser(description="Train the button text classifier")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="Build a model from captured crops")
+    train_parser.add_argument('--captures', type=str, default="captures",
+                              help='Captures directory with training crops, skipped if missing (default: captures)')
+    train_parser.add_argument('--archive', type=str, default=None,
+                              help='Also train on the unique crops of this capture archive directory')
+    train_parser.add_argument('--output', type=str, default="assets/text_classifier.npz",
+                              help='Where to write the model (default: assets/text_classifier.npz)')
+    train_parser.add_argument('--search-text', type=str, nargs='+', default=None,
+                              help='Terms used to label unlabeled crops with Tesseract')
+    train_parser.add_argument('--min-similarity', type=float, default=0.78,
+                              help='Nearest-neighbor similarity below which predictions are untrusted')
+
+    args = parser.parse_args()
+
+    samples = []
+    if Path(args.captures).is_dir():
+        samples += load_training_samples(args.captures, args.search_text)
+    if args.archive:
+        samples += load_archive_samples(args.archive, args.search_text)
+    classifier = TextClassifier.train(samples, min_similarity=args.min_similarity)
+    classifier.save(args.output)
+
+    counts = {}
+    for label in classifier.labels:
+        counts[label] = counts.get(label, 0) + 1
+    summary = ", ".join(f"{label}: {count}" for label, count in sorted(counts.items()))
+    print(f"[OK] Trained on {len(samples)} crop(s) ({summary}) -> {args.output}")
+    if not classifier.has_negatives:
+        print(f"[WARNING] No '{NEGATIVE_LABEL}' samples: the model will not be trusted and every crop "
+              f"falls back to Tesseract. Add crops of other buttons to <captures>/{NEGATIVE_LABEL}/.")
+
+
+if __name__ == "__main__":
+    main()
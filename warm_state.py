@@ -0,0 +1,87 @@
+"""
+Warm State Snapshots - Persist learned ColorCapture state across restarts
+
+When the watchdog restarts color_capture.py the new process would otherwise
+start cold (reference color reload, empty OCR cache, no hotspots). The capture
+loop periodically writes a compact snapshot and reloads it on startup.
+
+File layout (little-endian):
+    4s  magic       b"ACWS"
+    H   version     SNAPSHOT_VERSION
+    I   crc32       checksum of the compressed payload
+    I   length      length of the compressed payload
+    ... payload     zlib-compressed JSON of ColorCapture.export_state()
+"""
+import json
+import os
+import struct
+import time
+import zlib
+from pathlib import Path
+
+SNAPSHOT_MAGIC = b"ACWS"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct("<4sHII")
+
+
+def save_snapshot(path, state):
+    """
+    Atomically write a state snapshot.
+
+    The snapshot is written to a temporary file and renamed into place so a
+    crash mid-write never leaves a truncated snapshot behind.
+
+    Returns:
+        Size of the snapshot in bytes
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    document = {'saved_at': time.time(), 'state': state}
+    payload = zlib.compress(json.dumps(document, separators=(',', ':')).encode('utf-8'))
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, zlib.crc32(payload), len(payload))
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(payload)
+    os.replace(tmp_path, path)
+    return len(header) + len(payload)
+
+
+def load_snapshot(path):
+    """
+    Read a state snapshot written by save_snapshot().
+
+    Returns:
+        The stored state dict, or None if no snapshot exists
+
+    Raises:
+        ValueError: If the snapshot is corrupt or from another format version
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+
+    data = path.read_bytes()
+    if len(data) < _HEADER.size:
+        raise ValueError(f"Snapshot truncated: {path}")
+
+    magic, version, checksum, length = _HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError(f"Not a warm state snapshot: {path}")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {version} (expected {SNAPSHOT_VERSION})")
+
+    payload = data[_HEADER.size:]
+    if len(payload) != length or zlib.crc32(payload) != checksum:
+        raise ValueError(f"Snapshot checksum mismatch: {path}")
+
+    try:
+        document = json.loads(zlib.decompress(payload).decode('utf-8'))
+    except (zlib.error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Snapshot payload unreadable: {e}")
+    # A valid checksum only proves the bytes are intact, not that they came from save_snapshot()
+    if not isinstance(document, dict) or not isinstance(document.get('state'), dict):
+        raise ValueError(f"Snapshot has no state dict: {path}")
+    return document['state']
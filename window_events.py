@@ -0,0 +1,166 @@
+"""
+Window Events - Trigger scans from X11 window map/configure notifications
+
+Permission dialogs appear when a window is mapped (or moved/resized), so on
+X11 the capture loop does not need to poll the whole screen every second:
+WindowEventTrigger listens for MapNotify/ConfigureNotify on the root window's
+children and reports the affected screen region, and the loop scans just that
+region immediately. Clients often paint their buttons some time after the map
+event, so the same region is reported again at rescan_delays (by default up to
+1 s later). Full-screen polling continues at a slow fallback interval to catch
+anything that does not raise an event (e.g. content redrawn inside an existing
+window).
+
+Requires python-xlib (installed with pyautogui on Linux) and an X server;
+start_if_available() returns None elsewhere (Windows, macOS, Wayland without
+XWayland, headless).
+"""
+import heapq
+import os
+import select
+import threading
+import time
+
+
+class WindowEventTrigger:
+    """Background listener that collects the screen regions of newly mapped or reconfigured windows."""
+
+    def __init__(self, on_event=None, display_name=None, settle_delay=0.05, rescan_delays=(0.25, 0.5, 1.0)):
+        self.on_event = on_event  # Called (from the listener thread) when new regions are pending
+        self.display_name = display_name  # None uses $DISPLAY
+        self.settle_delay = settle_delay  # Seconds without new events before on_event fires
+        self.rescan_delays = rescan_delays  # Seconds after settling to report the region again (late painting)
+        self.events_seen = 0
+        self._region = None  # Union (x0, y0, x1, y1) of regions not yet taken
+        self._rescans = []  # Heap of (due time, (x0, y0, x1, y1)) follow-up reports
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._display = None
+        self._root = None
+        self._thread = None
+
+    @classmethod
+    def start_if_available(cls, on_event=None, **kwargs):
+        """Start a trigger, or return None when python-xlib or an X display is unavailable."""
+        if not (kwargs.get('display_name') or os.environ.get('DISPLAY')):
+            return None
+        try:
+            return cls(on_event=on_event, **kwargs).start()
+        except ImportError:
+            return None
+        except Exception as e:  # Xlib raises its own error types when the display is unreachable
+            print(f"[WARNING] Window events unavailable, using polling only: {e}")
+            return None
+
+    def start(self):
+        """Connect to the X server and start listening; returns self."""
+        from Xlib import X, display
+
+        self._display = display.Display(self.display_name)
+        self._root = self._display.screen().root
+        self._root.change_attributes(event_mask=X.SubstructureNotifyMask)
+        self._display.sync()
+        self._thread = threading.Thread(target=self._run, name="window-events", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop listening and close the X connection."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self._display is not None:
+            self._display.close()
+            self._display = None
+
+    def add_region(self, x, y, w, h):
+        """Merge a window rectangle into the pending region."""
+        if w <= 0 or h <= 0:
+            return
+        with self._lock:
+            self.events_seen += 1
+            self._merge((x, y, x + w, y + h))
+
+    def _merge(self, region):
+        """Union region into the pending region (caller holds the lock)."""
+        if self._region is None:
+            self._region = region
+        else:
+            x0, y0, x1, y1 = self._region
+            self._region = (min(x0, region[0]), min(y0, region[1]), max(x1, region[2]), max(y1, region[3]))
+
+    def settle(self, now):
+        """Events went quiet: schedule follow-up reports of the pending region."""
+        with self._lock:
+            if self._region is not None:
+                for delay in self.rescan_delays:
+                    heapq.heappush(self._rescans, (now + delay, self._region))
+
+    def release_rescans(self, now):
+        """Merge follow-up reports due by now into the pending region; True if any were due."""
+        released = False
+        with self._lock:
+            while self._rescans and self._rescans[0][0] <= now:
+                self._merge(heapq.heappop(self._rescans)[1])
+                released = True
+        return released
+
+    def next_rescan_in(self, now):
+        """Seconds until the next follow-up report, or None if none is scheduled."""
+        with self._lock:
+            return max(0.0, self._rescans[0][0] - now) if self._rescans else None
+
+    def take_region(self):
+        """Return and clear the pending region as (x, y, w, h), or None if nothing happened."""
+        with self._lock:
+            region, self._region = self._region, None
+        if region is None:
+            return None
+        x0, y0, x1, y1 = region
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def _run(self):
+        from Xlib import X, error
+
+        fd = self._display.fileno()
+        pending = False
+        while not self._stop.is_set():
+            # Wait for X events; once some arrived, fire on_event after settle_delay of quiet
+            timeout = self.settle_delay if pending else 0.5
+            rescan_in = self.next_rescan_in(time.monotonic())
+            if rescan_in is not None:
+                timeout = min(timeout, rescan_in)
+            readable, _, _ = select.select([fd], [], [], timeout)
+            if readable:
+                try:
+                    while self._display.pending_events():
+                        event = self._display.next_event()
+                        if event.type == X.ConfigureNotify:
+                            self.add_region(event.x, event.y, event.width, event.height)
+                            pending = True
+                        elif event.type == X.MapNotify:
+                            pending = self._add_window(event.window) or pending
+                except (error.ConnectionClosedError, OSError):
+                    return  # X server went away; the capture loop keeps its fallback polling
+
+            now = time.monotonic()
+            fire = self.release_rescans(now)
+            if pending and not readable:
+                self.settle(now)
+                pending = False
+                fire = True
+            if fire and self.on_event is not None:
+                self.on_event()
+
+    def _add_window(self, window):
+        """Add a mapped window's root-relative geometry; False if it vanished meanwhile."""
+        from Xlib import error
+
+        try:
+            geometry = window.get_geometry()
+            origin = self._root.translate_coords(window, 0, 0)
+        except (error.BadWindow, error.BadDrawable):
+            return False
+        self.add_region(origin.x, origin.y, geometry.width, geometry.height)
+        return True